@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Edge2Chrome DevTools协议引擎
+连接已经以 --remote-debugging-port 启动的Chrome，通过 Target.createTarget 打开URL，
+不再为每个请求启动chrome.exe再交给已运行的实例
+"""
+
+import base64
+import hashlib
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import urllib.request
+from urllib.parse import urlsplit
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9222
+DEFAULT_TIMEOUT = 2.0
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OPCODE_TEXT = 0x1
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+# 能通过 Target.createTarget 表达的Chrome参数；其他参数（如--incognito、--profile-directory）
+# 只能在启动chrome.exe时生效，遇到时交给Popen处理
+SUPPORTED_ARGS = {"--new-window", "--new-tab"}
+
+class CDPError(Exception):
+    """DevTools连接或调用失败"""
+
+class PartialOpenError(CDPError):
+    """批量打开中途失败；target_ids为已经打开的URL（按顺序排在前面）对应的targetId"""
+
+    def __init__(self, message, target_ids):
+        super().__init__(message)
+        self.target_ids = target_ids
+
+def websocket_accept(key):
+    """计算握手响应中的 Sec-WebSocket-Accept"""
+    digest = hashlib.sha1((key + WEBSOCKET_GUID).encode('ascii')).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+def encode_frame(payload, opcode=OPCODE_TEXT, mask=True):
+    """编码一个完整的WebSocket帧（客户端发送的帧必须加掩码）"""
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 65536:
+        header.append(mask_bit | 126)
+        header += struct.pack('>H', length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack('>Q', length)
+
+    if not mask:
+        return bytes(header) + payload
+
+    mask_key = os.urandom(4)
+    masked = bytes(b ^ mask_key[i % 4] for i, b in enumerate(payload))
+    return bytes(header) + mask_key + masked
+
+def _recv_exact(sock, length):
+    data = bytearray()
+    while len(data) < length:
+        chunk = sock.recv(length - len(data))
+        if not chunk:
+            raise CDPError("DevTools连接已关闭")
+        data += chunk
+    return bytes(data)
+
+def read_frame(sock):
+    """读取一个WebSocket帧，返回 (opcode, payload)；分片消息合并后返回"""
+    message = bytearray()
+    message_opcode = None
+
+    while True:
+        first, second = _recv_exact(sock, 2)
+        fin = first & 0x80
+        opcode = first & 0x0F
+        length = second & 0x7F
+
+        if length == 126:
+            length = struct.unpack('>H', _recv_exact(sock, 2))[0]
+        elif length == 127:
+            length = struct.unpack('>Q', _recv_exact(sock, 8))[0]
+
+        mask_key = _recv_exact(sock, 4) if second & 0x80 else None
+        payload = _recv_exact(sock, length)
+        if mask_key:
+            payload = bytes(b ^ mask_key[i % 4] for i, b in enumerate(payload))
+
+        # 控制帧可以夹在分片之间，直接返回
+        if opcode >= OPCODE_CLOSE:
+            return opcode, payload
+
+        if opcode:
+            message_opcode = opcode
+        message += payload
+
+        if fin:
+            return message_opcode, bytes(message)
+
+class CDPConnection:
+    """到浏览器DevTools端点的WebSocket连接"""
+
+    def __init__(self, ws_url, timeout=DEFAULT_TIMEOUT):
+        self.ws_url = ws_url
+        self.timeout = timeout
+        self._next_id = 1
+        self.sock = self._connect()
+
+    def _connect(self):
+        parts = urlsplit(self.ws_url)
+        sock = socket.create_connection((parts.hostname, parts.port or 80), timeout=self.timeout)
+
+        try:
+            key = base64.b64encode(os.urandom(16)).decode('ascii')
+            path = parts.path + ("?" + parts.query if parts.query else "")
+            request = (
+                f"GET {path} HTTP/1.1\r\n"
+                f"Host: {parts.hostname}:{parts.port}\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Key: {key}\r\n"
+                "Sec-WebSocket-Version: 13\r\n"
+                "\r\n"
+            )
+            sock.sendall(request.encode('ascii'))
+
+            response = bytearray()
+            while b"\r\n\r\n" not in response:
+                chunk = sock.recv(4096)
+                if not chunk:
+                    raise CDPError("DevTools握手失败: 连接已关闭")
+                response += chunk
+
+            head = response.split(b"\r\n\r\n", 1)[0].decode('latin-1')
+            if not head.startswith("HTTP/1.1 101"):
+                raise CDPError(f"DevTools握手失败: {head.splitlines()[0]}")
+            if websocket_accept(key) not in head:
+                raise CDPError("DevTools握手失败: Sec-WebSocket-Accept不匹配")
+
+            return sock
+
+        except Exception:
+            sock.close()
+            raise
+
+    def call(self, method, params=None):
+        """调用一个DevTools方法并等待结果，期间收到的事件直接忽略"""
+        request_id = self._next_id
+        self._next_id += 1
+
+        payload = json.dumps({"id": request_id, "method": method, "params": params or {}})
+        try:
+            self.sock.sendall(encode_frame(payload.encode('utf-8')))
+
+            while True:
+                opcode, data = read_frame(self.sock)
+
+                if opcode == OPCODE_PING:
+                    self.sock.sendall(encode_frame(data, OPCODE_PONG))
+                    continue
+                if opcode == OPCODE_CLOSE:
+                    raise CDPError("DevTools连接已关闭")
+                if opcode != OPCODE_TEXT:
+                    continue
+
+                message = json.loads(data)
+                if message.get("id") != request_id:
+                    continue
+                if "error" in message:
+                    raise CDPError(f"{method} 失败: {message['error'].get('message')}")
+                return message.get("result", {})
+
+        except (OSError, ValueError) as e:
+            raise CDPError(f"{method} 失败: {e}") from e
+
+    def close(self):
+        try:
+            self.sock.sendall(encode_frame(b"", OPCODE_CLOSE))
+        except OSError:
+            pass
+        self.sock.close()
+
+def default_active_port_files():
+    """Chrome在用户数据目录中写入的 DevToolsActivePort 文件位置"""
+    if sys.platform == "win32":
+        base = os.getenv('LOCALAPPDATA', '')
+        dirs = [os.path.join(base, r"Google\Chrome\User Data")]
+    elif sys.platform == "darwin":
+        dirs = [os.path.expanduser("~/Library/Application Support/Google/Chrome")]
+    else:
+        dirs = [os.path.expanduser("~/.config/google-chrome"),
+                os.path.expanduser("~/.config/chromium")]
+    return [os.path.join(d, "DevToolsActivePort") for d in dirs]
+
+class CDPEngine:
+    """通过DevTools协议在已运行的Chrome中打开URL
+
+    没有可连接的浏览器时 open_urls 抛出CDPError，由调用方回退到启动chrome.exe；
+    已经打开部分URL后失败时抛出PartialOpenError，调用方只需为其余URL启动chrome.exe
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=None, timeout=DEFAULT_TIMEOUT, active_port_files=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.active_port_files = default_active_port_files() if active_port_files is None else active_port_files
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def supports_args(self, chrome_args):
+        """参数能否通过DevTools表达"""
+        return all(arg in SUPPORTED_ARGS for arg in chrome_args)
+
+    def discover(self):
+        """查找浏览器的WebSocket调试地址，找不到时返回None"""
+        # Chrome启动后写入的端口文件：第一行端口，第二行浏览器端点路径
+        for path in self.active_port_files:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    lines = f.read().split()
+                if len(lines) >= 2:
+                    return f"ws://{self.host}:{int(lines[0])}{lines[1]}"
+            except (OSError, ValueError):
+                continue
+
+        try:
+            url = f"http://{self.host}:{self.port or DEFAULT_PORT}/json/version"
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                info = json.loads(response.read())
+            return info.get("webSocketDebuggerUrl")
+        except (OSError, ValueError):
+            return None
+
+    def _get_connection(self):
+        if self._connection is None:
+            ws_url = self.discover()
+            if not ws_url:
+                raise CDPError("没有可连接的Chrome调试端口")
+            self._connection = CDPConnection(ws_url, self.timeout)
+        return self._connection
+
+    def open_urls(self, urls, chrome_args=()):
+        """打开URL，返回每个URL对应的targetId"""
+        new_window = "--new-window" in chrome_args
+
+        with self._lock:
+            # 复用的连接可能因浏览器重启失效，还没打开任何URL时换新连接重试一次
+            for retry in (self._connection is not None, False):
+                target_ids = []
+                try:
+                    connection = self._get_connection()
+                    for index, url in enumerate(urls):
+                        # 批量打开时只有第一个URL新建窗口，其余作为标签页跟随
+                        result = connection.call("Target.createTarget", {
+                            "url": url,
+                            "newWindow": new_window and index == 0
+                        })
+                        target_ids.append(result.get("targetId"))
+                    return target_ids
+
+                except (CDPError, OSError) as e:
+                    self._close()
+                    if target_ids:
+                        raise PartialOpenError(str(e), target_ids) from e
+                    if not retry:
+                        raise CDPError(str(e)) from e
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
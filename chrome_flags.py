@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Edge2Chrome Chrome启动参数解析
+一次扫描完成分词（支持双引号）和参数校验，结果按原始chromeArgs字符串缓存；
+扩展发送的chromeArgs通常只有少数几种，绝大多数请求直接命中缓存
+"""
+
+import functools
+import os
+
+DEFAULT_ARGS = ("--new-window",)
+
+# 允许通过chromeArgs传入的参数（只比较 = 之前的参数名）
+ALLOWED_FLAGS = frozenset({
+    "--new-window",
+    "--new-tab",
+    "--incognito",
+    "--guest",
+    "--profile-directory",
+    "--user-data-dir",
+    "--start-maximized",
+    "--start-fullscreen",
+    "--window-size",
+    "--window-position",
+    "--app",
+    "--lang",
+    "--disable-extensions",
+    "--force-dark-mode",
+})
+
+# 任何情况下都拒绝的参数：打开调试端口、加载任意代码或关闭安全机制
+DENIED_FLAGS = frozenset({
+    "--remote-debugging-port",
+    "--remote-debugging-pipe",
+    "--remote-debugging-address",
+    "--remote-allow-origins",
+    "--load-extension",
+    "--disable-web-security",
+    "--no-sandbox",
+    "--renderer-cmd-prefix",
+    "--gpu-launcher",
+    "--utility-cmd-prefix",
+    "--browser-subprocess-path",
+})
+
+# EDGE2CHROME_ALLOWED_ARGS 追加允许的参数名，逗号分隔（不能覆盖禁止列表）
+EXTRA_ALLOWED_FLAGS = frozenset(
+    name.strip().lower() for name in os.getenv('EDGE2CHROME_ALLOWED_ARGS', '').split(',') if name.strip()
+)
+
+CACHE_SIZE = 256
+
+class ChromeArgsError(ValueError):
+    """chromeArgs包含不允许的内容"""
+
+def flag_name(token):
+    """参数名，统一为小写和双横线（Chrome也接受单横线写法）"""
+    return "--" + token.split("=", 1)[0].lstrip("-").lower()
+
+def check_flag(token):
+    """返回参数不合法的原因，合法时返回None"""
+    # 不带横线的参数会被Chrome当作URL或文件打开
+    if not token.startswith("-"):
+        return f"不支持的参数: {token}"
+
+    name = flag_name(token)
+    if name in DENIED_FLAGS:
+        return f"禁止的参数: {token}"
+    if name not in ALLOWED_FLAGS and name not in EXTRA_ALLOWED_FLAGS:
+        return f"未允许的参数: {token}"
+    return None
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _parse(raw):
+    """分词并校验，返回 (参数元组, 错误信息)；不合法的字符串同样缓存"""
+    args = []
+    token = []
+    in_token = False
+    in_quotes = False
+
+    # 末尾追加一个空格，最后一个参数在循环内结束
+    for char in raw + " ":
+        if char == '"':
+            in_quotes = not in_quotes
+            in_token = True
+        elif char.isspace() and not in_quotes:
+            if in_token:
+                arg = "".join(token)
+                error = check_flag(arg)
+                if error:
+                    return (), error
+                args.append(arg)
+                token = []
+                in_token = False
+        else:
+            token.append(char)
+            in_token = True
+
+    if in_quotes:
+        return (), "引号不匹配"
+
+    return tuple(args) or DEFAULT_ARGS, None
+
+def parse_chrome_args(raw):
+    """解析chromeArgs字符串，返回参数列表；非字符串或空字符串返回默认参数
+
+    参数不合法时抛出ChromeArgsError
+    """
+    if not isinstance(raw, str):
+        return list(DEFAULT_ARGS)
+
+    args, error = _parse(raw)
+    if error:
+        raise ChromeArgsError(error)
+
+    return list(args)
+
+def cache_stats():
+    info = _parse.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Edge2Chrome Chrome可执行文件定位
+支持Windows、macOS和Linux的常见安装位置，候选路径并发探测；
+找到的路径连同mtime和inode保存在磁盘缓存中，多个Host进程共用，
+之后每次请求只需一次stat确认，路径失效时才重新扫描候选路径
+"""
+
+import glob
+import json
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 并发探测的线程数上限
+PROBE_WORKERS = 16
+
+# PATH中查找的可执行文件名，Chrome优先于Chromium
+CHROME_NAMES = ["google-chrome", "google-chrome-stable", "google-chrome-beta", "google-chrome-unstable"]
+CHROMIUM_NAMES = ["chromium", "chromium-browser"]
+
+def default_cache_dir():
+    """缓存目录，EDGE2CHROME_CACHE_DIR 可指定"""
+    cache_dir = os.getenv('EDGE2CHROME_CACHE_DIR')
+    if cache_dir:
+        return cache_dir
+    if sys.platform == "win32":
+        base = os.getenv('LOCALAPPDATA') or os.path.expanduser("~")
+        return os.path.join(base, "Edge2Chrome")
+    base = os.getenv('XDG_CACHE_HOME') or os.path.expanduser("~/.cache")
+    return os.path.join(base, "edge2chrome")
+
+def default_cache_file():
+    """缓存文件位置"""
+    return os.path.join(default_cache_dir(), "chrome_path.json")
+
+def path_candidates(names):
+    """PATH中每个目录下的指定文件"""
+    dirs = [d for d in os.getenv('PATH', '').split(os.pathsep) if d]
+    return [os.path.join(d, name) for name in names for d in dirs]
+
+def default_candidates():
+    """当前平台上Chrome可能的位置，按优先级排列"""
+    if sys.platform == "win32":
+        roots = [os.getenv('PROGRAMFILES'), os.getenv('PROGRAMFILES(X86)'), os.getenv('LOCALAPPDATA')]
+        roots = [root for root in roots if root]
+        candidates = []
+        for product in (r"Google\Chrome", r"Google\Chrome Beta", "Chromium"):
+            candidates += [os.path.join(root, product, "Application", "chrome.exe") for root in roots]
+        return candidates + path_candidates(["chrome.exe"])
+
+    if sys.platform == "darwin":
+        apps = ["Google Chrome.app/Contents/MacOS/Google Chrome",
+                "Google Chrome Beta.app/Contents/MacOS/Google Chrome Beta",
+                "Chromium.app/Contents/MacOS/Chromium"]
+        roots = ["/Applications", os.path.expanduser("~/Applications")]
+        return [os.path.join(root, app) for app in apps for root in roots] + path_candidates(CHROME_NAMES)
+
+    flatpak_exports = ["/var/lib/flatpak/exports/bin", os.path.expanduser("~/.local/share/flatpak/exports/bin")]
+    return (
+        path_candidates(CHROME_NAMES)
+        + sorted(glob.glob("/usr/bin/google-chrome*"))
+        + ["/opt/google/chrome/chrome", "/opt/google/chrome-beta/chrome"]
+        + [os.path.join(d, "com.google.Chrome") for d in flatpak_exports]
+        + path_candidates(CHROMIUM_NAMES)
+        + ["/snap/bin/chromium", "/usr/lib/chromium/chromium"]
+        + [os.path.join(d, "org.chromium.Chromium") for d in flatpak_exports]
+    )
+
+def is_executable(path):
+    return os.path.isfile(path) and os.access(path, os.X_OK)
+
+def probe(candidates):
+    """并发检查候选路径，返回优先级最高的可用路径
+
+    每个候选只需一次stat，但在网络驱动器或漫游配置目录上单次可能很慢，逐个检查时延迟会累加
+    """
+    if not candidates:
+        return None
+
+    with ThreadPoolExecutor(max_workers=min(PROBE_WORKERS, len(candidates))) as executor:
+        for path, found in zip(candidates, executor.map(is_executable, candidates)):
+            if found:
+                return path
+
+    return None
+
+def file_signature(st):
+    """文件标识：Chrome原位更新后mtime变化，重新安装后inode变化"""
+    return [st.st_mtime_ns, st.st_ino]
+
+class ChromeLocator:
+    """Chrome定位器 - 内存和磁盘两级缓存
+
+    candidates为调用方额外指定的路径，优先于平台默认位置；
+    EDGE2CHROME_CHROME 指定的路径优先于所有候选
+    """
+
+    def __init__(self, candidates=(), cache_file=None, platform_defaults=True):
+        self.preferred = os.getenv('EDGE2CHROME_CHROME')
+        self.candidates = list(candidates)
+        self.platform_defaults = platform_defaults
+        self.cache_file = default_cache_file() if cache_file is None else cache_file
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._path = None
+        self._signature = None
+
+        # 统计
+        self.scans = 0
+
+    def find(self):
+        """返回Chrome路径，找不到时返回None"""
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                self._load_cache()
+
+            if self._path:
+                try:
+                    st = os.stat(self._path)
+                except OSError:
+                    logging.info(f"缓存的Chrome路径已失效: {self._path}")
+                else:
+                    signature = file_signature(st)
+                    if signature != self._signature:
+                        # 同一路径上的文件被更新，路径仍然有效，只刷新缓存
+                        self._signature = signature
+                        self._save_cache()
+                    return self._path
+
+            self._path = self._scan()
+            self._signature = None
+
+            if self._path:
+                try:
+                    self._signature = file_signature(os.stat(self._path))
+                except OSError:
+                    pass
+                self._save_cache()
+
+            return self._path
+
+    def _scan(self):
+        self.scans += 1
+
+        candidates = ([self.preferred] if self.preferred else []) + self.candidates
+        if self.platform_defaults:
+            candidates += default_candidates()
+        # 去重并保持优先级
+        candidates = list(dict.fromkeys(candidates))
+
+        path = probe(candidates)
+        if path:
+            logging.info(f"扫描找到Chrome: {path} (共检查 {len(candidates)} 个位置)")
+        return path
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            self._path = cache["path"]
+            self._signature = [cache["mtime_ns"], cache["ino"]]
+            # 指定的路径变了，缓存不再适用
+            if self.preferred and self._path != self.preferred:
+                self._path = None
+        except (OSError, ValueError, KeyError, TypeError):
+            self._path = None
+            self._signature = None
+
+    def _save_cache(self):
+        """写入临时文件后替换，其他Host进程不会读到写了一半的缓存"""
+        mtime_ns, ino = self._signature or (None, None)
+        temp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({"path": self._path, "mtime_ns": mtime_ns, "ino": ino}, f, ensure_ascii=False)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            logging.debug(f"写入Chrome路径缓存失败: {e}")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Edge2Chrome 守护进程客户端
+转发Host（edge2chrome_launcher_edge_shim.py）每次启动都会导入本模块，除标准库的基础模块外
+只依赖multiprocessing.connection；守护进程的处理逻辑、日志和Chrome定位都在host_daemon.py中，
+只有守护进程未运行、需要启动它时才导入
+"""
+
+import os
+import sys
+import time
+from multiprocessing.connection import Client
+
+# 守护进程地址，默认为缓存目录下的Unix套接字或当前用户的命名管道
+DAEMON_ADDRESS = os.getenv('EDGE2CHROME_DAEMON_ADDRESS')
+
+# 启动守护进程后等待其开始监听的时间（秒）
+START_TIMEOUT = 5
+START_POLL_INTERVAL = 0.05
+
+AUTHKEY_SIZE = 32
+
+# 转发Host读到EOF后发送空消息；守护进程发出该连接剩余的响应后同样回复空消息
+END_OF_STREAM = b''
+
+def default_cache_dir():
+    """与chrome_locator.default_cache_dir相同的目录；转发Host不导入chrome_locator（会加载logging和线程池）"""
+    cache_dir = os.getenv('EDGE2CHROME_CACHE_DIR')
+    if cache_dir:
+        return cache_dir
+    if sys.platform == "win32":
+        base = os.getenv('LOCALAPPDATA') or os.path.expanduser("~")
+        return os.path.join(base, "Edge2Chrome")
+    base = os.getenv('XDG_CACHE_HOME') or os.path.expanduser("~/.cache")
+    return os.path.join(base, "edge2chrome")
+
+def daemon_address():
+    if DAEMON_ADDRESS:
+        return DAEMON_ADDRESS
+    if sys.platform == "win32":
+        return r"\\.\pipe\edge2chrome-" + (os.getenv('USERNAME') or "default")
+    return os.path.join(default_cache_dir(), "daemon.sock")
+
+def daemon_authkey():
+    """连接认证密钥，首次使用时生成，文件只有当前用户可读"""
+    key_file = os.path.join(default_cache_dir(), "daemon.key")
+    os.makedirs(os.path.dirname(key_file), exist_ok=True)
+
+    try:
+        fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    else:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(os.urandom(AUTHKEY_SIZE))
+
+    # 另一个进程可能正在写入
+    deadline = time.monotonic() + 1
+    while True:
+        with open(key_file, 'rb') as f:
+            key = f.read()
+        if len(key) >= AUTHKEY_SIZE or time.monotonic() >= deadline:
+            return key
+        time.sleep(0.01)
+
+def connect(address=None):
+    """连接守护进程，未运行时抛出OSError"""
+    return Client(address or daemon_address(), authkey=daemon_authkey())
+
+def connect_or_start(timeout=START_TIMEOUT):
+    """连接守护进程，未运行时启动并等待其开始监听"""
+    try:
+        return connect()
+    except OSError:
+        pass
+
+    # 只有需要启动守护进程时才加载它
+    import host_daemon
+    host_daemon.start_daemon()
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return connect()
+        except OSError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(START_POLL_INTERVAL)
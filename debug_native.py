@@ -27,44 +27,28 @@ try:
         msvcrt.setmode(sys.stdout.fileno(), os.O_BINARY)
     
     # 读取输入
-    input_data = sys.stdin.buffer.read(4)
+    import nativemsg
+    
+    try:
+        message = nativemsg.read_message(sys.stdin.buffer, max_size=1024)
+    except nativemsg.NativeMessageError as e:
+        message = None
+        with open(debug_log, "a", encoding="utf-8") as log:
+            log.write(f"DEBUG: Invalid message: {e}\n")
+            log.flush()
     
     with open(debug_log, "a", encoding="utf-8") as log:
-        log.write(f"DEBUG: Read {len(input_data)} bytes from stdin\n")
-        if input_data:
-            log.write(f"DEBUG: Input data: {input_data}\n")
+        log.write(f"DEBUG: Message data: {message}\n")
         log.flush()
     
-    # 如果有输入，尝试读取完整消息
-    if len(input_data) == 4:
-        import struct
-        length = struct.unpack('<I', input_data)[0]
+    # 如果有输入，发送简单响应
+    if message is not None:
+        response = {"success": True, "debug": True, "message": "Debug response"}
+        nativemsg.write_message(sys.stdout.buffer, response)
         
         with open(debug_log, "a", encoding="utf-8") as log:
-            log.write(f"DEBUG: Message length: {length}\n")
+            log.write(f"DEBUG: Sent response: {response}\n")
             log.flush()
-        
-        if 0 < length < 1024:
-            message_data = sys.stdin.buffer.read(length)
-            
-            with open(debug_log, "a", encoding="utf-8") as log:
-                log.write(f"DEBUG: Message data: {message_data}\n")
-                log.flush()
-            
-            # 发送简单响应
-            import json
-            response = {"success": True, "debug": True, "message": "Debug response"}
-            response_json = json.dumps(response)
-            response_bytes = response_json.encode('utf-8')
-            response_length = struct.pack('<I', len(response_bytes))
-            
-            sys.stdout.buffer.write(response_length)
-            sys.stdout.buffer.write(response_bytes)
-            sys.stdout.buffer.flush()
-            
-            with open(debug_log, "a", encoding="utf-8") as log:
-                log.write(f"DEBUG: Sent response: {response_json}\n")
-                log.flush()
     
     with open(debug_log, "a", encoding="utf-8") as log:
         log.write("DEBUG: Script completed normally\n")
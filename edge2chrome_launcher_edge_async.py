@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Edge2Chrome Native Host (asyncio并发版)
+多个启动请求并发处理，每个请求完成后立即响应，不必等待前面的请求
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import nativemsg
+from host_logging import setup_host_logging
+import request_trace
+from request_trace import RequestSpan
+from edge2chrome_launcher_edge_ultimate import submit_message, with_request_id, watcher, IDLE_TIMEOUT
+
+# 同时处理的启动请求数上限
+MAX_CONCURRENCY = int(os.getenv('EDGE2CHROME_MAX_CONCURRENCY', '8'))
+
+READ_CHUNK_SIZE = 64 * 1024
+
+def setup_logging():
+    """设置日志"""
+    log_dir = r"D:\work\Edge2Chrome\logs"
+    try:
+        os.makedirs(log_dir, exist_ok=True)
+        log_file = os.path.join(log_dir, "edge_async.log")
+
+        # 追加写入并按大小滚动，同时输出到stderr，由后台线程写入；
+        # 每个请求的分阶段耗时另外写入JSONL事件文件
+        setup_host_logging(log_file, events_file=os.path.join(log_dir, "edge_async.events.jsonl"))
+
+        logging.info("Edge2Chrome Native Host (asyncio并发版) 启动")
+        logging.info(f"Python: {sys.version}")
+        logging.info(f"PID: {os.getpid()}")
+
+    except Exception as e:
+        print(f"日志设置失败: {e}", file=sys.stderr)
+
+class ThreadedPipeReader:
+    """在线程中阻塞读取管道，供不支持异步管道的平台使用
+
+    Windows下Edge传入的是匿名管道，不支持overlapped I/O，
+    无法用connect_read_pipe注册到事件循环
+    """
+
+    def __init__(self, loop, stream):
+        self._loop = loop
+        self._stream = stream
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stdin")
+
+    async def read(self, size):
+        return await self._loop.run_in_executor(self._executor, self._stream.read1, size)
+
+class ThreadedPipeWriter:
+    """在单独线程中写入管道，保证帧按提交顺序写出"""
+
+    def __init__(self, loop, stream):
+        self._loop = loop
+        self._stream = stream
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stdout")
+        self._last = None
+
+    def _write(self, data):
+        self._stream.write(data)
+        self._stream.flush()
+
+    def write(self, data):
+        self._last = self._loop.run_in_executor(self._executor, self._write, data)
+
+    async def drain(self):
+        if self._last is not None:
+            await self._last
+
+async def open_stdio(loop):
+    """打开非阻塞的stdin/stdout管道流"""
+    if sys.platform == "win32":
+        return (ThreadedPipeReader(loop, sys.stdin.buffer),
+                ThreadedPipeWriter(loop, sys.stdout.buffer))
+
+    reader = asyncio.StreamReader(limit=nativemsg.MAX_MESSAGE_SIZE + nativemsg.HEADER_SIZE)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer)
+
+    transport, protocol = await loop.connect_write_pipe(
+        asyncio.streams.FlowControlMixin, sys.stdout.buffer
+    )
+    writer = asyncio.StreamWriter(transport, protocol, None, loop)
+
+    return reader, writer
+
+class AsyncNativeHost:
+    """asyncio Native Host - 读取、处理和响应互不阻塞"""
+
+    def __init__(self, reader, writer, loop):
+        self.reader = reader
+        self.writer = writer
+        self.loop = loop
+        self.executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="launch")
+        self.tasks = set()
+        self.handled = 0
+
+    async def send(self, message):
+        """写出一个完整帧；write()整帧追加到缓冲区，并发响应不会交错"""
+        try:
+            self.writer.write(nativemsg.encode_message(message))
+            await self.writer.drain()
+            return True
+        except Exception as e:
+            logging.error(f"发送响应失败: {e}")
+            return False
+
+    def spawn(self, coro):
+        """创建任务并保留引用，退出前等待其完成"""
+        task = self.loop.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def process(self, message, span):
+        """在线程池中处理消息，完成后立即发送响应"""
+        future = self.loop.create_future()
+        # 响应写出之后才发送启动校验结果
+        replied = asyncio.Event()
+
+        def deliver(result):
+            if not future.done():
+                future.set_result(result)
+            else:
+                self.spawn(self.push(replied, result))
+
+        def reply(result):
+            # 合并启动的结果从计时器线程返回，启动校验结果从校验线程返回
+            self.loop.call_soon_threadsafe(deliver, result)
+
+        def run():
+            with request_trace.activate(span):
+                submit_message(message, reply)
+
+        try:
+            await self.loop.run_in_executor(self.executor, run)
+            result = await future
+        except Exception as e:
+            logging.error(f"处理消息异常: {e}")
+            result = with_request_id(message, {"success": False, "error": f"程序异常: {e}"})
+
+        start = time.monotonic()
+        await self.send(result)
+        replied.set()
+        span.add("write", time.monotonic() - start)
+        span.finish(result)
+        self.handled += 1
+
+    async def push(self, replied, message):
+        """推送启动校验结果；校验线程的结果可能在本协程写出响应之前就已到达事件循环"""
+        await replied.wait()
+        await self.send(message)
+
+    async def read_chunk(self):
+        """读取下一段输入；没有进行中的请求时才计算空闲超时"""
+        if self.tasks or IDLE_TIMEOUT <= 0:
+            return await self.reader.read(READ_CHUNK_SIZE)
+
+        try:
+            return await asyncio.wait_for(self.reader.read(READ_CHUNK_SIZE), IDLE_TIMEOUT)
+        except asyncio.TimeoutError:
+            logging.info(f"空闲超过 {IDLE_TIMEOUT} 秒，程序退出")
+            return b''
+
+    async def dispatch(self, parser, data):
+        """解析一段输入并处理其中的消息；长度前缀无效、无法继续读取时返回False"""
+        while True:
+            span_start = time.monotonic()
+            error = None
+            try:
+                messages = parser.feed(data)
+            except nativemsg.MalformedMessage as e:
+                # 只有这一个消息无效，帧边界完整，缓冲区中剩余的消息继续解析
+                messages, error = e.messages, e
+            except nativemsg.NativeMessageError as e:
+                # 长度前缀无效，帧边界已经无法确定，不能继续读取
+                logging.error(f"读取消息失败: {e}")
+                self.start_messages(e.messages, span_start)
+                await self.send({"success": False, "error": f"读取消息失败: {e}"})
+                return False
+
+            self.start_messages(messages, span_start)
+            if error is None:
+                return True
+
+            logging.error(f"读取消息失败: {error}")
+            await self.send({"success": False, "error": f"读取消息失败: {error}"})
+            data = b''
+
+    def start_messages(self, messages, span_start):
+        # 同一段数据中的消息共用一次解析，解析耗时平均分到各个请求
+        decode_time = (time.monotonic() - span_start) / max(len(messages), 1)
+        for message in messages:
+            logging.info("收到消息: %s", message)
+            span = RequestSpan()
+            span.add("decode", decode_time)
+            span.describe(message)
+            self.spawn(self.process(message, span))
+
+    async def serve(self):
+        parser = nativemsg.FrameParser()
+
+        while True:
+            data = await self.read_chunk()
+
+            if not data:
+                logging.info("输入流结束")
+                break
+
+            if not await self.dispatch(parser, data):
+                break
+
+        # 等待进行中的请求完成并发出响应
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+        # 启动校验结果在响应之后从校验线程推送，最多等待一个校验时间；
+        # 推送经call_soon_threadsafe排在本协程恢复之前，恢复时发送任务已经创建
+        await self.loop.run_in_executor(None, watcher.wait)
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+        self.executor.shutdown(wait=False)
+        logging.info(f"消息处理完成，共处理 {self.handled} 个消息")
+
+async def run():
+    loop = asyncio.get_running_loop()
+    reader, writer = await open_stdio(loop)
+    await AsyncNativeHost(reader, writer, loop).serve()
+
+def main():
+    """主程序 - asyncio并发版"""
+    setup_logging()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        logging.info("程序被中断")
+    except Exception as e:
+        logging.error(f"主程序异常: {e}")
+        import traceback
+        logging.error(traceback.format_exc())
+    finally:
+        logging.info("程序结束")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Edge2Chrome Native Host 快速启动入口
+用 python -I -S 启动，先读取Edge发来的第一帧，再导入Edge终极适配版及其依赖（logging、subprocess等），
+第一帧到达之前只加载解释器本身需要的模块
+"""
+
+import sys
+
+# 第一帧的长度上限，与nativemsg.MAX_MESSAGE_SIZE相同；超出时交给Host报错
+MAX_FIRST_FRAME = 1024 * 1024
+
+class PrefixedReader:
+    """先返回已读出的数据，再从原始流读取；只提供Host读取帧用到的readinto"""
+
+    def __init__(self, prefix, stream):
+        self._prefix = memoryview(prefix)
+        self._stream = stream
+
+    def readinto(self, buffer):
+        if not self._prefix:
+            return self._stream.readinto(buffer)
+
+        count = min(len(buffer), len(self._prefix))
+        buffer[:count] = self._prefix[:count]
+        self._prefix = self._prefix[count:]
+        return count
+
+def read_exact(stream, length):
+    """读取最多length字节，流结束时返回已读到的部分"""
+    data = b''
+    while len(data) < length:
+        chunk = stream.read(length - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+def read_first_frame(stream):
+    """读取第一帧（长度前缀 + 消息体）的原始数据，不解析"""
+    header = read_exact(stream, 4)
+    if len(header) < 4:
+        return header
+
+    length = int.from_bytes(header, 'little')
+    if length == 0 or length > MAX_FIRST_FRAME:
+        return header
+
+    return header + read_exact(stream, length)
+
+def main():
+    if sys.platform == "win32":
+        import msvcrt
+        msvcrt.setmode(sys.stdin.fileno(), 0x8000)  # os.O_BINARY
+
+    stdin = sys.stdin.buffer
+    prefix = read_first_frame(stdin)
+
+    # 第一帧已到达，开始导入Host
+    from time import perf_counter
+    start = perf_counter()
+
+    # -I 不会把脚本所在目录加入sys.path；__file__是绝对路径，不为此导入os
+    script_dir = __file__[:max(__file__.rfind('/'), __file__.rfind('\\'))]
+    sys.path.insert(0, script_dir)
+
+    import edge2chrome_launcher_edge_ultimate as host
+
+    host.main(stdin=PrefixedReader(prefix, stdin), import_time=perf_counter() - start)
+
+if __name__ == "__main__":
+    main()
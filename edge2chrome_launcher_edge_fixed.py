@@ -5,15 +5,20 @@ Edge2Chrome Native Host (Edge修复版)
 解决Edge Native Messaging通信问题
 """
 
-import json
 import sys
-import struct
 import subprocess
 import os
 import logging
 import time
 import threading
 
+import nativemsg
+from host_logging import setup_host_logging
+import request_trace
+from request_trace import RequestSpan, phase
+from chrome_locator import ChromeLocator
+from chrome_flags import parse_chrome_args
+
 # Windows二进制模式设置
 if sys.platform == "win32":
     import msvcrt
@@ -26,6 +31,10 @@ CHROME_PATHS = [
     r"C:\Users\{}\AppData\Local\Google\Chrome\Application\chrome.exe".format(os.getenv('USERNAME', '')),
 ]
 
+# 兼容模式：恢复旧版的固定延时，仅用于确实需要的Edge版本
+# EDGE2CHROME_COMPAT=1 开启
+COMPAT_DELAYS = os.getenv('EDGE2CHROME_COMPAT', '0') == '1'
+
 def setup_logging():
     """设置日志"""
     log_dir = r"D:\\work\\Edge2Chrome\logs"
@@ -33,18 +42,8 @@ def setup_logging():
         os.makedirs(log_dir, exist_ok=True)
         log_file = os.path.join(log_dir, "edge_fixed.log")
         
-        # 清空旧日志
-        with open(log_file, 'w') as f:
-            pass
-        
-        logging.basicConfig(
-            level=logging.DEBUG,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler(sys.stderr)  # 同时输出到stderr用于调试
-            ]
-        )
+        # 同时输出到stderr用于调试，由后台线程写入；请求的分阶段耗时写入JSONL事件文件
+        setup_host_logging(log_file, events_file=os.path.join(log_dir, "edge_fixed.events.jsonl"))
         
         logging.info("Edge2Chrome Native Host (Edge修复版) 启动")
         logging.info(f"Python: {sys.version}")
@@ -54,128 +53,75 @@ def setup_logging():
         # 即使日志失败也要继续运行
         print(f"日志设置失败: {e}", file=sys.stderr)
 
-def read_message_safe():
-    """安全读取消息 - Edge兼容版"""
+def read_message_safe(span=None):
+    """安全读取消息 - Edge兼容版
+
+    传入span时分别记录读取帧和解析JSON的耗时，从长度前缀到达时开始计时，不计入等待Edge的时间
+    """
     try:
         logging.debug("开始读取消息...")
         
-        # 读取消息长度（4字节小端序）
-        length_data = sys.stdin.buffer.read(4)
+        stream = sys.stdin.buffer
+        header = nativemsg.read_exact_into(stream, nativemsg.HEADER_SIZE)
         
-        if not length_data:
+        if header is None:
             logging.info("收到EOF，连接关闭")
             return None
         
-        if len(length_data) < 4:
-            logging.error(f"长度数据不完整: {len(length_data)} 字节")
-            return None
+        if span:
+            span.begin()
         
-        # 解析消息长度
-        message_length = struct.unpack('<I', length_data)[0]
-        logging.debug(f"消息长度: {message_length}")
+        payload = nativemsg.read_exact_into(stream, nativemsg.decode_length(header))
+        if payload is None:
+            raise nativemsg.NativeMessageError("消息读取中断")
         
-        if message_length <= 0:
-            logging.warning("消息长度为0")
-            return None
+        if span:
+            span.mark("read")
         
-        if message_length > 1024 * 1024:  # 1MB限制
-            logging.error(f"消息长度过大: {message_length}")
-            return None
+        message = nativemsg.decode_message(payload)
         
-        # 读取消息内容
-        message_data = b''
-        bytes_to_read = message_length
+        if span:
+            span.mark("decode")
         
-        while bytes_to_read > 0:
-            chunk = sys.stdin.buffer.read(bytes_to_read)
-            if not chunk:
-                logging.error("消息读取中断")
-                return None
-            message_data += chunk
-            bytes_to_read -= len(chunk)
+        # 参数在日志级别检查之后才格式化
+        logging.info("收到消息: %s", message)
+        return message
         
-        logging.debug(f"成功读取 {len(message_data)} 字节消息数据")
-        
-        # 解码消息
-        try:
-            message_text = message_data.decode('utf-8')
-            logging.debug(f"消息文本: {message_text}")
-        except UnicodeDecodeError as e:
-            logging.error(f"消息解码失败: {e}")
-            return None
-        
-        # 解析JSON
-        try:
-            message = json.loads(message_text)
-            logging.info(f"收到消息: {message}")
-            return message
-        except json.JSONDecodeError as e:
-            logging.error(f"JSON解析失败: {e}")
-            logging.error(f"原始消息: {repr(message_text)}")
-            return None
-            
+    except nativemsg.NativeMessageError as e:
+        logging.error("读取消息失败: %s", e)
+        return None
     except Exception as e:
-        logging.error(f"读取消息异常: {e}")
+        logging.error("读取消息异常: %s", e)
         import traceback
         logging.error(traceback.format_exc())
         return None
 
 def send_message_safe(message):
-    """安全发送消息 - Edge兼容版"""
+    """安全发送消息 - 一次写入完整帧"""
     try:
-        logging.debug(f"准备发送消息: {message}")
-        
-        # 序列化消息
-        message_json = json.dumps(message, ensure_ascii=False)
-        message_bytes = message_json.encode('utf-8')
-        message_length = len(message_bytes)
-        
-        logging.debug(f"消息JSON: {message_json}")
-        logging.debug(f"消息字节长度: {message_length}")
-        
-        # 构造长度前缀（4字节小端序）
-        length_bytes = struct.pack('<I', message_length)
+        logging.debug("准备发送消息: %s", message)
         
-        # 原子性写入 - 防止Edge读取中断
-        full_message = length_bytes + message_bytes
+        written = nativemsg.write_message(sys.stdout.buffer, message)
         
-        # 写入到stdout
-        bytes_written = 0
-        while bytes_written < len(full_message):
-            chunk = full_message[bytes_written:]
-            try:
-                written = sys.stdout.buffer.write(chunk)
-                if written is None:
-                    written = len(chunk)
-                bytes_written += written
-                sys.stdout.buffer.flush()
-            except Exception as e:
-                logging.error(f"写入失败: {e}")
-                break
-        
-        logging.info(f"消息发送完成: 总长度={len(full_message)}, 已写入={bytes_written}")
-        
-        # 确保数据刷新
-        try:
-            sys.stdout.buffer.flush()
-            sys.stdout.flush()
-        except:
-            pass
+        logging.info("消息发送完成: 总长度=%d", written)
         
         return True
         
     except Exception as e:
-        logging.error(f"发送消息异常: {e}")
+        logging.error("发送消息异常: %s", e)
         import traceback
         logging.error(traceback.format_exc())
         return False
 
+# Chrome路径缓存，多个Host进程共用；缓存有效时每次请求只需一次stat
+chrome_locator = ChromeLocator(CHROME_PATHS)
+
 def find_chrome():
     """查找Chrome"""
-    for path in CHROME_PATHS:
-        if os.path.exists(path):
-            logging.info(f"找到Chrome: {path}")
-            return path
+    path = chrome_locator.find()
+    if path:
+        logging.info("找到Chrome: %s", path)
+        return path
     
     logging.error("未找到Chrome")
     return None
@@ -183,42 +129,39 @@ def find_chrome():
 def launch_chrome_safe(url, args="--new-window"):
     """安全启动Chrome"""
     try:
-        chrome_path = find_chrome()
+        with phase("discover"):
+            chrome_path = find_chrome()
         if not chrome_path:
             return {"success": False, "error": "未找到Chrome浏览器"}
         
-        # 处理参数
-        if isinstance(args, str):
-            chrome_args = [arg.strip() for arg in args.split() if arg.strip()]
-        else:
-            chrome_args = ["--new-window"]
-        
-        if not chrome_args:
-            chrome_args = ["--new-window"]
+        # 处理参数（不允许的参数抛出ChromeArgsError）
+        chrome_args = parse_chrome_args(args)
         
         # 构建命令
         cmd = [chrome_path] + chrome_args + [url]
-        logging.info(f"执行命令: {cmd}")
+        logging.info("执行命令: %s", cmd)
         
         # 启动Chrome进程
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            stdin=subprocess.DEVNULL,
-            shell=False,
-            creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == "win32" else 0
-        )
-        
-        # 短暂等待确保进程启动
-        time.sleep(0.2)
+        with phase("popen"):
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                stdin=subprocess.DEVNULL,
+                shell=False,
+                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == "win32" else 0
+            )
+        
+        if COMPAT_DELAYS:
+            # 兼容模式：短暂等待确保进程启动
+            time.sleep(0.2)
         
         # 检查进程状态
         poll_result = process.poll()
         if poll_result is not None:
-            logging.warning(f"Chrome进程立即退出，返回码: {poll_result}")
+            logging.warning("Chrome进程立即退出，返回码: %s", poll_result)
         
-        logging.info(f"Chrome启动成功, PID: {process.pid}")
+        logging.info("Chrome启动成功, PID: %s", process.pid)
         
         return {
             "success": True,
@@ -243,8 +186,9 @@ def main():
     try:
         logging.info("进入Edge兼容主循环")
         
-        # 处理第一个消息
-        message = read_message_safe()
+        # 处理第一个消息（进程只处理一个请求）
+        span = RequestSpan()
+        message = read_message_safe(span)
         
         if message is None:
             logging.warning("没有收到有效消息")
@@ -256,13 +200,15 @@ def main():
             chrome_args = message.get("chromeArgs", "--new-window")
             source = message.get("source", "unknown")
             
-            logging.info(f"处理来自 {source} 的URL请求: {url}")
+            logging.info("处理来自 %s 的URL请求: %s", source, url)
             
             # 启动Chrome
-            result = launch_chrome_safe(url, chrome_args)
+            span.describe(message)
+            with request_trace.activate(span):
+                result = launch_chrome_safe(url, chrome_args)
             
             # 发送响应
-            send_success = send_message_safe(result)
+            send_success = span.wrap_reply(send_message_safe)(result)
             
             if send_success:
                 logging.info("响应发送成功")
@@ -270,7 +216,7 @@ def main():
                 logging.error("响应发送失败")
                 
         else:
-            logging.warning(f"无效消息格式: {message}")
+            logging.warning("无效消息格式: %s", message)
             error_response = {
                 "success": False,
                 "error": "无效的消息格式，需要包含url字段"
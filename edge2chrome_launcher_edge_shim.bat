@@ -0,0 +1,3 @@
+@echo off
+cd /d "D:\work\Edge2Chrome"
+python "edge2chrome_launcher_edge_shim.py"
\ No newline at end of file
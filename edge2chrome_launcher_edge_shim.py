@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Edge2Chrome Native Host (转发版)
+不在本进程处理消息：把Edge发来的消息帧转发给常驻守护进程（host_daemon.py），
+守护进程未运行时先启动它；无法连接守护进程时退回在本进程处理。
+启动时只导入nativemsg和daemon_client，守护进程和Host的处理逻辑只在需要时才导入
+"""
+
+import os
+import sys
+import threading
+
+import nativemsg
+import daemon_client
+
+# Windows二进制模式
+if sys.platform == "win32":
+    import msvcrt
+    msvcrt.setmode(sys.stdin.fileno(), os.O_BINARY)
+    msvcrt.setmode(sys.stdout.fileno(), os.O_BINARY)
+
+def forward_responses(conn, stdout):
+    """把守护进程发来的完整帧原样写入stdout，直到收到结束标记或连接断开"""
+    while True:
+        try:
+            frame = conn.recv_bytes()
+        except (EOFError, OSError):
+            return
+
+        if frame == daemon_client.END_OF_STREAM:
+            return
+
+        stdout.write(frame)
+        stdout.flush()
+
+def forward_requests(conn, stdin):
+    """读取Edge发来的消息帧，只检查长度，消息体原样转发"""
+    while True:
+        header = nativemsg.read_exact_into(stdin, nativemsg.HEADER_SIZE)
+        if header is None:
+            return
+
+        try:
+            length = nativemsg.decode_length(header)
+        except nativemsg.NativeMessageError as e:
+            # 帧边界已经无法确定，不能继续读取
+            print(f"读取消息失败: {e}", file=sys.stderr)
+            return
+
+        payload = nativemsg.read_exact_into(stdin, length)
+        if payload is None:
+            print("消息读取中断", file=sys.stderr)
+            return
+
+        conn.send_bytes(payload)
+
+def main():
+    """主程序 - 转发版"""
+    try:
+        conn = daemon_client.connect_or_start()
+    except Exception as e:
+        print(f"无法连接守护进程，在本进程处理: {e}", file=sys.stderr)
+        import edge2chrome_launcher_edge_ultimate as host
+        host.main()
+        return
+
+    responses = threading.Thread(target=forward_responses, args=(conn, sys.stdout.buffer),
+                                 name="responses")
+    responses.start()
+
+    try:
+        forward_requests(conn, sys.stdin.buffer)
+        # 守护进程发出剩余的响应后回复结束标记
+        conn.send_bytes(daemon_client.END_OF_STREAM)
+    except OSError as e:
+        print(f"转发消息失败: {e}", file=sys.stderr)
+    finally:
+        responses.join()
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -5,14 +5,23 @@ Edge2Chrome Native Host (Edge终极适配版)
 解决Edge Native Messaging响应接收问题
 """
 
-import json
 import sys
-import struct
 import subprocess
 import os
 import logging
 import time
 import signal
+import threading
+
+import nativemsg
+from host_logging import setup_host_logging, stop_host_logging
+import request_trace
+from request_trace import RequestSpan, phase
+from chrome_locator import ChromeLocator
+import chrome_flags
+from chrome_flags import ChromeArgsError, parse_chrome_args
+from launch_registry import LaunchRegistry
+import rule_index
 
 # Windows二进制模式
 if sys.platform == "win32":
@@ -26,6 +35,37 @@ CHROME_PATHS = [
     r"C:\Users\{}\AppData\Local\Google\Chrome\Application\chrome.exe".format(os.getenv('USERNAME', '')),
 ]
 
+# 常驻模式：同一个连接上持续处理消息，直到EOF或空闲超时
+# EDGE2CHROME_PERSISTENT=0 恢复为处理一个消息后退出
+PERSISTENT_MODE = os.getenv('EDGE2CHROME_PERSISTENT', '1') != '0'
+IDLE_TIMEOUT = float(os.getenv('EDGE2CHROME_IDLE_TIMEOUT', '300'))
+
+# 批量打开时单条命令行的长度上限（Windows命令行最长32767字符）
+MAX_COMMAND_LINE = 30000
+
+# 启动合并窗口（毫秒）：窗口内chromeArgs相同的启动请求合并为一次Chrome启动
+# 仅常驻模式生效，EDGE2CHROME_COALESCE_MS=0 关闭
+COALESCE_WINDOW = float(os.getenv('EDGE2CHROME_COALESCE_MS', '25')) / 1000 if PERSISTENT_MODE else 0
+
+# 打开URL的方式：popen（默认，每次启动chrome.exe）
+# cdp：通过DevTools协议在已运行的Chrome中打开，需要Chrome以 --remote-debugging-port 启动
+LAUNCH_ENGINE = os.getenv('EDGE2CHROME_ENGINE', 'popen')
+CDP_PORT = int(os.getenv('EDGE2CHROME_CDP_PORT', '9222'))
+
+# 启动校验时间（毫秒）：启动chrome.exe后立即响应"accepted"，后台线程在这段时间内检查进程，
+# 结果作为launchStatus消息推送给v2请求
+VERIFY_WINDOW = float(os.getenv('EDGE2CHROME_VERIFY_MS', '2000')) / 1000
+VERIFY_INTERVAL = 0.05
+
+# 通信协议版本
+# v1: 一问一答，按顺序响应
+# v2: 消息带 "id" 字段，响应带回相同的id，可在同一连接上流水线发送、乱序响应
+PROTOCOL_VERSION = 2
+
+# 兼容模式：恢复旧版的固定延时，仅用于确实需要的Edge版本
+# EDGE2CHROME_COMPAT=1 开启
+COMPAT_DELAYS = os.getenv('EDGE2CHROME_COMPAT', '0') == '1'
+
 def setup_logging():
     """设置日志"""
     log_dir = r"D:\work\Edge2Chrome\logs"
@@ -33,19 +73,9 @@ def setup_logging():
         os.makedirs(log_dir, exist_ok=True)
         log_file = os.path.join(log_dir, "edge_ultimate.log")
         
-        # 清空旧日志
-        with open(log_file, 'w') as f:
-            pass
-        
-        # 同时输出到文件和stderr
-        logging.basicConfig(
-            level=logging.DEBUG,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler(sys.stderr)
-            ]
-        )
+        # 追加写入并按大小滚动，同时输出到stderr，由后台线程写入；
+        # 每个请求的分阶段耗时另外写入JSONL事件文件
+        setup_host_logging(log_file, events_file=os.path.join(log_dir, "edge_ultimate.events.jsonl"))
         
         logging.info("Edge2Chrome Native Host (Edge终极适配版) 启动")
         logging.info(f"Python: {sys.version}")
@@ -54,161 +84,103 @@ def setup_logging():
     except Exception as e:
         print(f"日志设置失败: {e}", file=sys.stderr)
 
-def read_input():
-    """读取Edge输入 - 兼容版"""
+def read_input(span=None, stream=None):
+    """读取Edge输入 - 兼容版
+
+    传入span时记录读取帧和解析JSON的耗时，从长度前缀到达时开始计时；
+    stream默认为stdin
+
+    输入结束或帧边界无法确定时返回None；消息体不是有效JSON时抛出nativemsg.MalformedMessage，
+    这一帧已经读完，调用方可以回复错误后继续读取
+    """
     try:
         logging.debug("开始读取Edge消息...")
         
-        # 读取长度（4字节）
-        length_data = sys.stdin.buffer.read(4)
+        if stream is None:
+            stream = sys.stdin.buffer
+        header = nativemsg.read_exact_into(stream, nativemsg.HEADER_SIZE)
         
-        if not length_data:
+        if header is None:
             logging.info("输入流结束")
             return None
         
-        if len(length_data) < 4:
-            logging.error(f"长度数据不完整: {len(length_data)}")
-            return None
+        if span:
+            span.begin()
         
-        # 解析长度
-        message_length = struct.unpack('<I', length_data)[0]
-        logging.debug(f"消息长度: {message_length}")
+        payload = nativemsg.read_exact_into(stream, nativemsg.decode_length(header))
+        if payload is None:
+            raise nativemsg.NativeMessageError("消息读取中断")
         
-        if message_length <= 0 or message_length > 1048576:  # 1MB限制
-            logging.error(f"消息长度异常: {message_length}")
-            return None
+        if span:
+            span.mark("read")
         
-        # 分块读取消息内容
-        message_data = b''
-        remaining = message_length
+        message = nativemsg.decode_message(payload)
         
-        while remaining > 0:
-            chunk_size = min(remaining, 4096)
-            chunk = sys.stdin.buffer.read(chunk_size)
-            
-            if not chunk:
-                logging.error("消息读取中断")
-                return None
-            
-            message_data += chunk
-            remaining -= len(chunk)
+        if span:
+            span.mark("decode")
         
-        logging.debug(f"成功读取消息: {len(message_data)} 字节")
+        # 参数在日志级别检查之后才格式化
+        logging.info("解析后的消息: %s", message)
+        return message
         
-        # 解码和解析
-        try:
-            message_text = message_data.decode('utf-8')
-            logging.debug(f"消息内容: {message_text}")
-            
-            message = json.loads(message_text)
-            logging.info(f"解析后的消息: {message}")
-            
-            return message
-            
-        except (UnicodeDecodeError, json.JSONDecodeError) as e:
-            logging.error(f"消息解析失败: {e}")
-            return None
-            
+    except nativemsg.MalformedMessage as e:
+        logging.error("读取消息失败: %s", e)
+        raise
+    except nativemsg.NativeMessageError as e:
+        logging.error("读取消息失败: %s", e)
+        return None
     except Exception as e:
-        logging.error(f"读取输入异常: {e}")
+        logging.error("读取输入异常: %s", e)
         return None
 
+# 合并启动的响应从计时器线程发出，写入stdout需要加锁保证帧完整
+_output_lock = threading.Lock()
+
 def send_output(message):
-    """发送输出到Edge - 强化版"""
+    """发送输出到Edge - 一次写入完整帧"""
     try:
-        logging.debug(f"准备发送响应: {message}")
-        
-        # 序列化
-        response_json = json.dumps(message, ensure_ascii=False)
-        response_bytes = response_json.encode('utf-8')
-        response_length = len(response_bytes)
-        
-        logging.debug(f"响应JSON: {response_json}")
-        logging.debug(f"响应长度: {response_length}")
-        
-        # 构造完整消息
-        length_prefix = struct.pack('<I', response_length)
-        full_response = length_prefix + response_bytes
-        
-        # 原子性写入
-        bytes_written = 0
-        total_bytes = len(full_response)
-        
-        while bytes_written < total_bytes:
-            try:
-                chunk = full_response[bytes_written:]
-                written = sys.stdout.buffer.write(chunk)
-                
-                if written is None:
-                    written = len(chunk)
-                
-                bytes_written += written
-                
-                # 立即刷新
-                sys.stdout.buffer.flush()
-                
-                logging.debug(f"写入进度: {bytes_written}/{total_bytes}")
-                
-            except Exception as e:
-                logging.error(f"写入失败: {e}")
-                break
+        logging.debug("准备发送响应: %s", message)
         
-        # 最终刷新
-        try:
-            sys.stdout.buffer.flush()
-            sys.stdout.flush()
-            os.fsync(sys.stdout.fileno())  # 强制刷新到OS
-        except:
-            pass
+        with _output_lock:
+            written = nativemsg.write_message(sys.stdout.buffer, message)
         
-        logging.info(f"响应发送完成: {bytes_written}/{total_bytes} 字节")
+        logging.info("响应发送完成: %d 字节", written)
         
-        # 给Edge时间处理响应
-        time.sleep(0.1)
+        if COMPAT_DELAYS:
+            # 兼容模式：给旧版Edge时间处理响应
+            time.sleep(0.1)
         
-        return bytes_written == total_bytes
+        return True
         
     except Exception as e:
-        logging.error(f"发送输出异常: {e}")
+        logging.error("发送输出异常: %s", e)
         return False
 
+# Chrome路径缓存，多个Host进程共用；缓存有效时每次请求只需一次stat
+chrome_locator = ChromeLocator(CHROME_PATHS)
+
 def find_chrome():
     """查找Chrome"""
-    for path in CHROME_PATHS:
-        if os.path.exists(path):
-            logging.info(f"找到Chrome: {path}")
-            return path
+    path = chrome_locator.find()
+    if path:
+        logging.info("找到Chrome: %s", path)
+        return path
     
     logging.error("未找到Chrome")
     return None
 
-def launch_chrome(url, args="--new-window"):
-    """启动Chrome"""
-    try:
-        chrome_path = find_chrome()
-        if not chrome_path:
-            return {"success": False, "error": "未找到Chrome浏览器"}
-        
-        # 处理参数
-        if isinstance(args, str):
-            chrome_args = [arg.strip() for arg in args.split() if arg.strip()]
-        else:
-            chrome_args = ["--new-window"]
-        
-        if not chrome_args:
-            chrome_args = ["--new-window"]
-        
-        # 构建命令
-        cmd = [chrome_path] + chrome_args + [url]
-        logging.info(f"执行命令: {cmd}")
-        
-        # 启动Chrome
-        startupinfo = None
-        if sys.platform == "win32":
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            startupinfo.wShowWindow = subprocess.SW_HIDE
-        
+def spawn_chrome(chrome_path, chrome_args, urls):
+    """启动一个Chrome进程打开全部URL"""
+    cmd = [chrome_path] + chrome_args + list(urls)
+    logging.info("执行命令: %s", cmd)
+    
+    startupinfo = None
+    if sys.platform == "win32":
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        startupinfo.wShowWindow = subprocess.SW_HIDE
+    
+    with phase("popen"):
         process = subprocess.Popen(
             cmd,
             stdout=subprocess.DEVNULL,
@@ -218,84 +190,642 @@ def launch_chrome(url, args="--new-window"):
             startupinfo=startupinfo,
             creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == "win32" else 0
         )
-        
-        # 确保进程启动
+    
+    # 登记后由回收线程等待进程退出
+    registry.register(process, urls)
+    
+    if COMPAT_DELAYS:
+        # 兼容模式：等待进程启动
         time.sleep(0.2)
+    
+    return process
+
+def split_command_lines(base_length, urls):
+    """按命令行长度上限分组，通常所有URL都在同一组"""
+    groups = []
+    current = []
+    length = base_length
+    
+    for url in urls:
+        # 每个参数额外计入空格和可能的引号
+        cost = len(url) + 3
+        if current and length + cost > MAX_COMMAND_LINE:
+            groups.append(current)
+            current = []
+            length = base_length
+        current.append(url)
+        length += cost
+    
+    if current:
+        groups.append(current)
+    
+    return groups
+
+def open_with_devtools(urls, chrome_args):
+    """通过DevTools在已运行的Chrome中打开URL，返回targetId列表；不可用时返回None
+
+    中途失败时返回已打开的前几个URL的targetId，列表比urls短
+    """
+    if devtools is None or not devtools.supports_args(chrome_args):
+        return None
+    
+    try:
+        with phase("cdp"):
+            target_ids = devtools.open_urls(urls, chrome_args)
+        logging.info("通过DevTools打开 %s 个URL: %s", len(urls), target_ids)
+        return target_ids
+    except cdp_engine.PartialOpenError as e:
+        logging.info("DevTools只打开了 %s/%s 个URL，其余改为启动Chrome: %s", len(e.target_ids), len(urls), e)
+        return e.target_ids
+    except cdp_engine.CDPError as e:
+        logging.info("DevTools不可用，改为启动Chrome: %s", e)
+        return None
+
+def launch_chrome(url, args="--new-window", watches=None):
+    """启动Chrome
+
+    启动chrome.exe后不等待，响应状态为accepted；传入watches列表时，启动的 (进程, URL列表) 加入其中，
+    由调用方在响应发出之后交给watcher校验
+    """
+    try:
+        chrome_args = parse_chrome_args(args)
+        
+        # 优先复用已运行的Chrome
+        target_ids = open_with_devtools([url], chrome_args)
+        if target_ids:
+            return {
+                "success": True,
+                "message": "Chrome已打开链接",
+                "url": url,
+                "engine": "cdp",
+                "status": "opened",
+                "target_id": target_ids[0],
+                "timestamp": int(time.time())
+            }
+        
+        with phase("discover"):
+            chrome_path = find_chrome()
+        if not chrome_path:
+            return {"success": False, "error": "未找到Chrome浏览器"}
+        
+        # 启动Chrome
+        process = spawn_chrome(chrome_path, chrome_args, [url])
         
-        logging.info(f"Chrome启动成功, PID: {process.pid}")
+        logging.info("Chrome启动成功, PID: %s", process.pid)
+        
+        if watches is not None:
+            watches.append((process, [url]))
         
         return {
             "success": True,
             "message": "Chrome启动成功",
+            "status": "accepted",
             "url": url,
             "pid": process.pid,
             "chrome_path": chrome_path,
             "timestamp": int(time.time())
         }
         
+    except ChromeArgsError as e:
+        logging.warning("Chrome参数无效: %r: %s", args, e)
+        return {"success": False, "error": f"Chrome参数无效: {e}"}
     except Exception as e:
         error_msg = f"启动Chrome失败: {e}"
         logging.error(error_msg)
         return {"success": False, "error": error_msg}
 
+def launch_chrome_batch(urls, args="--new-window", watches=None):
+    """一次Chrome启动打开多个URL，响应中包含每个URL的结果
+
+    watches与launch_chrome相同，每次chrome.exe启动加入一项
+    """
+    results = [None] * len(urls)
+    valid = []
+    
+    for index, url in enumerate(urls):
+        if isinstance(url, str) and url.strip():
+            valid.append(url)
+            results[index] = {"url": url, "success": False}
+        else:
+            results[index] = {"url": url, "success": False, "error": "无效的URL"}
+    
+    if not valid:
+        return {"success": False, "error": "没有有效的URL", "results": results}
+    
+    try:
+        chrome_args = parse_chrome_args(args)
+    except ChromeArgsError as e:
+        logging.warning("Chrome参数无效: %r: %s", args, e)
+        error_msg = f"Chrome参数无效: {e}"
+        for result in results:
+            result.setdefault("error", error_msg)
+        return {"success": False, "error": error_msg, "results": results}
+    
+    # 优先复用已运行的Chrome；中途失败时已经打开的URL不再交给chrome.exe
+    pending = [result for result in results if "error" not in result]
+    target_ids = open_with_devtools(valid, chrome_args) or []
+    for result, target_id in zip(pending, target_ids):
+        result.update({"success": True, "engine": "cdp", "target_id": target_id})
+    pending = pending[len(target_ids):]
+    
+    if not pending:
+        return {
+            "success": True,
+            "message": f"Chrome已打开 {len(valid)} 个链接",
+            "engine": "cdp",
+            "status": "opened",
+            "results": results,
+            "pids": [],
+            "timestamp": int(time.time())
+        }
+    
+    remaining = [result["url"] for result in pending]
+    
+    with phase("discover"):
+        chrome_path = find_chrome()
+    if not chrome_path:
+        for result in pending:
+            result["error"] = "未找到Chrome浏览器"
+        return {"success": bool(target_ids), "error": "未找到Chrome浏览器", "results": results}
+    
+    base_length = len(chrome_path) + sum(len(arg) + 1 for arg in chrome_args)
+    
+    # URL -> 结果，同一URL出现多次时共用同一次启动的结果
+    launched = {}
+    pids = []
+    
+    for group in split_command_lines(base_length, remaining):
+        try:
+            process = spawn_chrome(chrome_path, chrome_args, group)
+            pids.append(process.pid)
+            if watches is not None:
+                watches.append((process, group))
+            for url in group:
+                launched[url] = {"success": True, "pid": process.pid}
+        except Exception as e:
+            error_msg = f"启动Chrome失败: {e}"
+            logging.error(error_msg)
+            for url in group:
+                launched[url] = {"success": False, "error": error_msg}
+    
+    for result in pending:
+        result.update(launched[result["url"]])
+    
+    opened = sum(1 for result in results if result["success"])
+    logging.info("批量启动完成: %s/%s 个URL, %s 次启动, PID: %s", opened, len(urls), len(pids), pids)
+    
+    return {
+        "success": opened > 0,
+        "message": f"Chrome已打开 {opened} 个链接",
+        "status": "accepted",
+        "results": results,
+        "pids": pids,
+        "chrome_path": chrome_path,
+        "timestamp": int(time.time())
+    }
+
+class IdleWatchdog:
+    """空闲看门狗 - 超过指定时间没有新消息时退出进程
+
+    cleanup在退出前调用，例如删除守护进程的套接字文件
+    """
+
+    def __init__(self, timeout, cleanup=None):
+        self.timeout = timeout
+        self.cleanup = cleanup
+        self._timer = None
+
+    def reset(self):
+        """重新开始计时"""
+        self.cancel()
+        self._timer = threading.Timer(self.timeout, self._expire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def cancel(self):
+        """停止计时（处理消息期间不计入空闲时间）"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _expire(self):
+        logging.info(f"空闲超过 {self.timeout} 秒，程序退出")
+        if self.cleanup:
+            self.cleanup()
+        stop_host_logging()
+        logging.shutdown()
+        # 主线程阻塞在stdin读取上，只能直接结束进程
+        os._exit(0)
+
+class LaunchWatcher:
+    """启动校验 - 后台线程检查刚启动的Chrome进程，不阻塞响应
+
+    Chrome已在运行时，新进程把URL交给已有实例后以返回码0退出，也算启动成功；
+    返回码非0视为启动失败；校验时间结束时仍在运行视为正常
+    """
+
+    def __init__(self, window, interval=VERIFY_INTERVAL):
+        self.window = window
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._watching = []
+        self._thread = None
+        # owner -> 尚未执行回调的校验数
+        self._owners = {}
+
+    def watch(self, process, urls, callback, owners=()):
+        """callback(status)在进程退出或校验时间结束时调用一次；owners为提交这次启动的连接"""
+        with self._lock:
+            self._watching.append((time.monotonic() + self.window, process, urls, callback, owners))
+            for owner in owners:
+                self._owners[owner] = self._owners.get(owner, 0) + 1
+            
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="launch-watcher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._watching:
+                    self._thread = None
+                    return
+                
+                now = time.monotonic()
+                finished = []
+                remaining = []
+                for entry in self._watching:
+                    deadline, process, urls, callback, owners = entry
+                    exit_code = process.poll()
+                    if exit_code is not None or now >= deadline:
+                        finished.append((process, exit_code, urls, callback, owners))
+                    else:
+                        remaining.append(entry)
+                self._watching = remaining
+            
+            for process, exit_code, urls, callback, owners in finished:
+                try:
+                    callback(self.status(process, exit_code, urls))
+                except Exception as e:
+                    logging.error("启动校验回调异常: %s", e)
+                self._release(owners)
+            
+            time.sleep(self.interval)
+
+    def _release(self, owners):
+        with self._lock:
+            for owner in owners:
+                count = self._owners.pop(owner) - 1
+                if count:
+                    self._owners[owner] = count
+
+    def wait(self, timeout=None, owner=None):
+        """等待正在校验的进程得到结果、回调执行完毕，返回是否已全部完成；指定owner时只等待该连接的校验
+
+        每个进程最迟在校验时间结束时得到结果，timeout默认为校验时间加两次检查间隔
+        """
+        if timeout is None:
+            timeout = self.window + 2 * self.interval
+        deadline = time.monotonic() + timeout
+        
+        while True:
+            with self._lock:
+                if self._thread is None if owner is None else owner not in self._owners:
+                    return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.interval)
+
+    @staticmethod
+    def status(process, exit_code, urls):
+        """生成推送给扩展的launchStatus消息"""
+        status = {"type": "launchStatus", "pid": process.pid, "urls": urls}
+        
+        if exit_code is None:
+            status.update({"success": True, "status": "running"})
+        elif exit_code == 0:
+            # 已交给正在运行的Chrome
+            status.update({"success": True, "status": "exited", "exit_code": 0})
+        else:
+            logging.warning("Chrome进程异常退出, PID: %s, 返回码: %s", process.pid, exit_code)
+            status.update({
+                "success": False,
+                "status": "failed",
+                "exit_code": exit_code,
+                "error": f"Chrome进程异常退出，返回码: {exit_code}"
+            })
+        
+        return status
+
+class LaunchCoalescer:
+    """启动合并器 - 窗口时间内到达的启动请求，chromeArgs相同的合并为一次Chrome启动
+
+    各请求的结果在启动完成后分别通过回调返回；owner标记请求来自哪个连接，
+    守护进程中一个连接关闭时只需启动该连接的请求
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._lock = threading.Lock()
+        # 同一时间只有一次flush在启动；退出前的flush会等待计时器触发的flush完成
+        self._flush_lock = threading.Lock()
+        self._groups = {}
+        self._timer = None
+        
+        # 统计
+        self.requests = 0
+        self.spawns = 0
+        self.spawns_saved = 0
+
+    def submit(self, url, chrome_args, callback, owner=None):
+        """提交一个启动请求，callback(result)在合并启动完成后调用，启动校验结果稍后再次通过callback推送"""
+        with self._lock:
+            self.requests += 1
+            # 启动在计时器线程中进行，阶段耗时记到提交时正在处理的请求上
+            self._groups.setdefault(chrome_args, []).append((url, callback, request_trace.current_spans(), owner))
+            
+            if self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self, owner=None):
+        """启动当前收集到的全部请求；指定owner时只启动该owner提交的请求，其余请求仍等待计时器"""
+        with self._flush_lock:
+            with self._lock:
+                if owner is None:
+                    groups = self._groups
+                    self._groups = {}
+                else:
+                    groups = {}
+                    for chrome_args, entries in list(self._groups.items()):
+                        own = [entry for entry in entries if entry[3] is owner]
+                        if not own:
+                            continue
+                        groups[chrome_args] = own
+                        others = [entry for entry in entries if entry[3] is not owner]
+                        if others:
+                            self._groups[chrome_args] = others
+                        else:
+                            del self._groups[chrome_args]
+                
+                if not self._groups and self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            
+            for chrome_args, entries in groups.items():
+                spans = [span for _, _, entry_spans, _ in entries for span in entry_spans]
+                for span in spans:
+                    span.mark("coalesce")
+                
+                watches = []
+                with request_trace.activate(*spans):
+                    results = self._launch_group(chrome_args, entries, watches)
+                
+                for (url, callback, _, _), result in zip(entries, results):
+                    try:
+                        callback(result)
+                    except Exception as e:
+                        logging.error("启动结果回调异常: %s", e)
+                
+                def on_status(status, entries=entries):
+                    # 一次启动可能包含多个请求，校验结果推送给其中的每个请求
+                    for url, callback, _, _ in entries:
+                        if url in status["urls"]:
+                            callback(status)
+                
+                # 所有请求都已响应，再开始启动校验
+                owners = {entry_owner for _, _, _, entry_owner in entries if entry_owner is not None}
+                watch_launches(watches, on_status, owners)
+
+    def _launch_group(self, chrome_args, entries, watches):
+        """启动一组参数相同的请求，返回与entries一一对应的结果；启动的进程加入watches"""
+        if len(entries) == 1:
+            result = launch_chrome(entries[0][0], chrome_args, watches)
+            if "pid" in result:
+                self.spawns += 1
+            # 与合并启动的结果一样，失败时也带上URL
+            result.setdefault("url", entries[0][0])
+            return [result]
+        
+        urls = [url for url, _, _, _ in entries]
+        batch = launch_chrome_batch(urls, chrome_args, watches)
+        
+        pids = batch.get("pids", [])
+        self.spawns += len(pids)
+        if pids:
+            self.spawns_saved += len(entries) - len(pids)
+        
+        logging.info("合并 %s 个启动请求为 %s 次启动", len(entries), len(pids))
+        
+        results = []
+        for item in batch["results"]:
+            if item["success"]:
+                # item中带有url和pid（或DevTools的target_id）
+                result = dict(item, message="Chrome启动成功", coalesced=len(entries),
+                              timestamp=batch["timestamp"])
+                for key in ("chrome_path", "engine", "status"):
+                    if key in batch:
+                        result[key] = batch[key]
+                results.append(result)
+            else:
+                results.append({"success": False, "url": item["url"], "error": item.get("error", batch.get("error"))})
+        return results
+
+    def stats(self):
+        return {
+            "window_ms": int(self.window * 1000),
+            "requests": self.requests,
+            "spawns": self.spawns,
+            "spawns_saved": self.spawns_saved
+        }
+
+# 启动校验
+watcher = LaunchWatcher(VERIFY_WINDOW)
+
+# 启动登记表，回收已退出的Chrome进程
+registry = LaunchRegistry()
+
+# 常驻模式下使用的启动合并器
+coalescer = LaunchCoalescer(COALESCE_WINDOW)
+
+# DevTools引擎：复用以--remote-debugging-port启动的Chrome，不可用时回退到启动chrome.exe
+devtools = None
+if LAUNCH_ENGINE == 'cdp':
+    import cdp_engine
+    devtools = cdp_engine.CDPEngine(port=CDP_PORT)
+
+def with_request_id(message, response):
+    """带有请求ID的v2消息，响应中原样带回ID和协议版本，扩展据此匹配乱序到达的响应；
+    不带ID的消息按v1格式响应
+    """
+    if isinstance(message, dict) and "id" in message:
+        response = dict(response, id=message["id"], v=PROTOCOL_VERSION)
+    
+    return response
+
+def handle_message(message, watches=None):
+    """处理单个消息，返回响应"""
+    return with_request_id(message, dispatch_message(message, watches))
+
+def watch_launches(watches, on_status, owners=()):
+    """在响应发出之后才开始启动校验，校验结果不会先于响应到达扩展"""
+    for process, urls in watches:
+        watcher.watch(process, urls, on_status, owners)
+
+def submit_message(message, reply, owner=None):
+    """处理单个消息，响应通过reply(response)返回；owner传给启动合并器，标记消息来自哪个连接
+
+    开启启动合并时，带请求ID的单个URL启动请求进入合并窗口，reply在合并启动完成后从计时器线程调用；
+    其他消息立即处理。v1消息没有ID，只能按顺序响应，因此不参与合并
+
+    带请求ID的启动请求响应后，启动校验结果再通过reply推送一次（type为launchStatus，带相同的ID）；
+    v1扩展无法区分推送和响应，因此不推送
+    """
+    try:
+        # chromeArgs作为合并分组的键；不是字符串时（按默认参数启动）不参与合并
+        if (COALESCE_WINDOW > 0 and isinstance(message, dict) and "id" in message
+                and isinstance(message.get("url"), str) and "urls" not in message
+                and isinstance(message.get("chromeArgs", "--new-window"), str)):
+            chrome_args = message.get("chromeArgs", "--new-window")
+            logging.info("处理来自 %s 的请求: %s", message.get('source', 'unknown'), message['url'])
+            coalescer.submit(message["url"], chrome_args,
+                             lambda result: reply(with_request_id(message, result)), owner)
+            return
+        
+        watches = [] if isinstance(message, dict) and "id" in message else None
+        response = handle_message(message, watches)
+    except Exception as e:
+        # 一个消息处理失败不影响同一连接上的其他消息
+        logging.error("处理消息异常: %s", e, exc_info=True)
+        response = with_request_id(message, {"success": False, "error": f"程序异常: {e}"})
+        watches = None
+    
+    reply(response)
+    if watches:
+        watch_launches(watches, lambda status: reply(with_request_id(message, status)),
+                       () if owner is None else (owner,))
+
+def dispatch_message(message, watches=None):
+    """按消息内容分发处理"""
+    if isinstance(message, dict) and isinstance(message.get("urls"), list):
+        urls = message["urls"]
+        chrome_args = message.get("chromeArgs", "--new-window")
+        source = message.get("source", "unknown")
+        
+        logging.info("处理来自 %s 的批量请求: %d 个URL", source, len(urls))
+        
+        # 所有URL通过一次Chrome启动打开
+        return launch_chrome_batch(urls, chrome_args, watches)
+    
+    if isinstance(message, dict) and message.get("type") == "classify":
+        # 按规则索引一次判断整页链接
+        with phase("classify"):
+            return rule_index.classify_message(message)
+    
+    if isinstance(message, dict) and message.get("type") == "stats":
+        stats = {
+            # 守护进程中运行时，多个转发Host看到同一个PID
+            "pid": os.getpid(),
+            "coalescing": coalescer.stats(),
+            "launches": registry.stats(),
+            "chrome_args": chrome_flags.cache_stats()
+        }
+        return {"success": True, "stats": stats}
+    
+    if isinstance(message, dict) and "url" in message:
+        url = message["url"]
+        chrome_args = message.get("chromeArgs", "--new-window")
+        source = message.get("source", "unknown")
+        
+        logging.info("处理来自 %s 的请求: %s", source, url)
+        
+        # 启动Chrome
+        return launch_chrome(url, chrome_args, watches)
+    
+    logging.warning("无效消息格式: %s", message)
+    return {
+        "success": False,
+        "error": "无效的消息格式"
+    }
+
 def signal_handler(signum, frame):
     """信号处理器"""
     logging.info(f"收到信号 {signum}，准备退出")
     sys.exit(0)
 
-def main():
-    """主程序 - Edge终极适配版"""
+def main(stdin=None, import_time=None):
+    """主程序 - Edge终极适配版
+
+    快速启动入口先读取第一帧再导入本模块，读出的数据和导入耗时通过stdin、import_time传入
+    """
     setup_logging()
     
+    if import_time is not None:
+        logging.info("快速启动: 收到第一帧后导入耗时 %.1f 毫秒", import_time * 1000)
+    
     # 设置信号处理
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
     
+    watchdog = None
+    if PERSISTENT_MODE and IDLE_TIMEOUT > 0:
+        watchdog = IdleWatchdog(IDLE_TIMEOUT)
+    
     try:
-        logging.info("进入Edge终极适配主循环")
-        
-        # Edge通常只发送一个消息
-        message = read_input()
-        
-        if message is None:
-            logging.warning("未收到有效消息")
-            # 发送错误响应
-            error_response = {
-                "success": False,
-                "error": "未收到有效消息"
-            }
-            send_output(error_response)
-            return
+        logging.info(f"进入Edge终极适配主循环 (常驻模式: {PERSISTENT_MODE})")
         
-        # 处理消息
-        if isinstance(message, dict) and "url" in message:
-            url = message["url"]
-            chrome_args = message.get("chromeArgs", "--new-window")
-            source = message.get("source", "unknown")
+        handled = 0
+        while True:
+            if watchdog:
+                watchdog.reset()
             
-            logging.info(f"处理来自 {source} 的请求: {url}")
+            span = RequestSpan()
+            try:
+                message = read_input(span, stdin)
+            except nativemsg.MalformedMessage as e:
+                # 只有这一个消息无效，回复错误后继续读取下一个消息
+                send_output({"success": False, "error": f"读取消息失败: {e}"})
+                handled += 1
+                if PERSISTENT_MODE:
+                    continue
+                break
+            finally:
+                if watchdog:
+                    watchdog.cancel()
             
-            # 启动Chrome
-            result = launch_chrome(url, chrome_args)
+            if message is None:
+                if handled == 0:
+                    logging.warning("未收到有效消息")
+                    # 发送错误响应
+                    error_response = {
+                        "success": False,
+                        "error": "未收到有效消息"
+                    }
+                    send_output(error_response)
+                else:
+                    logging.info("连接已关闭")
+                break
             
-            # 发送响应
-            success = send_output(result)
+            # 处理消息并发送响应（合并启动的请求稍后从计时器线程响应）
+            span.describe(message)
+            with request_trace.activate(span):
+                submit_message(message, span.wrap_reply(send_output))
+            handled += 1
             
-            if success:
-                logging.info("响应发送成功，程序即将退出")
-            else:
-                logging.error("响应发送失败")
-                
-        else:
-            logging.warning(f"无效消息格式: {message}")
-            error_response = {
-                "success": False,
-                "error": "无效的消息格式"
-            }
-            send_output(error_response)
+            # 非常驻模式下处理完一个消息就退出
+            if not PERSISTENT_MODE:
+                break
+        
+        # 连接关闭前启动仍在合并窗口中的请求，并等待启动校验结果推送完毕
+        coalescer.flush()
+        watcher.wait()
         
-        # Edge Native Host在处理完一个消息后应该退出
-        logging.info("消息处理完成，正常退出")
+        logging.info(f"消息处理完成，共处理 {handled} 个消息，正常退出")
+        if coalescer.requests:
+            logging.info(f"启动合并统计: {coalescer.stats()}")
+        if registry.launched:
+            logging.info(f"启动统计: {registry.stats()}")
         
     except Exception as e:
         logging.error(f"主程序异常: {e}")
@@ -313,13 +843,12 @@ def main():
             pass
     
     finally:
+        if watchdog:
+            watchdog.cancel()
         logging.info("程序结束")
         # 确保输出完全刷新
         try:
             sys.stdout.buffer.flush()
-            sys.stdout.flush()
-            if hasattr(os, 'fsync'):
-                os.fsync(sys.stdout.fileno())
         except:
             pass
 
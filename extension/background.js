@@ -6,113 +6,325 @@ chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
   console.log('[Edge2Chrome] 收到请求:', request);
   
   if (request.action === 'openInChrome') {
-    handleChromeRequest(request, sendResponse);
+    handleChromeRequest(request, sender, sendResponse);
     return true; // 保持异步通道开启
   }
   
+  if (request.action === 'openUrlsInChrome') {
+    handleChromeBatchRequest(request, sender, sendResponse);
+    return true;
+  }
+  
+  if (request.action === 'classifyLinks') {
+    handleClassifyRequest(request, sendResponse);
+    return true;
+  }
+  
   return false;
 });
 
-function handleChromeRequest(request, sendResponse) {
-  console.log('[Edge2Chrome] 处理Chrome请求:', request.url);
+// Native Host连接：Host回复过带请求ID的响应（v2协议的常驻Host）后，多个请求复用同一个端口；
+// 在此之前的端口可能连着旧版或单次Host（处理一个消息就退出），每个请求使用新端口
+let nativePort = null;
+// 等待响应的请求: id -> { message, port, sendResponse, timer, resent }，Map保持发送顺序
+const pendingRequests = new Map();
+let nextRequestId = 1;
+// 回复过带请求ID响应的端口，按id匹配响应；其他端口的Host按顺序逐个响应
+const idPorts = new WeakSet();
+// 已响应、等待启动校验结果的请求: id -> 发起请求的标签页id
+const launchTabs = new Map();
+
+const NATIVE_HOST_NAME = 'com.edge2chrome.launcher';
+const PROTOCOL_VERSION = 2;
+const REQUEST_TIMEOUT = 3000;
+// Host在启动后约2秒内推送校验结果，超过这个时间不再等待
+const LAUNCH_STATUS_TIMEOUT = 10000;
+
+function hostSupportsIds(port) {
+  return idPorts.has(port);
+}
+
+function getNativePort() {
+  if (nativePort && hostSupportsIds(nativePort)) {
+    return nativePort;
+  }
+  
+  nativePort = connectNativePort();
+  return nativePort;
+}
+
+function connectNativePort() {
+  console.log('[Edge2Chrome] 创建Native Host连接...');
   
-  // 立即响应避免超时
-  let responseHandled = false;
+  const port = chrome.runtime.connectNative(NATIVE_HOST_NAME);
   
-  try {
-    console.log('[Edge2Chrome] 创建Native Host连接...');
+  // 监听响应
+  port.onMessage.addListener((response) => {
+    console.log('[Edge2Chrome] 收到Native Host响应:', response);
     
-    // 创建Native Host连接
-    const nativePort = chrome.runtime.connectNative('com.edge2chrome.launcher');
+    // 启动校验结果在响应之后推送，不对应等待中的请求
+    if (response && response.type === 'launchStatus') {
+      handleLaunchStatus(response);
+      return;
+    }
     
-    // 连接超时保护
-    const connectionTimeout = setTimeout(() => {
-      if (!responseHandled) {
-        console.error('[Edge2Chrome] Native Host连接超时');
-        responseHandled = true;
-        
-        try {
-          nativePort.disconnect();
-        } catch (e) {}
-        
-        sendResponse({
-          success: false,
-          error: 'Native Host连接超时'
-        });
+    if (response && response.id !== undefined && !hostSupportsIds(port)) {
+      idPorts.add(port);
+      // 第一个确认支持v2协议的端口成为复用的端口
+      if (!nativePort || !hostSupportsIds(nativePort)) {
+        nativePort = port;
       }
-    }, 3000); // 减少到3秒
+    }
     
-    // 监听响应
-    nativePort.onMessage.addListener((response) => {
-      console.log('[Edge2Chrome] 收到Native Host响应:', response);
-      
-      if (!responseHandled) {
-        responseHandled = true;
-        clearTimeout(connectionTimeout);
-        
-        // 立即发送响应
-        sendResponse({
-          success: true,
-          response: response
-        });
-        
-        // 断开连接
-        try {
-          nativePort.disconnect();
-        } catch (e) {
-          console.log('[Edge2Chrome] 断开连接时出错:', e);
-        }
-      }
-    });
+    const requestId = takePendingId(port, response);
+    if (requestId === null) {
+      console.warn('[Edge2Chrome] 收到未匹配的响应:', response);
+      return;
+    }
     
-    // 监听连接断开
-    nativePort.onDisconnect.addListener(() => {
-      console.log('[Edge2Chrome] Native Host连接断开');
-      clearTimeout(connectionTimeout);
-      
-      if (!responseHandled) {
-        responseHandled = true;
-        
-        let errorMessage = 'Native Host连接断开';
-        
-        if (chrome.runtime.lastError) {
-          console.error('[Edge2Chrome] 连接错误:', chrome.runtime.lastError);
-          errorMessage = `连接失败: ${chrome.runtime.lastError.message}`;
-        }
-        
-        sendResponse({
-          success: false,
-          error: errorMessage
-        });
-      }
+    const pending = pendingRequests.get(requestId);
+    pendingRequests.delete(requestId);
+    
+    clearTimeout(pending.timer);
+    pending.sendResponse({
+      success: true,
+      response: response
     });
     
-    // 构造消息
-    const message = {
-      url: request.url,
-      source: 'edge-ultimate',
-      chromeArgs: request.chromeArgs || '--new-window',
-      timestamp: Date.now()
-    };
+    releasePort(port);
+  });
+  
+  // 监听连接断开（Host退出、空闲超时或出错）
+  port.onDisconnect.addListener(() => {
+    console.log('[Edge2Chrome] Native Host连接断开');
+    
+    let errorMessage = 'Native Host连接断开';
     
-    console.log('[Edge2Chrome] 发送消息到Native Host:', message);
+    if (chrome.runtime.lastError) {
+      console.error('[Edge2Chrome] 连接错误:', chrome.runtime.lastError);
+      errorMessage = `连接失败: ${chrome.runtime.lastError.message}`;
+    }
+    
+    if (nativePort === port) {
+      nativePort = null;
+    }
+    resendPortRequests(port, errorMessage);
+  });
+  
+  return port;
+}
+
+// 找到响应对应的请求：v2响应按id匹配，v1响应对应这个端口上最早发出的请求
+function takePendingId(port, response) {
+  if (response && response.id !== undefined) {
+    // 已超时的请求不再匹配，避免错配给其他请求
+    const pending = pendingRequests.get(response.id);
+    return pending && pending.port === port ? response.id : null;
+  }
+  
+  for (const [requestId, pending] of pendingRequests) {
+    if (pending.port === port) {
+      return requestId;
+    }
+  }
+  return null;
+}
+
+function hasPendingRequests(port) {
+  for (const pending of pendingRequests.values()) {
+    if (pending.port === port) {
+      return true;
+    }
+  }
+  return false;
+}
+
+// 不再复用的端口在启动校验结果到达后断开，Host进程不必等到空闲超时才退出
+function releasePort(port) {
+  const idle = () => !(port === nativePort && hostSupportsIds(port)) && !hasPendingRequests(port);
+  if (!idle()) {
+    return;
+  }
+  
+  setTimeout(() => {
+    if (idle()) {
+      closePort(port);
+    }
+  }, LAUNCH_STATUS_TIMEOUT);
+}
+
+// 启动失败时通知发起请求的标签页，成功时不打扰
+function handleLaunchStatus(status) {
+  const tabId = launchTabs.get(status.id);
+  
+  if (status.success || tabId === undefined) {
+    return;
+  }
+  
+  console.error('[Edge2Chrome] Chrome启动失败:', status);
+  
+  chrome.tabs.sendMessage(tabId, {
+    action: 'chromeLaunchFailed',
+    urls: status.urls,
+    error: status.error
+  }).catch((error) => {
+    console.log('[Edge2Chrome] 无法通知标签页:', error.message);
+  });
+}
+
+function failRequest(requestId, errorMessage) {
+  const pending = pendingRequests.get(requestId);
+  if (!pending) {
+    return;
+  }
+  
+  pendingRequests.delete(requestId);
+  clearTimeout(pending.timer);
+  pending.sendResponse({
+    success: false,
+    error: errorMessage
+  });
+}
+
+function failPortRequests(port, errorMessage) {
+  pendingRequests.forEach((pending, requestId) => {
+    if (pending.port === port) {
+      failRequest(requestId, errorMessage);
+    }
+  });
+}
+
+// 连接断开时端口上未响应的请求（例如单次Host只处理了第一个消息）在新端口上重发一次
+function resendPortRequests(port, errorMessage) {
+  const unanswered = [];
+  pendingRequests.forEach((pending, requestId) => {
+    if (pending.port === port) {
+      unanswered.push(requestId);
+    }
+  });
+  
+  for (const requestId of unanswered) {
+    const pending = pendingRequests.get(requestId);
+    if (pending.resent) {
+      failRequest(requestId, errorMessage);
+      continue;
+    }
+    
+    console.log('[Edge2Chrome] 重发未响应的请求:', requestId);
+    pending.resent = true;
+    postRequest(requestId, pending);
+  }
+}
+
+function closePort(port) {
+  if (nativePort === port) {
+    nativePort = null;
+  }
+  
+  try {
+    port.disconnect();
+  } catch (e) {
+    console.log('[Edge2Chrome] 断开连接时出错:', e);
+  }
+}
+
+function postRequest(requestId, pending) {
+  try {
+    pending.port = null;
+    const port = getNativePort();
+    pending.port = port;
+    
+    console.log('[Edge2Chrome] 发送消息到Native Host:', pending.message);
     
     // 发送消息
-    nativePort.postMessage(message);
+    port.postMessage(pending.message);
     
   } catch (error) {
     console.error('[Edge2Chrome] 连接异常:', error);
     
-    if (!responseHandled) {
-      responseHandled = true;
-      sendResponse({
-        success: false,
-        error: `连接异常: ${error.message}`
-      });
+    if (pending.port) {
+      closePort(pending.port);
+      failPortRequests(pending.port, `连接异常: ${error.message}`);
+    } else {
+      failRequest(requestId, `连接异常: ${error.message}`);
     }
   }
 }
 
+// 发送一个请求到Native Host，同一端口上可以同时有多个请求等待响应
+function sendNativeRequest(message, sendResponse, tabId) {
+  const requestId = nextRequestId++;
+  const pending = {
+    message: Object.assign({ v: PROTOCOL_VERSION, id: requestId }, message),
+    port: null,
+    sendResponse: sendResponse,
+    timer: null,
+    resent: false
+  };
+  
+  if (tabId !== undefined) {
+    launchTabs.set(requestId, tabId);
+    setTimeout(() => launchTabs.delete(requestId), LAUNCH_STATUS_TIMEOUT);
+  }
+  
+  pending.timer = setTimeout(() => {
+    console.error('[Edge2Chrome] Native Host响应超时:', requestId);
+    
+    const port = pending.port;
+    if (port && hostSupportsIds(port)) {
+      // 按id匹配，只有这个请求失败
+      failRequest(requestId, 'Native Host响应超时');
+    } else {
+      // 顺序响应已无法保证，断开这个端口
+      if (port) {
+        closePort(port);
+        failPortRequests(port, 'Native Host响应超时');
+      }
+      failRequest(requestId, 'Native Host响应超时');
+    }
+  }, REQUEST_TIMEOUT);
+  
+  pendingRequests.set(requestId, pending);
+  postRequest(requestId, pending);
+}
+
+function handleChromeRequest(request, sender, sendResponse) {
+  console.log('[Edge2Chrome] 处理Chrome请求:', request.url);
+  
+  sendNativeRequest({
+    url: request.url,
+    source: 'edge-ultimate',
+    chromeArgs: request.chromeArgs || '--new-window',
+    timestamp: Date.now()
+  }, sendResponse, sender.tab && sender.tab.id);
+}
+
+// 批量请求：所有URL通过一次Chrome启动打开
+// 来自popup的请求没有sender.tab，由popup带上当前标签页id
+function handleChromeBatchRequest(request, sender, sendResponse) {
+  console.log('[Edge2Chrome] 处理Chrome批量请求:', request.urls.length);
+  
+  sendNativeRequest({
+    urls: request.urls,
+    source: 'edge-ultimate',
+    chromeArgs: request.chromeArgs || '--new-window',
+    timestamp: Date.now()
+  }, sendResponse, sender.tab ? sender.tab.id : request.tabId);
+}
+
+// 整页链接分类：Native Host按规则索引一次判断全部链接，响应中的bitmap为base64编码的位图，
+// 第i个链接匹配时第i//8字节的第i%8位为1；不带rules时使用Host配置的规则文件
+// 结果与content.js中的shouldOpenInChrome（url_matcher.js）相同；只有含正则语法的规则由Python的re解释，
+// Python与JS正则语法不同的部分（例如命名分组）可能得到不同的结果
+function handleClassifyRequest(request, sendResponse) {
+  const message = { type: 'classify', hrefs: request.hrefs };
+  if (Array.isArray(request.rules)) {
+    message.rules = request.rules;
+  }
+  
+  sendNativeRequest(message, sendResponse);
+}
+
 // 扩展生命周期事件
 chrome.runtime.onInstalled.addListener((details) => {
   console.log('[Edge2Chrome] 扩展安装/更新:', details.reason);
@@ -1,5 +1,7 @@
 // Edge2Chrome Content Script
 let currentSettings = null;
+// 由urlRules编译的匹配器（url_matcher.js），只在设置加载和更改时重新编译
+let urlMatcher = null;
 
 const defaultSettings = {
   urlRules: ['*.zhihu.*'],
@@ -17,6 +19,15 @@ async function loadSettings() {
     console.error('[Edge2Chrome] 加载设置失败:', error);
     currentSettings = defaultSettings;
   }
+  
+  // 规则未改变时复用已编译的匹配器；缓存的结果和命中统计都只对应当前规则
+  urlMatcher = UrlMatcher.compile(currentSettings.urlRules);
+  matchCache.clear();
+  matchCacheStats.hits = 0;
+  matchCacheStats.misses = 0;
+  if (urlMatcher.invalidRules.length > 0) {
+    log('无效的规则:', urlMatcher.invalidRules);
+  }
 }
 
 function log(...args) {
@@ -25,103 +36,255 @@ function log(...args) {
   }
 }
 
-function wildcardMatch(pattern, text) {
-  try {
-    const regex = new RegExp(
-      '^' + pattern.replace(/\*/g, '.*').replace(/\?/g, '.') + '$',
-      'i'
-    );
-    return regex.test(text);
-  } catch (e) {
-    log('正则表达式错误:', e);
-    return false;
+// href -> 是否匹配 的LRU缓存：同一页面中相同的链接（作者、话题等）反复出现时只匹配一次
+// Map按插入顺序迭代，命中时重新插入即为最近使用；设置更改时清空
+const MATCH_CACHE_SIZE = 2000;
+const matchCache = new Map();
+const matchCacheStats = { hits: 0, misses: 0 };
+
+function shouldOpenInChrome(url) {
+  if (urlMatcher === null) return false;
+  
+  const cached = matchCache.get(url);
+  if (cached !== undefined) {
+    matchCacheStats.hits++;
+    matchCache.delete(url);
+    matchCache.set(url, cached);
+    return cached;
   }
+  
+  matchCacheStats.misses++;
+  const matched = urlMatcher.test(url);
+  matchCache.set(url, matched);
+  if (matchCache.size > MATCH_CACHE_SIZE) {
+    // 删除最久未使用的一项
+    matchCache.delete(matchCache.keys().next().value);
+  }
+  return matched;
 }
 
-function shouldOpenInChrome(url) {
-  if (!currentSettings || !currentSettings.urlRules || !Array.isArray(currentSettings.urlRules)) {
-    return false;
+// 已检查过的链接（无论是否匹配）；设置更改后重新创建
+let visitedLinks = new WeakSet();
+// 等待扫描的新增节点，由MutationObserver记录
+const pendingRoots = new Set();
+
+// 匹配的链接进入视口（提前200px）时才创建按钮；不支持IntersectionObserver时立即创建
+const buttonObserver = typeof IntersectionObserver === 'function'
+  ? new IntersectionObserver(onLinksVisible, { rootMargin: '200px' })
+  : null;
+
+function onLinksVisible(entries) {
+  for (const entry of entries) {
+    if (!entry.isIntersecting) continue;
+    
+    buttonObserver.unobserve(entry.target);
+    createChromeButton(entry.target);
   }
+}
+
+// 标记匹配的链接，按钮稍后创建
+function addChromeButton(link) {
+  link.dataset.edge2chromeAdded = 'true';
   
-  try {
-    return currentSettings.urlRules.some(rule => wildcardMatch(rule, url));
-  } catch (e) {
-    log('URL匹配错误:', e);
-    return false;
+  if (buttonObserver) {
+    buttonObserver.observe(link);
+  } else {
+    createChromeButton(link);
   }
 }
 
-function addChromeButtons() {
-  if (!currentSettings) return;
+// 被移除的子树中还在等待进入视口的链接停止监听，避免虚拟列表、无限滚动页面不断积累已脱离文档的节点；
+// 同时清除标记，节点重新插入时作为新增节点再检查
+function releaseRemovedLinks(root) {
+  if (!buttonObserver || root.nodeType !== Node.ELEMENT_NODE) return;
   
-  const links = document.querySelectorAll('a[href]');
-  let addedCount = 0;
+  const links = root.matches('[data-edge2chrome-added]')
+    ? [root, ...root.querySelectorAll('[data-edge2chrome-added]')]
+    : root.querySelectorAll('[data-edge2chrome-added]');
+  
+  for (const link of links) {
+    // 已有按钮的链接不再被监听
+    if (!link.querySelector('.edge2chrome-btn')) {
+      resetLink(link);
+    }
+  }
+}
+
+function createChromeButton(link) {
+  // 设置更改后标记已清除，或按钮已存在
+  if (!link.dataset.edge2chromeAdded || link.querySelector('.edge2chrome-btn')) return;
   
-  links.forEach(link => {
+  const chromeBtn = document.createElement('span');
+  chromeBtn.className = 'edge2chrome-btn';
+  chromeBtn.textContent = `🌐 ${currentSettings.buttonText}`;
+  chromeBtn.title = `用Chrome打开: ${link.href}`;
+  
+  link.style.position = 'relative';
+  link.appendChild(chromeBtn);
+}
+
+// 清除链接的标记、按钮和可见性监听，之后重新检查时按当前地址判断
+function resetLink(link) {
+  link.removeAttribute('data-edge2chrome-added');
+  const btn = link.querySelector('.edge2chrome-btn');
+  if (btn) btn.remove();
+  if (buttonObserver) buttonObserver.unobserve(link);
+  visitedLinks.delete(link);
+}
+
+function openInChrome(href) {
+  log('准备用Chrome打开:', href);
+  
+  chrome.runtime.sendMessage({
+    action: 'openInChrome',
+    url: href,
+    chromeArgs: currentSettings.chromeArgs
+  }).then((response) => {
+    if (response && response.success) {
+      log('✅ 成功发送到Chrome');
+      if (currentSettings.showNotifications) {
+        showNotification('已用Chrome打开链接', 'success');
+      }
+    } else {
+      const errorMsg = response ? response.error : '未知错误';
+      log('❌ 发送失败:', errorMsg);
+      if (currentSettings.showNotifications) {
+        showNotification(`打开失败: ${errorMsg}`, 'error');
+      }
+      
+      console.error('[Edge2Chrome] 详细错误信息:', {
+        url: href,
+        response: response,
+        currentSettings: currentSettings
+      });
+    }
+  }).catch((error) => {
+    log('❌ 通信错误:', error);
+    if (currentSettings.showNotifications) {
+      showNotification(`扩展通信错误: ${error.message}`, 'error');
+    }
+    
+    console.error('[Edge2Chrome] 通信异常:', error);
+  });
+}
+
+// 所有按钮共用一个点击监听器；在捕获阶段处理，阻止链接本身的跳转和页面的点击处理
+document.addEventListener('click', (e) => {
+  const chromeBtn = e.target instanceof Element ? e.target.closest('.edge2chrome-btn') : null;
+  if (!chromeBtn) return;
+  
+  e.preventDefault();
+  e.stopPropagation();
+  
+  const link = chromeBtn.closest('a[href]');
+  if (link && currentSettings) {
+    openInChrome(link.href);
+  }
+}, true);
+
+// 检查root（document或元素）及其子树中尚未检查过的链接
+function scanLinks(root) {
+  const result = { checked: 0, matched: 0 };
+  const links = root.nodeType === Node.ELEMENT_NODE && root.matches('a[href]')
+    ? [root, ...root.querySelectorAll('a[href]')]
+    : root.querySelectorAll('a[href]');
+  
+  for (const link of links) {
+    if (visitedLinks.has(link)) continue;
+    visitedLinks.add(link);
+    result.checked++;
+    
     const href = link.href;
     
     if (!href || href.startsWith('javascript:') || href.startsWith('mailto:') || href.startsWith('tel:')) {
-      return;
+      continue;
     }
     
     if (shouldOpenInChrome(href) && !link.dataset.edge2chromeAdded) {
-      link.dataset.edge2chromeAdded = 'true';
-      
-      const chromeBtn = document.createElement('span');
-      chromeBtn.className = 'edge2chrome-btn';
-      chromeBtn.innerHTML = `🌐 ${currentSettings.buttonText}`;
-      chromeBtn.title = `用Chrome打开: ${href}`;
-      
-      chromeBtn.addEventListener('click', (e) => {
-        e.preventDefault();
-        e.stopPropagation();
-        
-        log('准备用Chrome打开:', href);
-        
-        chrome.runtime.sendMessage({
-          action: 'openInChrome',
-          url: href,
-          chromeArgs: currentSettings.chromeArgs
-        }).then((response) => {
-          if (response && response.success) {
-            log('✅ 成功发送到Chrome');
-            if (currentSettings.showNotifications) {
-              showNotification('已用Chrome打开链接', 'success');
-            }
-          } else {
-            const errorMsg = response ? response.error : '未知错误';
-            log('❌ 发送失败:', errorMsg);
-            if (currentSettings.showNotifications) {
-              showNotification(`打开失败: ${errorMsg}`, 'error');
-            }
-            
-            console.error('[Edge2Chrome] 详细错误信息:', {
-              url: href,
-              response: response,
-              currentSettings: currentSettings
-            });
-          }
-        }).catch((error) => {
-          log('❌ 通信错误:', error);
-          if (currentSettings.showNotifications) {
-            showNotification(`扩展通信错误: ${error.message}`, 'error');
-          }
-          
-          console.error('[Edge2Chrome] 通信异常:', error);
-        });
-      });
-      
-      link.style.position = 'relative';
-      link.appendChild(chromeBtn);
-      addedCount++;
+      addChromeButton(link);
+      result.matched++;
     }
-  });
+  }
+  
+  return result;
+}
+
+function logScan(scope, result, startTime) {
+  if (!currentSettings.enableLogging) return;
+  
+  const elapsed = (performance.now() - startTime).toFixed(1);
+  log(`扫描${scope}: 检查 ${result.checked} 个链接，匹配 ${result.matched} 个，耗时 ${elapsed}ms`);
+}
+
+// 扫描整个页面（页面加载和设置更改时）
+function addChromeButtons() {
+  if (!currentSettings) return;
   
-  if (addedCount > 0) {
-    log(`添加了 ${addedCount} 个Chrome按钮`);
+  const startTime = performance.now();
+  logScan('整个页面', scanLinks(document), startTime);
+}
+
+// 只扫描新增的子树，长页面不断加载内容时不重复扫描已有链接
+function scanPendingRoots() {
+  if (!currentSettings) return;
+  
+  const startTime = performance.now();
+  const total = { checked: 0, matched: 0 };
+  let roots = 0;
+  
+  for (const root of pendingRoots) {
+    // 扫描前已被移除的节点
+    if (!root.isConnected) continue;
+    
+    const result = scanLinks(root);
+    total.checked += result.checked;
+    total.matched += result.matched;
+    roots++;
   }
+  pendingRoots.clear();
+  
+  logScan(` ${roots} 个新增节点`, total, startTime);
+}
+
+// 收集本页所有匹配规则的链接（去重），供popup批量打开
+function collectMatchedLinks() {
+  const urls = new Set();
+  
+  document.querySelectorAll('a[href]').forEach(link => {
+    const href = link.href;
+    if (href && /^https?:/i.test(href) && shouldOpenInChrome(href)) {
+      urls.add(href);
+    }
+  });
+  
+  return Array.from(urls);
 }
 
+chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
+  if (request.action === 'collectMatchedLinks') {
+    sendResponse({
+      urls: currentSettings ? collectMatchedLinks() : [],
+      chromeArgs: currentSettings ? currentSettings.chromeArgs : defaultSettings.chromeArgs
+    });
+  }
+  
+  // popup显示匹配缓存的命中情况
+  if (request.action === 'getMatchCacheStats') {
+    sendResponse({
+      hits: matchCacheStats.hits,
+      misses: matchCacheStats.misses,
+      size: matchCache.size,
+      capacity: MATCH_CACHE_SIZE
+    });
+  }
+  
+  // Native Host启动校验失败（响应时已报告成功）
+  if (request.action === 'chromeLaunchFailed') {
+    showNotification(`Chrome启动失败: ${request.error}`, 'error');
+  }
+  return false;
+});
+
 function showNotification(message, type = 'info') {
   if (!currentSettings || !currentSettings.showNotifications) return;
   
@@ -152,6 +315,9 @@ chrome.storage.onChanged.addListener((changes, namespace) => {
         const btn = link.querySelector('.edge2chrome-btn');
         if (btn) btn.remove();
       });
+      // 规则可能已改变，所有链接重新检查
+      if (buttonObserver) buttonObserver.disconnect();
+      visitedLinks = new WeakSet();
       addChromeButtons();
     });
   }
@@ -176,31 +342,38 @@ loadSettings().then(() => {
     addChromeButtons();
   }
   
-  const debouncedAddButtons = debounce(addChromeButtons, 200);
+  const debouncedScan = debounce(scanPendingRoots, 200);
   
+  // 只记录新增的节点，扫描时只处理这些子树；移除的节点释放可见性监听
   const observer = new MutationObserver((mutations) => {
-    let shouldCheck = false;
-    
-    mutations.forEach((mutation) => {
-      if (mutation.type === 'childList' && mutation.addedNodes.length > 0) {
-        for (let node of mutation.addedNodes) {
-          if (node.nodeType === Node.ELEMENT_NODE) {
-            if (node.tagName === 'A' || node.querySelector('a')) {
-              shouldCheck = true;
-              break;
-            }
-          }
+    for (const mutation of mutations) {
+      if (mutation.type === 'attributes') {
+        // 链接地址改变：旧地址的按钮可能已不匹配，清除后重新检查
+        resetLink(mutation.target);
+        pendingRoots.add(mutation.target);
+        continue;
+      }
+      
+      for (const node of mutation.removedNodes) {
+        releaseRemovedLinks(node);
+      }
+      
+      for (const node of mutation.addedNodes) {
+        if (node.nodeType === Node.ELEMENT_NODE && !node.classList.contains('edge2chrome-btn')) {
+          pendingRoots.add(node);
         }
       }
-    });
+    }
     
-    if (shouldCheck) {
-      debouncedAddButtons();
+    if (pendingRoots.size > 0) {
+      debouncedScan();
     }
   });
   
   observer.observe(document.body, {
     childList: true,
-    subtree: true
+    subtree: true,
+    attributes: true,
+    attributeFilter: ['href']
   });
 });
\ No newline at end of file
@@ -5,15 +5,21 @@ Edge2Chrome Native Host
 将来自Edge扩展的请求转发给Chrome浏览器
 """
 
-import json
 import sys
-import struct
 import subprocess
 import os
 import logging
-from datetime import datetime
 import traceback
 
+# nativemsg.py 安装后与本脚本位于同一目录，开发时位于项目根目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nativemsg
+from host_logging import setup_host_logging
+from chrome_locator import ChromeLocator
+from chrome_flags import parse_chrome_args
+from launch_registry import LaunchRegistry
+
 # Chrome可执行文件可能的路径
 CHROME_PATHS = [
     r"C:\Program Files\Google\Chrome\Application\chrome.exe",
@@ -23,6 +29,9 @@ CHROME_PATHS = [
     r"C:\Program Files (x86)\Google\Chrome Beta\Application\chrome.exe",
 ]
 
+# 启动的Chrome进程登记在这里，由后台线程回收，循环模式下不积累僵尸进程
+registry = LaunchRegistry()
+
 # 日志设置
 def setup_logging():
     log_dir = r"C:\edge2chrome_logs"
@@ -30,12 +39,8 @@ def setup_logging():
         os.makedirs(log_dir, exist_ok=True)
         log_file = os.path.join(log_dir, "edge2chrome.log")
         
-        logging.basicConfig(
-            filename=log_file,
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            encoding='utf-8'
-        )
+        # 与其他Native Host相同：后台线程写入、按大小滚动；本脚本一直只写日志文件，不输出到stderr
+        setup_host_logging(log_file, stderr=False)
         logging.info("=" * 50)
         logging.info("Edge2Chrome Native Host 启动")
         logging.info("=" * 50)
@@ -46,72 +51,40 @@ def setup_logging():
 def send_message(message):
     """发送消息给Edge扩展"""
     try:
-        encoded_content = json.dumps(message, ensure_ascii=False).encode('utf-8')
-        encoded_length = struct.pack('<I', len(encoded_content))
-        sys.stdout.buffer.write(encoded_length)
-        sys.stdout.buffer.write(encoded_content)
-        sys.stdout.buffer.flush()
-        logging.info(f"发送消息: {message}")
+        nativemsg.write_message(sys.stdout.buffer, message)
+        logging.info("发送消息: %s", message)
     except Exception as e:
-        logging.error(f"发送消息失败: {e}")
+        logging.error("发送消息失败: %s", e)
         logging.error(traceback.format_exc())
 
 def read_message():
     """从Edge扩展读取消息"""
     try:
-        # 读取消息长度（4字节）
-        raw_length = sys.stdin.buffer.read(4)
-        if not raw_length:
+        parsed_message = nativemsg.read_message(sys.stdin.buffer)
+        if parsed_message is None:
             return None
         
-        message_length = struct.unpack('<I', raw_length)[0]
-        
-        # 读取消息内容
-        message = sys.stdin.buffer.read(message_length).decode('utf-8')
-        parsed_message = json.loads(message)
-        logging.info(f"收到消息: {parsed_message}")
+        logging.info("收到消息: %s", parsed_message)
         return parsed_message
     except Exception as e:
-        logging.error(f"读取消息失败: {e}")
+        logging.error("读取消息失败: %s", e)
         logging.error(traceback.format_exc())
         send_message({"error": f"读取消息失败: {str(e)}"})
         return None
 
+# Chrome路径缓存，多个Host进程共用；缓存有效时每次请求只需一次stat
+chrome_locator = ChromeLocator(CHROME_PATHS)
+
 def find_chrome():
     """查找Chrome可执行文件"""
-    for path in CHROME_PATHS:
-        if os.path.exists(path):
-            logging.info(f"找到Chrome: {path}")
-            return path
+    path = chrome_locator.find()
+    if path:
+        logging.info("找到Chrome: %s", path)
+        return path
     
     logging.error("未找到Chrome浏览器")
     return None
 
-def parse_chrome_args(args_string):
-    """解析Chrome启动参数"""
-    if not args_string:
-        return ["--new-window"]
-    
-    # 简单的参数分割，支持引号
-    args = []
-    current_arg = ""
-    in_quotes = False
-    
-    for char in args_string:
-        if char == '"':
-            in_quotes = not in_quotes
-        elif char == ' ' and not in_quotes:
-            if current_arg:
-                args.append(current_arg)
-                current_arg = ""
-        else:
-            current_arg += char
-    
-    if current_arg:
-        args.append(current_arg)
-    
-    return args if args else ["--new-window"]
-
 def open_chrome(url, chrome_args="--new-window"):
     """使用Chrome打开URL"""
     try:
@@ -128,7 +101,7 @@ def open_chrome(url, chrome_args="--new-window"):
         # 构建命令行参数
         cmd = [chrome_path] + args + [url]
         
-        logging.info(f"执行命令: {' '.join(cmd)}")
+        logging.info("执行命令: %s", cmd)
         
         # 启动Chrome
         process = subprocess.Popen(
@@ -137,8 +110,9 @@ def open_chrome(url, chrome_args="--new-window"):
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL
         )
+        registry.register(process, [url])
         
-        logging.info(f"Chrome进程已启动，PID: {process.pid}")
+        logging.info("Chrome进程已启动，PID: %s", process.pid)
         
         return {
             "success": True, 
@@ -155,6 +129,71 @@ def open_chrome(url, chrome_args="--new-window"):
         logging.error(traceback.format_exc())
         return {"success": False, "error": error_msg}
 
+def open_chrome_batch(urls, chrome_args="--new-window"):
+    """使用一个Chrome进程打开多个URL，返回每个URL的结果"""
+    valid_urls = []
+    results = []
+    
+    for url in urls:
+        if isinstance(url, str) and url.strip():
+            valid_urls.append(url)
+            results.append({"url": url, "success": False})
+        else:
+            results.append({"url": url, "success": False, "error": "无效的URL"})
+    
+    if not valid_urls:
+        return {"success": False, "error": "没有有效的URL", "results": results}
+    
+    try:
+        chrome_path = find_chrome()
+        if not chrome_path:
+            for result in results:
+                result.setdefault("error", "未找到Chrome浏览器，请检查是否已安装Chrome")
+            return {
+                "success": False, 
+                "error": "未找到Chrome浏览器，请检查是否已安装Chrome",
+                "results": results
+            }
+        
+        # 解析Chrome参数
+        args = parse_chrome_args(chrome_args)
+        
+        # 所有URL放在同一条命令中
+        cmd = [chrome_path] + args + valid_urls
+        
+        logging.info("执行命令: %s", cmd)
+        
+        process = subprocess.Popen(
+            cmd, 
+            shell=False,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        registry.register(process, valid_urls)
+        
+        logging.info("Chrome进程已启动，PID: %s，打开 %s 个链接", process.pid, len(valid_urls))
+        
+        for result in results:
+            if "error" not in result:
+                result.update({"success": True, "pid": process.pid})
+        
+        return {
+            "success": True, 
+            "message": f"已用Chrome打开 {len(valid_urls)} 个链接",
+            "results": results,
+            "chrome_path": chrome_path,
+            "chrome_args": args,
+            "pid": process.pid
+        }
+    
+    except Exception as e:
+        error_msg = f"启动Chrome失败: {str(e)}"
+        logging.error(error_msg)
+        logging.error(traceback.format_exc())
+        for result in results:
+            result.setdefault("error", error_msg)
+        return {"success": False, "error": error_msg, "results": results}
+
 def main():
     """主程序循环"""
     setup_logging()
@@ -165,20 +204,31 @@ def main():
             if message is None:
                 break
             
-            if "url" in message:
+            if message.get("type") == "stats":
+                send_message({"success": True, "stats": {"launches": registry.stats()}})
+            elif isinstance(message.get("urls"), list):
+                urls = message["urls"]
+                source = message.get("source", "unknown")
+                chrome_args = message.get("chromeArgs", "--new-window")
+                
+                logging.info("处理来自%s的批量请求: %s 个URL", source, len(urls))
+                
+                result = open_chrome_batch(urls, chrome_args)
+                send_message(result)
+            elif "url" in message:
                 url = message["url"]
                 source = message.get("source", "unknown")
                 chrome_args = message.get("chromeArgs", "--new-window")
                 timestamp = message.get("timestamp", "")
                 
-                logging.info(f"处理来自{source}的URL请求: {url}")
-                logging.info(f"Chrome参数: {chrome_args}")
+                logging.info("处理来自%s的URL请求: %s", source, url)
+                logging.info("Chrome参数: %s", chrome_args)
                 
                 result = open_chrome(url, chrome_args)
                 send_message(result)
             else:
                 error_msg = "无效的消息格式，缺少url字段"
-                logging.warning(f"无效消息: {message}")
+                logging.warning("无效消息: %s", message)
                 send_message({"error": error_msg})
                 
     except KeyboardInterrupt:
@@ -189,6 +239,7 @@ def main():
         logging.error(traceback.format_exc())
         send_message({"error": error_msg})
     finally:
+        logging.info("启动统计: %s", registry.stats())
         logging.info("Edge2Chrome Native Host 结束")
 
 if __name__ == "__main__":
@@ -52,6 +52,17 @@ def install_native_host():
             print(f"请确保 {python_script} 存在")
             return False
         
+        # 复制共用模块（Native Messaging编解码、启动登记表、Chrome定位、参数解析、日志）
+        for module_name in ("nativemsg.py", "launch_registry.py", "chrome_locator.py", "chrome_flags.py",
+                            "host_logging.py"):
+            shared_module = os.path.join(os.path.dirname(current_dir), module_name)
+            if os.path.exists(shared_module):
+                shutil.copy2(shared_module, os.path.join(install_dir, module_name))
+            else:
+                print(f"❌ 错误: 找不到 {module_name}")
+                print(f"请确保 {shared_module} 存在")
+                return False
+        
         # 创建批处理文件来启动Python脚本
         batch_file = os.path.join(install_dir, "edge2chrome_launcher.bat")
         with open(batch_file, 'w', encoding='utf-8') as f:
@@ -58,20 +58,6 @@ function escapeHtml(text) {
     return div.innerHTML;
 }
 
-// 通配符匹配函数
-function wildcardMatch(pattern, text) {
-    try {
-        const regex = new RegExp(
-            '^' + pattern.replace(/\*/g, '.*').replace(/\?/g, '.') + '$',
-            'i'
-        );
-        return regex.test(text);
-    } catch (e) {
-        console.error('[Edge2Chrome] 正则表达式错误:', e);
-        return false;
-    }
-}
-
 // 测试URL匹配
 async function testUrlMatch() {
     const testUrl = document.getElementById('testUrl').value.trim();
@@ -87,7 +73,11 @@ async function testUrlMatch() {
         const settings = await chrome.storage.sync.get(['urlRules']);
         const rules = settings.urlRules || defaultSettings.urlRules;
         
-        const matchedRules = rules.filter(rule => wildcardMatch(rule, testUrl));
+        const matcher = UrlMatcher.compile(rules);
+        if (matcher.invalidRules.length > 0) {
+            console.error('[Edge2Chrome] 无效的规则:', matcher.invalidRules);
+        }
+        const matchedRules = matcher.matchingRules(testUrl);
         
         if (matchedRules.length > 0) {
             testResult.textContent = `✅ 匹配成功！匹配的规则: ${matchedRules.join(', ')}`;
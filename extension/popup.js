@@ -5,8 +5,10 @@ document.addEventListener('DOMContentLoaded', async () => {
     const addQuickRule = document.getElementById('addQuickRule');
     const openSettings = document.getElementById('openSettings');
     const testCurrent = document.getElementById('testCurrent');
+    const openAllMatched = document.getElementById('openAllMatched');
     const status = document.getElementById('status');
     const ruleCount = document.getElementById('ruleCount');
+    const matchCacheStats = document.getElementById('matchCacheStats');
     
     // 显示状态消息
     function showStatus(message, type = 'success') {
@@ -18,16 +20,6 @@ document.addEventListener('DOMContentLoaded', async () => {
         }, 2500);
     }
     
-    // 通配符匹配函数
-    function wildcardMatch(pattern, text) {
-        try {
-            const regex = new RegExp('^' + pattern.replace(/\*/g, '.*').replace(/\?/g, '.') + '$', 'i');
-            return regex.test(text);
-        } catch (e) {
-            return false;
-        }
-    }
-    
     // 加载并显示当前规则数量
     async function loadRuleCount() {
         try {
@@ -39,8 +31,27 @@ document.addEventListener('DOMContentLoaded', async () => {
         }
     }
     
+    // 显示当前页面的链接匹配缓存命中率
+    async function loadMatchCacheStats() {
+        try {
+            const [tab] = await chrome.tabs.query({ active: true, currentWindow: true });
+            // content script在页面的每个frame中都有一份缓存，只显示顶层页面的统计
+            const stats = await chrome.tabs.sendMessage(tab.id, { action: 'getMatchCacheStats' }, { frameId: 0 });
+            if (!stats) return;
+            
+            const lookups = stats.hits + stats.misses;
+            const hitRate = lookups > 0 ? Math.round(stats.hits * 100 / lookups) : 0;
+            matchCacheStats.textContent =
+                `匹配缓存: 命中 ${stats.hits} / 未命中 ${stats.misses} (${hitRate}%)，缓存 ${stats.size}/${stats.capacity}`;
+        } catch (error) {
+            // 当前页面没有content script（例如浏览器内部页面）
+            matchCacheStats.textContent = '';
+        }
+    }
+    
     // 初始加载
     await loadRuleCount();
+    loadMatchCacheStats();
     
     // 快速添加规则
     addQuickRule.addEventListener('click', async () => {
@@ -95,7 +106,7 @@ document.addEventListener('DOMContentLoaded', async () => {
             const settings = await chrome.storage.sync.get(['urlRules']);
             const rules = settings.urlRules || ['*.zhihu.*'];
             
-            const matchedRules = rules.filter(rule => wildcardMatch(rule, tab.url));
+            const matchedRules = UrlMatcher.compile(rules).matchingRules(tab.url);
             
             if (matchedRules.length > 0) {
                 showStatus(`✅ 匹配 ${matchedRules.length} 条规则`);
@@ -107,4 +118,35 @@ document.addEventListener('DOMContentLoaded', async () => {
             showStatus('测试失败', 'error');
         }
     });
+    
+    // 一次Chrome启动打开本页全部匹配链接
+    openAllMatched.addEventListener('click', async () => {
+        try {
+            const [tab] = await chrome.tabs.query({ active: true, currentWindow: true });
+            const links = await chrome.tabs.sendMessage(tab.id, { action: 'collectMatchedLinks' });
+            
+            if (!links || !links.urls || links.urls.length === 0) {
+                showStatus('本页没有匹配的链接', 'error');
+                return;
+            }
+            
+            const response = await chrome.runtime.sendMessage({
+                action: 'openUrlsInChrome',
+                urls: links.urls,
+                chromeArgs: links.chromeArgs,
+                tabId: tab.id
+            });
+            
+            if (response && response.success && response.response.success) {
+                const opened = response.response.results.filter(result => result.success).length;
+                showStatus(`✅ 已打开 ${opened} 个链接`);
+            } else {
+                const errorMsg = response && response.response ? response.response.error : (response ? response.error : '未知错误');
+                showStatus(`打开失败: ${errorMsg}`, 'error');
+            }
+        } catch (error) {
+            console.error('[Edge2Chrome] 批量打开失败:', error);
+            showStatus('批量打开失败', 'error');
+        }
+    });
 });
\ No newline at end of file
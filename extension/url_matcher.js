@@ -0,0 +1,68 @@
+// Edge2Chrome URL规则匹配
+// content.js、popup.js和options.js共用：规则列表只编译一次，
+// 所有规则合并为一个锚定的正则表达式，匹配一个链接只需执行一次正则
+
+class UrlMatcher {
+  constructor(rules) {
+    this.rules = [];
+    this.invalidRules = [];
+    // 每条规则单独的正则，只在需要知道匹配了哪些规则时使用
+    this.regexes = [];
+    // 含分组、选择或转义的规则合并后含义可能改变（分组编号、|的优先级），单独匹配
+    this.standalone = [];
+
+    const sources = [];
+    for (const rule of Array.isArray(rules) ? rules : []) {
+      if (typeof rule !== 'string') continue;
+
+      const source = UrlMatcher.ruleToSource(rule);
+      let regex;
+      try {
+        regex = new RegExp('^' + source + '$', 'i');
+      } catch (e) {
+        this.invalidRules.push(rule);
+        continue;
+      }
+
+      this.rules.push(rule);
+      this.regexes.push(regex);
+      if (/[(|\\]/.test(source)) {
+        this.standalone.push(regex);
+      } else {
+        sources.push(source);
+      }
+    }
+
+    this.combined = sources.length > 0 ? new RegExp('^(?:' + sources.join('|') + ')$', 'i') : null;
+  }
+
+  // 通配符转为正则：* 匹配任意字符串，? 匹配单个字符，其余字符按正则解释（与原规则语义一致）
+  static ruleToSource(rule) {
+    return rule.replace(/\*/g, '.*').replace(/\?/g, '.');
+  }
+
+  // 相同的规则列表复用已编译的匹配器
+  static compile(rules) {
+    const key = Array.isArray(rules) ? JSON.stringify(rules) : '';
+    if (UrlMatcher.cached && UrlMatcher.cached.key === key) {
+      return UrlMatcher.cached.matcher;
+    }
+    const matcher = new UrlMatcher(rules);
+    UrlMatcher.cached = { key, matcher };
+    return matcher;
+  }
+
+  // URL是否匹配任意一条规则
+  test(url) {
+    if (this.combined && this.combined.test(url)) return true;
+    return this.standalone.some(regex => regex.test(url));
+  }
+
+  // URL匹配的全部规则
+  matchingRules(url) {
+    if (!this.test(url)) return [];
+    return this.rules.filter((rule, i) => this.regexes[i].test(url));
+  }
+}
+
+UrlMatcher.cached = null;
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Edge2Chrome 常驻守护进程
+Edge为每个配置文件、每次扩展Service Worker重启都会启动新的Native Host；
+轻量转发Host（edge2chrome_launcher_edge_shim.py）只把消息帧通过本地Unix套接字（Windows下为命名管道）
+转发给同一个常驻进程，Chrome路径、参数解析缓存、日志和启动登记表在守护进程中一直保持加载，
+每次点击只需一次本地往返
+
+守护进程由转发Host在连接失败时启动，所有连接断开后空闲一段时间自动退出；
+连接地址、认证密钥和客户端连接在daemon_client.py中，转发Host不导入本模块
+"""
+
+import logging
+import os
+import subprocess
+import sys
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+
+import nativemsg
+import request_trace
+from request_trace import RequestSpan
+from daemon_client import END_OF_STREAM, connect, daemon_address, daemon_authkey
+
+# 没有连接后保持运行的时间（秒），EDGE2CHROME_DAEMON_IDLE=0 表示一直运行
+DAEMON_IDLE_TIMEOUT = float(os.getenv('EDGE2CHROME_DAEMON_IDLE', '1800'))
+
+DAEMON_SCRIPT = os.path.abspath(__file__)
+
+def start_daemon():
+    """在后台启动守护进程，不继承转发Host的标准输入输出"""
+    options = {}
+    if sys.platform == "win32":
+        # 脱离Edge为Native Host创建的作业对象，转发Host退出时不被一起结束
+        options["creationflags"] = (subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+                                    | subprocess.CREATE_BREAKAWAY_FROM_JOB)
+    else:
+        options["start_new_session"] = True
+
+    command = [sys.executable, DAEMON_SCRIPT]
+    try:
+        return subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL, close_fds=True, **options)
+    except OSError:
+        if sys.platform != "win32":
+            raise
+        # 作业对象不允许脱离时只能作为子进程运行
+        options["creationflags"] &= ~subprocess.CREATE_BREAKAWAY_FROM_JOB
+        return subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL, close_fds=True, **options)
+
+def setup_logging():
+    """设置日志"""
+    from host_logging import setup_host_logging
+
+    log_dir = r"D:\work\Edge2Chrome\logs"
+    try:
+        os.makedirs(log_dir, exist_ok=True)
+        log_file = os.path.join(log_dir, "edge_daemon.log")
+
+        # 守护进程没有可用的stderr
+        setup_host_logging(log_file, stderr=False,
+                           events_file=os.path.join(log_dir, "edge_daemon.events.jsonl"))
+
+        logging.info("Edge2Chrome Native Host 守护进程 启动")
+        logging.info(f"Python: {sys.version}")
+        logging.info(f"PID: {os.getpid()}")
+
+    except Exception as e:
+        print(f"日志设置失败: {e}", file=sys.stderr)
+
+class HostDaemon:
+    """常驻守护进程 - 每个转发Host连接一个线程，消息交给Edge终极适配版的处理逻辑"""
+
+    def __init__(self, address=None, idle_timeout=DAEMON_IDLE_TIMEOUT):
+        # 处理逻辑只在守护进程中导入，转发Host不加载
+        import edge2chrome_launcher_edge_ultimate as host
+
+        self.host = host
+        self.address = address or daemon_address()
+        self.idle_timeout = idle_timeout
+        self.listener = None
+        self._lock = threading.Lock()
+        self._watchdog = None
+
+        # 统计
+        self.connections = 0
+        self.active = 0
+        self.handled = 0
+
+    def _remove_socket(self):
+        if not self.address.startswith("\\\\"):
+            try:
+                os.remove(self.address)
+            except OSError:
+                pass
+
+    def listen(self):
+        """开始监听；已有守护进程在运行时返回False"""
+        if not self.address.startswith("\\\\") and os.path.exists(self.address):
+            try:
+                connect(self.address).close()
+                return False
+            except (OSError, AuthenticationError):
+                # 上一个守护进程异常退出留下的套接字文件
+                self._remove_socket()
+
+        try:
+            self.listener = Listener(self.address, authkey=daemon_authkey())
+        except OSError as e:
+            # 另一个守护进程同时启动并抢先开始监听
+            logging.info(f"无法监听 {self.address}: {e}")
+            return False
+
+        if self.idle_timeout > 0:
+            self._watchdog = self.host.IdleWatchdog(self.idle_timeout, cleanup=self._remove_socket)
+            self._watchdog.reset()
+        return True
+
+    def serve_forever(self):
+        logging.info(f"守护进程开始监听: {self.address}")
+
+        while True:
+            try:
+                conn = self.listener.accept()
+            except (AuthenticationError, OSError, EOFError) as e:
+                logging.warning(f"拒绝连接: {e}")
+                continue
+
+            with self._lock:
+                self.connections += 1
+                self.active += 1
+                if self._watchdog:
+                    self._watchdog.cancel()
+
+            threading.Thread(target=self._serve_connection, args=(conn,),
+                             name=f"conn-{self.connections}", daemon=True).start()
+
+    def _serve_connection(self, conn):
+        host = self.host
+        send_lock = threading.Lock()
+        handled = 0
+
+        def send(message):
+            """发送完整帧，转发Host原样写入stdout"""
+            try:
+                frame = nativemsg.encode_message(message)
+                with send_lock:
+                    conn.send_bytes(frame)
+                logging.info("响应发送完成: %d 字节", len(frame))
+                return True
+            except (OSError, ValueError) as e:
+                # 连接已关闭，例如启动校验结果在转发Host退出后才到达
+                logging.debug(f"发送响应失败: {e}")
+                return False
+            except Exception as e:
+                logging.error(f"发送响应异常: {e}")
+                return False
+
+        try:
+            while True:
+                try:
+                    payload = conn.recv_bytes()
+                except (EOFError, OSError):
+                    break
+
+                if payload == END_OF_STREAM:
+                    # 连接关闭前启动该连接仍在合并窗口中的请求，其他连接的请求继续等待合并
+                    host.coalescer.flush(owner=conn)
+                    if handled == 0:
+                        send({"success": False, "error": "未收到有效消息"})
+                    # 该连接的启动校验结果推送完之后才结束，转发Host收到结束标记就退出
+                    host.watcher.wait(owner=conn)
+                    with send_lock:
+                        conn.send_bytes(END_OF_STREAM)
+                    break
+
+                span = RequestSpan()
+                try:
+                    message = nativemsg.decode_message(payload)
+                except nativemsg.NativeMessageError as e:
+                    logging.error(f"读取消息失败: {e}")
+                    send({"success": False, "error": f"读取消息失败: {e}"})
+                    continue
+                span.mark("decode")
+
+                logging.info("收到消息: %s", message)
+                span.describe(message)
+                with request_trace.activate(span):
+                    host.submit_message(message, span.wrap_reply(send), owner=conn)
+                handled += 1
+
+        except Exception as e:
+            logging.error(f"连接处理异常: {e}")
+        finally:
+            conn.close()
+            with self._lock:
+                self.active -= 1
+                self.handled += handled
+                if self.active == 0 and self._watchdog:
+                    self._watchdog.reset()
+            logging.info(f"连接关闭，处理 {handled} 个消息 (累计 {self.handled} 个)")
+
+def main():
+    setup_logging()
+
+    daemon = HostDaemon()
+    if not daemon.listen():
+        logging.info("守护进程已在运行，退出")
+        return
+
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("程序被中断")
+    finally:
+        daemon._remove_socket()
+        logging.info("程序结束")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Edge2Chrome Native Host 日志
+请求处理线程只把日志记录放入队列，由后台线程格式化并写入文件和stderr，
+读取请求到发出响应之间不等待磁盘和stderr管道；
+日志文件按大小滚动，旧文件的压缩和清理也在后台线程中进行
+"""
+
+import atexit
+import glob
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+
+# 多个Host进程（每个Edge配置文件一个）可能写入同一个日志文件，守护进程中每个连接一个线程，
+# 日志分析按 PID/线程名 把同一个请求的日志行配对
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(process)d/%(threadName)s - %(message)s'
+
+# 单个日志文件的大小上限、保留的滚动文件数和天数
+LOG_MAX_BYTES = int(os.getenv('EDGE2CHROME_LOG_MAX_BYTES', str(5 * 1024 * 1024)))
+LOG_BACKUPS = int(os.getenv('EDGE2CHROME_LOG_BACKUPS', '5'))
+LOG_MAX_AGE_DAYS = float(os.getenv('EDGE2CHROME_LOG_MAX_AGE_DAYS', '14'))
+# 滚动出的文件用gzip压缩，EDGE2CHROME_LOG_COMPRESS=0 关闭
+LOG_COMPRESS = os.getenv('EDGE2CHROME_LOG_COMPRESS', '1') != '0'
+
+# 滚动失败（Windows下其他Host进程仍打开着文件）后，隔多久再尝试（秒）
+ROLLOVER_RETRY = 60
+
+# 被中断的压缩留下的临时文件，超过这个时间（秒）后清理
+STALE_TEMP_AGE = 3600
+
+# 关闭全部日志时使用的级别
+LEVEL_OFF = logging.CRITICAL + 1
+
+# 请求事件（JSONL）使用的日志名，不写入文本日志
+# EDGE2CHROME_EVENTS=0 关闭事件记录
+EVENTS_LOGGER = "edge2chrome.events"
+EVENTS_ENABLED = os.getenv('EDGE2CHROME_EVENTS', '1') != '0'
+
+events = logging.getLogger(EVENTS_LOGGER)
+events.propagate = False
+# 配置事件文件之前不生成事件
+events.setLevel(LEVEL_OFF)
+
+_listener = None
+
+def log_level():
+    """EDGE2CHROME_LOG_LEVEL 指定日志级别（DEBUG/INFO/WARNING/ERROR/OFF），默认DEBUG"""
+    name = os.getenv('EDGE2CHROME_LOG_LEVEL', 'DEBUG').upper()
+    if name == 'OFF':
+        return LEVEL_OFF
+
+    level = logging.getLevelName(name)
+    return level if isinstance(level, int) else logging.DEBUG
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """把日志记录原样放入队列
+
+    标准QueueHandler在调用线程中格式化整条消息，这里推迟到监听线程；
+    只有异常信息先转成文本，traceback对象不跨线程保留。
+    日志参数在写出前不能再被修改
+    """
+
+    def prepare(self, record):
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class RollingLogHandler(logging.FileHandler):
+    """按大小滚动的日志文件，启动时追加写入，不清空历史
+
+    滚动时只把当前文件重命名为带时间戳的文件，不移动已有的滚动文件；
+    gzip压缩和按数量、天数清理在后台线程中进行，不占用写日志的线程
+    """
+
+    def __init__(self, filename, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS,
+                 max_age_days=LOG_MAX_AGE_DAYS, compress=LOG_COMPRESS):
+        # 第一条日志写入时才打开文件
+        super().__init__(filename, encoding='utf-8', delay=True)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.max_age = max_age_days * 86400
+        self.compress = compress
+        self._retry_at = 0
+        self._maintenance_lock = threading.Lock()
+        self._maintenance = None
+        self._maintenance_again = False
+
+    def emit(self, record):
+        super().emit(record)
+        try:
+            # 写入后用tell()判断大小，不需要stat，也不需要预先格式化一次
+            if (self.max_bytes > 0 and self.stream is not None
+                    and self.stream.tell() >= self.max_bytes and time.time() >= self._retry_at):
+                self.doRollover()
+        except Exception:
+            self.handleError(record)
+
+    def doRollover(self):
+        self.acquire()
+        try:
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+
+            stamp = time.strftime('%Y%m%d-%H%M%S')
+            segment = f"{self.baseFilename}.{stamp}-{os.getpid()}"
+            index = 1
+            while os.path.exists(segment) or os.path.exists(segment + ".gz"):
+                index += 1
+                segment = f"{self.baseFilename}.{stamp}-{os.getpid()}-{index}"
+
+            try:
+                os.replace(self.baseFilename, segment)
+            except OSError:
+                # 继续写入原文件，稍后再试
+                self._retry_at = time.time() + ROLLOVER_RETRY
+                return
+        finally:
+            self.release()
+
+        self._schedule_maintenance()
+
+    def segments(self):
+        """已滚动出的日志文件，从旧到新"""
+        paths = glob.glob(glob.escape(self.baseFilename) + ".*")
+        return sorted(path for path in paths if not path.endswith(".tmp"))
+
+    def _schedule_maintenance(self):
+        with self._maintenance_lock:
+            if self._maintenance is not None:
+                self._maintenance_again = True
+                return
+            # 非守护线程：正常退出时等待压缩完成
+            self._maintenance = threading.Thread(target=self._maintain, name="log-maintenance")
+            self._maintenance.start()
+
+    def wait_maintenance(self, timeout=None):
+        """等待后台压缩和清理完成"""
+        thread = self._maintenance
+        if thread is not None:
+            thread.join(timeout)
+
+    def _maintain(self):
+        while True:
+            try:
+                self._compress_segments()
+                self._prune_segments()
+            except Exception as e:
+                print(f"日志维护失败: {e}", file=sys.stderr)
+
+            with self._maintenance_lock:
+                if not self._maintenance_again:
+                    self._maintenance = None
+                    return
+                self._maintenance_again = False
+
+    def _compress_segments(self):
+        if not self.compress:
+            return
+
+        for path in self.segments():
+            if path.endswith(".gz"):
+                continue
+
+            temp_file = f"{path}.gz.{os.getpid()}.tmp"
+            try:
+                with open(path, 'rb') as source, gzip.open(temp_file, 'wb') as target:
+                    shutil.copyfileobj(source, target, 1024 * 1024)
+                os.replace(temp_file, path + ".gz")
+                os.remove(path)
+            except OSError:
+                # 其他Host进程可能正在压缩同一个文件
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+
+    def _prune_segments(self):
+        now = time.time()
+        segments = self.segments()
+        keep = set(segments[-self.backups:]) if self.backups > 0 else set()
+
+        for path in segments:
+            try:
+                if path not in keep or (self.max_age > 0 and now - os.path.getmtime(path) > self.max_age):
+                    os.remove(path)
+            except OSError:
+                pass
+
+        for path in glob.glob(glob.escape(self.baseFilename) + ".*.tmp"):
+            try:
+                if now - os.path.getmtime(path) > STALE_TEMP_AGE:
+                    os.remove(path)
+            except OSError:
+                pass
+
+class JsonLineFormatter(logging.Formatter):
+    """事件记录的msg是dict，每条输出为一行紧凑的JSON"""
+
+    def format(self, record):
+        return json.dumps(record.msg, ensure_ascii=False, separators=(',', ':'), default=str)
+
+def is_event_record(record):
+    return record.name == EVENTS_LOGGER
+
+def is_text_record(record):
+    return record.name != EVENTS_LOGGER
+
+def setup_host_logging(log_file=None, level=None, stderr=True, queued=True, events_file=None):
+    """配置根日志，输出到log_file和stderr；指定events_file时请求事件写入该JSONL文件
+
+    queued为False时直接写入（调试时保证与其他输出的先后顺序），返回使用的处理器列表
+    """
+    global _listener
+
+    level = log_level() if level is None else level
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    handlers = []
+    if log_file:
+        handlers.append(RollingLogHandler(log_file))
+    if stderr:
+        handlers.append(logging.StreamHandler(sys.stderr))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        handler.addFilter(is_text_record)
+
+    event_handler = None
+    if events_file and EVENTS_ENABLED:
+        event_handler = RollingLogHandler(events_file)
+        event_handler.setFormatter(JsonLineFormatter())
+        event_handler.addFilter(is_event_record)
+        handlers.append(event_handler)
+
+    stop_host_logging()
+
+    root = logging.getLogger()
+    for logger in (root, events):
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+            handler.close()
+    root.setLevel(level)
+    events.setLevel(logging.INFO if event_handler else LEVEL_OFF)
+
+    if not queued:
+        for handler in handlers:
+            (events if handler is event_handler else root).addHandler(handler)
+        return handlers
+
+    # 文本日志和事件共用一个队列和后台线程，由处理器上的过滤器分开
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    root.addHandler(queue_handler)
+    if event_handler:
+        events.addHandler(queue_handler)
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    return handlers
+
+def stop_host_logging():
+    """写出队列中剩余的日志并停止后台线程；进程用os._exit退出前必须调用"""
+    global _listener
+
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+atexit.register(stop_host_logging)
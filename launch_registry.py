@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Edge2Chrome 启动登记表
+记录常驻Host启动的每个Chrome进程，后台线程回收已退出的子进程，
+避免长时间运行时积累僵尸进程和进程句柄
+"""
+
+import collections
+import logging
+import threading
+import time
+
+# 回收线程检查子进程的间隔（秒）
+REAP_INTERVAL = 1.0
+
+# 保留的已结束记录数
+HISTORY_SIZE = 100
+
+class LaunchRecord:
+    """一次Chrome启动"""
+
+    __slots__ = ("pid", "urls", "started", "ended", "exit_code", "process")
+
+    def __init__(self, process, urls):
+        self.process = process
+        self.pid = process.pid
+        self.urls = list(urls)
+        self.started = time.time()
+        self.ended = None
+        self.exit_code = None
+
+    @property
+    def alive(self):
+        return self.ended is None
+
+class LaunchRegistry:
+    """启动登记表 - 登记启动的子进程，由后台线程回收，不阻塞请求循环
+
+    没有运行中的子进程时回收线程退出，下次登记时重新启动
+    """
+
+    def __init__(self, interval=REAP_INTERVAL, history=HISTORY_SIZE):
+        self.interval = interval
+        self._lock = threading.Lock()
+        # poll()在锁外进行，避免阻塞登记；同一时间只有一次回收
+        self._reap_lock = threading.Lock()
+        self._live = {}
+        self._finished = collections.deque(maxlen=history)
+        self._thread = None
+
+        # 统计
+        self.launched = 0
+        self.exited = 0
+        self.failed = 0
+
+    def register(self, process, urls):
+        """登记一个刚启动的子进程，返回启动记录"""
+        record = LaunchRecord(process, urls)
+
+        with self._lock:
+            self._live[record.pid] = record
+            self.launched += 1
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="launch-reaper", daemon=True)
+                self._thread.start()
+
+        return record
+
+    def reap(self):
+        """回收已退出的子进程，返回本次回收的记录"""
+        with self._reap_lock:
+            with self._lock:
+                records = list(self._live.values())
+
+            reaped = []
+            for record in records:
+                exit_code = record.process.poll()
+                if exit_code is None:
+                    continue
+
+                record.exit_code = exit_code
+                record.ended = time.time()
+                # 释放Popen对象持有的句柄
+                record.process = None
+                reaped.append(record)
+
+            with self._lock:
+                for record in reaped:
+                    del self._live[record.pid]
+                    self._finished.append(record)
+                    if record.exit_code == 0:
+                        self.exited += 1
+                    else:
+                        self.failed += 1
+
+        for record in reaped:
+            if record.exit_code:
+                logging.warning(f"Chrome进程异常退出, PID: {record.pid}, 返回码: {record.exit_code}")
+            else:
+                logging.debug(f"回收Chrome进程, PID: {record.pid}")
+
+        return reaped
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.reap()
+
+            with self._lock:
+                if not self._live:
+                    self._thread = None
+                    return
+
+    def recent(self):
+        """最近结束的启动记录，最新的在前"""
+        with self._lock:
+            return list(reversed(self._finished))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "launched": self.launched,
+                "live": len(self._live),
+                "exited": self.exited,
+                "failed": self.failed
+            }
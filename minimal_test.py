@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 import sys
-import json
-import struct
 import subprocess
 import os
 
+import nativemsg
+
 # öģʽ
 if sys.platform == "win32":
     import msvcrt
@@ -19,11 +19,8 @@ def main():
             log.flush()
         
         # ȡ
-        length_data = sys.stdin.buffer.read(4)
-        if len(length_data) == 4:
-            length = struct.unpack('<I', length_data)[0]
-            message_data = sys.stdin.buffer.read(length)
-            message = json.loads(message_data.decode('utf-8'))
+        message = nativemsg.read_message(sys.stdin.buffer)
+        if message is not None:
             
             # ¼Ϣ
             with open("minimal_test.log", "a") as log:
@@ -40,13 +37,7 @@ def main():
                 response = {"success": False, "error": "Chrome not found"}
             
             # Ӧ
-            response_json = json.dumps(response)
-            response_bytes = response_json.encode('utf-8')
-            length_bytes = struct.pack('<I', len(response_bytes))
-            
-            sys.stdout.buffer.write(length_bytes)
-            sys.stdout.buffer.write(response_bytes)
-            sys.stdout.buffer.flush()
+            nativemsg.write_message(sys.stdout.buffer, response)
             
             with open("minimal_test.log", "a") as log:
                 log.write(f"Sent response: {response}\n")
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Edge2Chrome Native Host 日志分析
+逐行流式解析文本日志（logs/edge_native.log 格式，也支持滚动后的 .gz 文件），
+把 收到消息 与 Chrome启动成功/消息发送成功 配对，统计请求延迟分位数、每天的失败数和Chrome查找失败次数。
+普通文件通过mmap读取，内存占用与日志大小无关
+
+用法:
+    python analyze_logs.py logs/edge_native.log [更多日志文件...] [--json]
+"""
+
+import argparse
+import datetime
+import gzip
+import json
+import math
+import mmap
+import os
+import re
+import sys
+
+# 日志行格式: "2025-06-10 22:30:28,746 - INFO - 1234/MainThread - 消息"，
+# 旧版本没有 PID/线程名: "2025-06-10 22:30:28,746 - INFO - 消息"
+TIMESTAMP_SIZE = 23
+LEVEL_SEPARATOR = b" - "
+ORIGIN = re.compile(rb"(\d+)/(.*?) - ")
+
+# 请求开始：各版本Host收到并解析消息后的日志
+REQUEST_MARKERS = ("收到消息: ".encode('utf-8'), "解析后的消息: ".encode('utf-8'))
+# Chrome进程已启动
+LAUNCH_MARKERS = ("Chrome启动成功".encode('utf-8'), "Chrome进程已启动".encode('utf-8'))
+# 响应已写出（请求结束）
+SENT_MARKERS = tuple(marker.encode('utf-8') for marker in
+                     ("消息发送成功", "响应发送成功", "响应发送完成", "消息发送完成"))
+# 响应内容为失败
+FAILED_RESPONSE_MARKERS = (b"'success': False", b'"success": false')
+# Chrome查找失败
+MISS_MARKER = "未找到Chrome".encode('utf-8')
+# Host进程启动，例如 "Edge2Chrome Native Host (Edge终极适配版) 启动"
+HOST_START_PREFIX = b"Edge2Chrome Native Host"
+HOST_START_SUFFIX = " 启动".encode('utf-8')
+
+class LatencyHistogram:
+    """对数分桶的延迟直方图，内存占用固定；分位数误差不超过一个桶宽（2%）"""
+
+    GROWTH = 1.02
+    MIN_MS = 0.01
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        index = 0 if ms <= self.MIN_MS else int(math.log(ms / self.MIN_MS, self.GROWTH)) + 1
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, p):
+        """返回第p百分位所在桶的上界（不超过最大值）"""
+        if not self.count:
+            return None
+
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.MIN_MS * self.GROWTH ** index, self.max)
+        return self.max
+
+class DayStats:
+    __slots__ = ("requests", "failed", "unanswered", "misses")
+
+    def __init__(self):
+        self.requests = 0
+        self.failed = 0
+        self.unanswered = 0
+        self.misses = 0
+
+class LogAnalyzer:
+    """日志分析状态机
+
+    每个请求从收到消息开始，到响应写出为止。日志行带PID和线程名时按 (PID, 线程名) 配对：
+    多个Host进程写入同一个文件、守护进程多个连接交错时互不影响；同一线程没有进行中的请求时
+    （例如在线程池或合并计时器中启动Chrome、发送响应），对应同一进程最早的请求。
+    旧格式的日志行不带PID，只能假设同一个Host进程的日志按时间顺序排列，
+    收到下一个消息或Host重新启动时上一个请求结束
+    """
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.launch_latency = LatencyHistogram()
+        self.days = {}
+        self.lines = 0
+        self.sessions = 0
+        self.requests = 0
+        self.completed = 0
+        self.failed = 0
+        self.unanswered = 0
+        self.misses = 0
+        self.unparsed = 0
+
+        self._day_start = {}
+        # (PID, 线程名) -> 进行中的请求 [日期, 开始时间, Chrome启动时间, 是否失败]，按开始顺序；旧格式的键为None
+        self._pending = {}
+
+    def _timestamp(self, line):
+        """返回 (日期, 秒)；日期字符串到当天零点的换算按日期缓存"""
+        date = line[:10]
+        day_start = self._day_start.get(date)
+        if day_start is None:
+            day = datetime.date.fromisoformat(date.decode('ascii'))
+            day_start = self._day_start[date] = day.toordinal() * 86400
+        seconds = (int(line[11:13]) * 3600 + int(line[14:16]) * 60 + int(line[17:19])
+                   + int(line[20:23]) / 1000)
+        return date, day_start + seconds
+
+    def _day(self, date):
+        stats = self.days.get(date)
+        if stats is None:
+            stats = self.days[date] = DayStats()
+        return stats
+
+    def feed(self, line):
+        """处理一行（bytes，不含换行符）"""
+        self.lines += 1
+
+        if len(line) < TIMESTAMP_SIZE or line[4:5] != b"-" or line[13:14] != b":":
+            # 多行日志（traceback）的后续行
+            return
+
+        try:
+            date, timestamp = self._timestamp(line)
+        except ValueError:
+            self.unparsed += 1
+            return
+
+        # "时间 - 级别 - PID/线程名 - 消息"
+        rest = line[TIMESTAMP_SIZE + len(LEVEL_SEPARATOR):]
+        level, _, message = rest.partition(LEVEL_SEPARATOR)
+        origin = None
+        match = ORIGIN.match(message)
+        if match:
+            origin = match.groups()
+            message = message[match.end():]
+
+        if message.startswith(HOST_START_PREFIX) and message.endswith(HOST_START_SUFFIX):
+            self._close_process(origin)
+            self.sessions += 1
+            return
+
+        if message.startswith(REQUEST_MARKERS):
+            if origin is None:
+                self._close_process(None)
+            self.requests += 1
+            self._day(date).requests += 1
+            self._pending.setdefault(origin, []).append([date, timestamp, None, False])
+            return
+
+        key = self._pending_key(origin)
+        pending = self._pending[key][0] if key is not False else None
+
+        if MISS_MARKER in message:
+            self.misses += 1
+            self._day(date).misses += 1
+            if pending:
+                pending[3] = True
+            return
+
+        if pending is None:
+            return
+
+        if level == b"ERROR" or any(marker in message for marker in FAILED_RESPONSE_MARKERS):
+            pending[3] = True
+
+        if pending[2] is None and message.startswith(LAUNCH_MARKERS):
+            pending[2] = timestamp
+            self.launch_latency.add((timestamp - pending[1]) * 1000)
+        elif message.startswith(SENT_MARKERS):
+            queue = self._pending[key]
+            queue.pop(0)
+            if not queue:
+                del self._pending[key]
+            self._finish(pending, timestamp)
+
+    def _pending_key(self, origin):
+        """返回这一行对应的进行中请求所在的键，没有时返回False"""
+        if self._pending.get(origin):
+            return origin
+        if origin is None:
+            return False
+
+        # 同一线程没有进行中的请求，对应同一进程最早的请求
+        oldest = False
+        started = None
+        for key, queue in self._pending.items():
+            if key is not None and key[0] == origin[0] and (started is None or queue[0][1] < started):
+                oldest = key
+                started = queue[0][1]
+        return oldest
+
+    def _finish(self, pending, timestamp):
+        date, started, _, failed = pending
+        self.completed += 1
+        self.latency.add((timestamp - started) * 1000)
+        if failed:
+            self.failed += 1
+            self._day(date).failed += 1
+
+    def _close_pending(self, pending):
+        """请求没有响应写出的日志（Host退出、异常或旧格式日志中下一个请求已开始）
+
+        部分Host不记录响应写出，Chrome已启动时以启动时间作为请求结束
+        """
+        if pending[2] is not None:
+            self._finish(pending, pending[2])
+            return
+        date = pending[0]
+        self.unanswered += 1
+        self._day(date).unanswered += 1
+
+    def _close_process(self, origin):
+        """Host进程重新启动：结束该PID进行中的请求；旧格式的日志结束全部不带PID的请求"""
+        if origin is None:
+            keys = [None] if None in self._pending else []
+        else:
+            keys = [key for key in self._pending if key is not None and key[0] == origin[0]]
+        for key in keys:
+            for pending in self._pending.pop(key):
+                self._close_pending(pending)
+
+    def close(self):
+        queues = self._pending
+        self._pending = {}
+        for queue in queues.values():
+            for pending in queue:
+                self._close_pending(pending)
+
+    def summary(self):
+        def percentiles(histogram):
+            return {
+                "count": histogram.count,
+                "p50": histogram.percentile(50),
+                "p95": histogram.percentile(95),
+                "p99": histogram.percentile(99),
+                "max": histogram.max if histogram.count else None,
+                "mean": histogram.total / histogram.count if histogram.count else None,
+            }
+
+        return {
+            "lines": self.lines,
+            "sessions": self.sessions,
+            "requests": self.requests,
+            "completed": self.completed,
+            "failed": self.failed,
+            "unanswered": self.unanswered,
+            "chrome_misses": self.misses,
+            "latency_ms": percentiles(self.latency),
+            "launch_latency_ms": percentiles(self.launch_latency),
+            "days": {
+                date.decode('ascii'): {
+                    "requests": stats.requests,
+                    "failed": stats.failed,
+                    "unanswered": stats.unanswered,
+                    "chrome_misses": stats.misses,
+                }
+                for date, stats in sorted(self.days.items())
+            },
+        }
+
+def iter_lines(path):
+    """逐行读取日志文件（bytes，去掉行尾）；普通文件用mmap，不整体读入内存"""
+    if path.endswith(".gz"):
+        with gzip.open(path, 'rb') as f:
+            for line in f:
+                yield line.rstrip(b"\r\n")
+        return
+
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            end = len(data)
+            while start < end:
+                newline = data.find(b"\n", start)
+                if newline < 0:
+                    newline = end
+                yield data[start:newline].rstrip(b"\r")
+                start = newline + 1
+
+def analyze(paths):
+    analyzer = LogAnalyzer()
+    for path in paths:
+        for line in iter_lines(path):
+            analyzer.feed(line)
+        # 每个文件结束时未完成的请求不跨文件配对
+        analyzer.close()
+    return analyzer.summary()
+
+def format_ms(value):
+    return "-" if value is None else f"{value:.1f}"
+
+def print_report(summary, paths):
+    print("📊 Edge2Chrome 日志分析")
+    print("=" * 60)
+    print(f"📄 文件: {', '.join(paths)}")
+    print(f"   {summary['lines']} 行, Host启动 {summary['sessions']} 次")
+    print()
+    print(f"📨 请求: {summary['requests']}  已响应: {summary['completed']}  "
+          f"失败: {summary['failed']}  未响应: {summary['unanswered']}")
+    print(f"🔍 未找到Chrome: {summary['chrome_misses']} 次")
+    print()
+
+    for title, key in (("请求延迟 (收到消息 → 响应写出)", "latency_ms"),
+                       ("启动延迟 (收到消息 → Chrome启动成功)", "launch_latency_ms")):
+        stats = summary[key]
+        print(f"⏱️  {title}, {stats['count']} 个样本, 毫秒")
+        print(f"   p50 {format_ms(stats['p50'])}  p95 {format_ms(stats['p95'])}  "
+              f"p99 {format_ms(stats['p99'])}  max {format_ms(stats['max'])}")
+    print()
+
+    if summary["days"]:
+        print("📅 按日期:")
+        print(f"   {'日期':<12}{'请求':>8}{'失败':>8}{'未响应':>8}{'未找到Chrome':>14}")
+        for date, stats in summary["days"].items():
+            print(f"   {date:<12}{stats['requests']:>8}{stats['failed']:>8}"
+                  f"{stats['unanswered']:>8}{stats['chrome_misses']:>14}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Edge2Chrome Native Host 日志分析")
+    parser.add_argument("logs", nargs="+", help="日志文件（支持 .gz）")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+    args = parser.parse_args()
+
+    summary = analyze(args.logs)
+
+    if args.json:
+        json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(summary, args.logs)
+
+if __name__ == "__main__":
+    main()
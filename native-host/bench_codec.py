@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Native Messaging 编解码性能测试
+对比共用的 nativemsg 模块和各脚本中原有的复制版本
+"""
+
+import io
+import json
+import struct
+import sys
+import time
+from pathlib import Path
+
+# 导入项目根目录下的编解码模块
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+import nativemsg
+
+# ---- 原有的复制版本（合并到nativemsg之前的实现，仅用于对比）----
+
+def ultimate_read(stream):
+    """edge2chrome_launcher_edge_ultimate.py: 4096字节分块 += 拼接"""
+    message_length = struct.unpack('<I', stream.read(4))[0]
+    message_data = b''
+    remaining = message_length
+    while remaining > 0:
+        chunk = stream.read(min(remaining, 4096))
+        message_data += chunk
+        remaining -= len(chunk)
+    return json.loads(message_data.decode('utf-8'))
+
+def ultimate_write(stream, message):
+    """edge2chrome_launcher_edge_ultimate.py: 逐段写入并每次刷新（不含fsync和固定sleep）"""
+    response_bytes = json.dumps(message, ensure_ascii=False).encode('utf-8')
+    full_response = struct.pack('<I', len(response_bytes)) + response_bytes
+    bytes_written = 0
+    while bytes_written < len(full_response):
+        written = stream.write(full_response[bytes_written:])
+        bytes_written += written
+        stream.flush()
+    stream.flush()
+
+def fixed_read(stream):
+    """edge2chrome_launcher_edge_fixed.py: 剩余长度 += 拼接"""
+    message_length = struct.unpack('<I', stream.read(4))[0]
+    message_data = b''
+    bytes_to_read = message_length
+    while bytes_to_read > 0:
+        chunk = stream.read(bytes_to_read)
+        message_data += chunk
+        bytes_to_read -= len(chunk)
+    return json.loads(message_data.decode('utf-8'))
+
+def fixed_write(stream, message):
+    """edge2chrome_launcher_edge_fixed.py: 逐段写入并每次刷新"""
+    message_bytes = json.dumps(message, ensure_ascii=False).encode('utf-8')
+    full_message = struct.pack('<I', len(message_bytes)) + message_bytes
+    bytes_written = 0
+    while bytes_written < len(full_message):
+        written = stream.write(full_message[bytes_written:])
+        bytes_written += written
+        stream.flush()
+    stream.flush()
+
+def simple_read(stream):
+    """extension/edge2chrome_launcher.py, debug_native.py, minimal_test.py: 一次read后decode"""
+    message_length = struct.unpack('<I', stream.read(4))[0]
+    return json.loads(stream.read(message_length).decode('utf-8'))
+
+def simple_write(stream, message):
+    """extension/edge2chrome_launcher.py, debug_native.py, minimal_test.py: 前缀和消息体分两次写入"""
+    encoded = json.dumps(message).encode('utf-8')
+    stream.write(struct.pack('<I', len(encoded)))
+    stream.write(encoded)
+    stream.flush()
+
+def harness_read(stream):
+    """test_native_host.py, ultimate_diagnostics.py: 读取全部输出后切片解析"""
+    data = stream.read()
+    response_length = struct.unpack('<I', data[:4])[0]
+    return json.loads(data[4:4 + response_length].decode('utf-8'))
+
+def codec_read(stream):
+    return nativemsg.read_message(stream)
+
+def codec_write(stream, message):
+    nativemsg.write_message(stream, message)
+
+IMPLEMENTATIONS = [
+    ("nativemsg", codec_read, codec_write),
+    ("edge_ultimate", ultimate_read, ultimate_write),
+    ("edge_fixed", fixed_read, fixed_write),
+    ("extension/debug/minimal", simple_read, simple_write),
+    ("test_native_host/diagnostics", harness_read, simple_write),
+]
+
+MESSAGES = [
+    ("请求消息", {
+        "url": "https://www.zhihu.com/question/12345",
+        "source": "edge-ultimate",
+        "chromeArgs": "--new-window",
+        "timestamp": 1749565828746,
+    }),
+    ("64 KB", {"url": "https://www.zhihu.com/", "padding": "x" * (64 * 1024)}),
+    ("1 MB", {"url": "https://www.zhihu.com/", "padding": "x" * (1024 * 1024 - 128)}),
+]
+
+def measure(reader, writer, message, rounds):
+    """一次写入+读取为一轮，返回每轮微秒数"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        raw = io.BytesIO()
+        buffered = io.BufferedWriter(raw)
+        writer(buffered, message)
+        data = raw.getvalue()
+        buffered.detach()
+        reader(io.BufferedReader(io.BytesIO(data)))
+    return (time.perf_counter() - start) / rounds * 1e6
+
+def main():
+    print("📊 Native Messaging 编解码性能测试 (写入 + 读取, 微秒/次)")
+    print("=" * 70)
+
+    for label, message in MESSAGES:
+        size = len(nativemsg.encode_message(message))
+        rounds = max(10, (32 * 1024 * 1024) // size)
+        rounds = min(rounds, 20000)
+
+        print(f"\n📦 {label} ({size} 字节, {rounds} 次)")
+        baseline = None
+        for name, reader, writer in IMPLEMENTATIONS:
+            elapsed = measure(reader, writer, message, rounds)
+            if baseline is None:
+                baseline = elapsed
+            print(f"   {name:<30}{elapsed:>12.1f} µs{elapsed / baseline:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
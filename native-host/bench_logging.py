@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Native Host 日志开销性能测试
+在进程内走一遍 读取请求 -> 处理 -> 发送响应，对比关闭日志、同步写日志和队列日志时的单次请求延迟
+"""
+
+import io
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 导入项目根目录下的模块
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+# 启动请求交给模拟的Chrome：Python解释器无法识别Chrome参数，启动后立即退出；
+# Chrome路径缓存写到临时目录，不会用到缓存中真实的Chrome，也不经过DevTools
+BENCH_DIR = tempfile.mkdtemp(prefix="edge2chrome-bench-")
+os.environ.update(EDGE2CHROME_CHROME=sys.executable, EDGE2CHROME_CACHE_DIR=BENCH_DIR,
+                  EDGE2CHROME_ENGINE="popen")
+
+import nativemsg
+import host_logging
+import edge2chrome_launcher_edge_ultimate as host
+
+ROUNDS = 5000
+
+MESSAGES = [
+    {"v": 2, "id": 1, "type": "stats"},
+    # v1启动请求：不推送launchStatus，计时结束后不再向stdout写入
+    {"source": "edge-ultimate", "url": "https://example.com/", "chromeArgs": "--new-window"},
+]
+
+def run_requests(rounds):
+    """返回每次请求的耗时（微秒）"""
+    frames = [nativemsg.encode_message(MESSAGES[i % len(MESSAGES)]) for i in range(rounds)]
+    stdin, stdout = sys.stdin, sys.stdout
+    sys.stdin = io.TextIOWrapper(io.BytesIO(b''.join(frames)))
+    sys.stdout = io.TextIOWrapper(io.BytesIO())
+
+    timings = []
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            message = host.read_input()
+            host.submit_message(message, host.send_output)
+            timings.append((time.perf_counter() - start) * 1e6)
+    finally:
+        sys.stdin, sys.stdout = stdin, stdout
+
+    return timings
+
+def main():
+    print(f"📊 Native Host 日志开销 ({ROUNDS} 次请求, 微秒/次)")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        log_file = os.path.join(workdir, "bench.log")
+        # stderr写入临时文件，模拟Edge读取stderr管道，同时不刷屏
+        with open(os.path.join(workdir, "stderr.log"), 'w', encoding='utf-8') as stderr:
+            real_stderr, sys.stderr = sys.stderr, stderr
+            try:
+                modes = [
+                    ("关闭日志", dict(level=host_logging.LEVEL_OFF)),
+                    ("同步写入 (原实现)", dict(level=logging.DEBUG, queued=False)),
+                    ("队列写入", dict(level=logging.DEBUG)),
+                    ("队列写入 INFO", dict(level=logging.INFO)),
+                ]
+                results = []
+                for name, options in modes:
+                    host_logging.setup_host_logging(log_file, **options)
+                    run_requests(200)
+                    timings = run_requests(ROUNDS)
+                    host_logging.stop_host_logging()
+                    results.append((name, timings))
+            finally:
+                sys.stderr = real_stderr
+
+    baseline = statistics.median(results[0][1])
+    print(f"   {'模式':<20}{'p50':>10}{'p99':>10}{'相对':>10}")
+    for name, timings in results:
+        p50 = statistics.median(timings)
+        p99 = statistics.quantiles(timings, n=100)[98]
+        print(f"   {name:<20}{p50:>10.1f}{p99:>10.1f}{p50 / baseline:>9.2f}x")
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        shutil.rmtree(BENCH_DIR, ignore_errors=True)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Native Messaging 读取性能测试
+对比旧的 += 分块拼接和预分配缓冲区 readinto 的吞吐量
+"""
+
+import io
+import json
+import struct
+import sys
+import time
+from pathlib import Path
+
+# 导入项目根目录下的编解码模块
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+from nativemsg import read_exact_into
+
+FRAME_SIZES = [
+    ("1 KB", 1024),
+    ("64 KB", 64 * 1024),
+    ("1 MB", 1024 * 1024 - 64),
+]
+
+def build_frame(size):
+    """构造指定大小的消息（长度前缀 + JSON）"""
+    base = {"url": "https://www.zhihu.com/question/12345", "source": "bench", "padding": ""}
+    overhead = len(json.dumps(base).encode('utf-8'))
+    base["padding"] = "x" * max(0, size - overhead)
+    payload = json.dumps(base).encode('utf-8')
+    return struct.pack('<I', len(payload)) + payload
+
+def legacy_read(stream):
+    """旧实现：4096字节分块 += 拼接后再decode"""
+    message_length = struct.unpack('<I', stream.read(4))[0]
+    message_data = b''
+    remaining = message_length
+    while remaining > 0:
+        chunk = stream.read(min(remaining, 4096))
+        if not chunk:
+            return None
+        message_data += chunk
+        remaining -= len(chunk)
+    return json.loads(message_data.decode('utf-8'))
+
+def readinto_read(stream):
+    """新实现：预分配bytearray + readinto，直接从缓冲区解析JSON"""
+    message_length = struct.unpack('<I', stream.read(4))[0]
+    message_data = read_exact_into(stream, message_length)
+    return json.loads(message_data)
+
+def measure(reader, frame, rounds):
+    """返回每秒处理的MB数"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        # BufferedReader与sys.stdin.buffer的类型一致
+        stream = io.BufferedReader(io.BytesIO(frame))
+        reader(stream)
+    elapsed = time.perf_counter() - start
+    return len(frame) * rounds / elapsed / (1024 * 1024)
+
+def main():
+    print("📊 Native Messaging 读取性能测试")
+    print("=" * 60)
+    print(f"{'帧大小':<10}{'+= 拼接 (MB/s)':>18}{'readinto (MB/s)':>20}{'加速比':>10}")
+
+    for label, size in FRAME_SIZES:
+        frame = build_frame(size)
+        rounds = max(5, (16 * 1024 * 1024) // len(frame))
+
+        # 预热
+        legacy_read(io.BufferedReader(io.BytesIO(frame)))
+        readinto_read(io.BufferedReader(io.BytesIO(frame)))
+
+        legacy = measure(legacy_read, frame, rounds)
+        fast = measure(readinto_read, frame, rounds)
+
+        print(f"{label:<10}{legacy:>18.1f}{fast:>20.1f}{fast / legacy:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟的Chrome DevTools端点
+提供 /json/version 和浏览器WebSocket端点，响应 Target.createTarget，
+用于在没有Chrome的环境中测试 cdp_engine
+"""
+
+import json
+import socketserver
+import sys
+import threading
+import uuid
+from pathlib import Path
+
+# 导入项目根目录下的DevTools引擎（复用WebSocket帧编解码）
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+import cdp_engine
+
+BROWSER_PATH = "/devtools/browser/fake-browser"
+
+class FakeCDPHandler(socketserver.StreamRequestHandler):
+    """处理一个HTTP请求或WebSocket连接"""
+
+    def handle(self):
+        request_line = self.rfile.readline().decode('latin-1').strip()
+        headers = {}
+        while True:
+            line = self.rfile.readline().decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        path = request_line.split(" ")[1] if " " in request_line else "/"
+
+        if headers.get("upgrade", "").lower() == "websocket" and path == BROWSER_PATH:
+            self.serve_websocket(headers["sec-websocket-key"])
+        elif path == "/json/version":
+            self.send_json({
+                "Browser": "FakeChrome/1.0",
+                "Protocol-Version": "1.3",
+                "webSocketDebuggerUrl": f"ws://127.0.0.1:{self.server.server_address[1]}{BROWSER_PATH}"
+            })
+        else:
+            self.wfile.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+
+    def send_json(self, data):
+        body = json.dumps(data).encode('utf-8')
+        self.wfile.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            + f"Content-Length: {len(body)}\r\n\r\n".encode('ascii') + body
+        )
+
+    def serve_websocket(self, key):
+        self.wfile.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {cdp_engine.websocket_accept(key)}\r\n\r\n"
+        ).encode('ascii'))
+        self.wfile.flush()
+
+        sock = self.connection
+        while True:
+            try:
+                opcode, data = cdp_engine.read_frame(sock)
+            except (cdp_engine.CDPError, OSError):
+                return
+
+            if opcode == cdp_engine.OPCODE_CLOSE:
+                return
+            if opcode != cdp_engine.OPCODE_TEXT:
+                continue
+
+            message = json.loads(data)
+            for reply in self.server.dispatch(message):
+                sock.sendall(cdp_engine.encode_frame(json.dumps(reply).encode('utf-8'), mask=False))
+
+class FakeCDPServer(socketserver.ThreadingTCPServer):
+    """模拟的浏览器，记录通过 Target.createTarget 打开的URL"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, fail_create_after=None):
+        super().__init__(("127.0.0.1", port), FakeCDPHandler)
+        self.created_targets = []
+        # 成功打开这么多个标签页后，之后的 Target.createTarget 都返回错误
+        self.fail_create_after = fail_create_after
+        self._lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def dispatch(self, message):
+        """返回需要发送的消息列表；结果之前先发一个事件，模拟真实浏览器"""
+        method = message.get("method")
+        params = message.get("params", {})
+
+        if method == "Target.createTarget":
+            target_id = uuid.uuid4().hex.upper()
+            with self._lock:
+                if self.fail_create_after is not None and len(self.created_targets) >= self.fail_create_after:
+                    return [{"id": message["id"], "error": {"code": -32000, "message": "Failed to open a new tab"}}]
+                self.created_targets.append(dict(params, targetId=target_id))
+            return [
+                {"method": "Target.targetCreated", "params": {"targetInfo": {"targetId": target_id, "url": params.get("url")}}},
+                {"id": message["id"], "result": {"targetId": target_id}},
+            ]
+
+        if method == "Browser.getVersion":
+            return [{"id": message["id"], "result": {"product": "FakeChrome/1.0", "protocolVersion": "1.3"}}]
+
+        return [{"id": message["id"], "error": {"code": -32601, "message": f"'{method}' wasn't found"}}]
+
+    def start(self):
+        """在后台线程中运行"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+def main():
+    server = FakeCDPServer(int(sys.argv[1]) if len(sys.argv) > 1 else cdp_engine.DEFAULT_PORT)
+    print(f"🧪 模拟DevTools端点: http://127.0.0.1:{server.port}/json/version")
+    print("按Ctrl+C退出")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for target in server.created_targets:
+            print(f"   已打开: {target.get('url')}")
+
+if __name__ == "__main__":
+    main()
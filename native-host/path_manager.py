@@ -50,7 +50,8 @@ class PathManager:
             "配置文件": "com.edge2chrome.launcher.json",
             "扩展manifest": "extension/manifest.json",
             "扩展background": "extension/background.js",
-            "扩展content": "extension/content.js"
+            "扩展content": "extension/content.js",
+            "扩展URL匹配": "extension/url_matcher.js"
         }
         
         all_exist = True
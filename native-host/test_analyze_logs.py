@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试日志分析工具
+"""
+
+import gzip
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(Path(__file__).parent.absolute()))
+
+import host_logging
+from analyze_logs import LatencyHistogram, analyze
+
+# 两个Host会话：成功、查找Chrome失败、启动后Host退出（没有响应日志）、跨天的失败请求
+SAMPLE_LOG = """\
+2025-06-10 23:59:58,000 - INFO - Edge2Chrome Native Host (Edge终极适配版) 启动
+2025-06-10 23:59:58,001 - INFO - PID: 1234
+2025-06-10 23:59:58,100 - INFO - 解析后的消息: {'url': 'https://a.example/'}
+2025-06-10 23:59:58,150 - INFO - 找到Chrome: /usr/bin/chrome
+2025-06-10 23:59:58,200 - INFO - Chrome启动成功, PID: 4032
+2025-06-10 23:59:58,300 - INFO - 响应发送完成: 120 字节
+2025-06-10 23:59:59,000 - INFO - 解析后的消息: {'url': 'https://b.example/'}
+2025-06-10 23:59:59,010 - ERROR - 未找到Chrome
+2025-06-10 23:59:59,020 - INFO - 响应发送完成: 80 字节
+2025-06-10 23:59:59,500 - INFO - 解析后的消息: {'url': 'https://c.example/'}
+2025-06-10 23:59:59,900 - ERROR - 启动Chrome失败: boom
+Traceback (most recent call last):
+  File "host.py", line 1, in <module>
+2025-06-11 00:00:00,100 - INFO - 消息发送成功，长度: 60
+2025-06-11 00:00:01,000 - INFO - Edge2Chrome Native Host for Edge 启动
+2025-06-11 00:00:01,100 - INFO - 收到消息: {'url': 'https://d.example/'}
+2025-06-11 00:00:01,500 - INFO - Chrome进程已启动，PID: 5000
+"""
+
+# 带PID/线程名的日志：两个Host进程交错写入同一个文件；守护进程两个连接交错，
+# 合并启动在计时器线程中启动Chrome并发送响应
+INTERLEAVED_LOG = """\
+2025-06-12 10:00:00,000 - INFO - 1111/MainThread - Edge2Chrome Native Host (Edge终极适配版) 启动
+2025-06-12 10:00:00,010 - INFO - 2222/MainThread - Edge2Chrome Native Host (Edge终极适配版) 启动
+2025-06-12 10:00:00,100 - INFO - 1111/MainThread - 收到消息: {'url': 'https://a.example/'}
+2025-06-12 10:00:00,150 - INFO - 2222/MainThread - 收到消息: {'url': 'https://b.example/'}
+2025-06-12 10:00:00,160 - ERROR - 2222/MainThread - 未找到Chrome
+2025-06-12 10:00:00,170 - INFO - 2222/MainThread - 响应发送完成: 80 字节
+2025-06-12 10:00:00,300 - INFO - 1111/MainThread - Chrome启动成功, PID: 4032
+2025-06-12 10:00:00,400 - INFO - 1111/MainThread - 响应发送完成: 120 字节
+2025-06-12 10:00:01,000 - INFO - 3333/MainThread - Edge2Chrome Native Host 守护进程 启动
+2025-06-12 10:00:01,100 - INFO - 3333/conn-1 - 收到消息: {'v': 2, 'id': 1, 'url': 'https://c.example/'}
+2025-06-12 10:00:01,120 - INFO - 3333/conn-2 - 收到消息: {'v': 2, 'id': 1, 'type': 'stats'}
+2025-06-12 10:00:01,130 - INFO - 3333/conn-2 - 响应发送完成: 60 字节
+2025-06-12 10:00:01,200 - INFO - 3333/Thread-3 (flush) - Chrome启动成功, PID: 5000
+2025-06-12 10:00:01,250 - INFO - 3333/Thread-3 (flush) - 响应发送完成: 60 字节
+"""
+
+def test_histogram():
+    """分位数误差在一个桶宽以内，不超过最大值"""
+    histogram = LatencyHistogram()
+    for ms in range(1, 1001):
+        histogram.add(ms)
+
+    assert abs(histogram.percentile(50) - 500) <= 500 * 0.02
+    assert abs(histogram.percentile(99) - 990) <= 990 * 0.02
+    assert histogram.percentile(100) == 1000
+    assert LatencyHistogram().percentile(50) is None
+
+def test_sample_log():
+    """配对请求与响应，按日期统计失败和Chrome查找失败"""
+    with tempfile.TemporaryDirectory() as workdir:
+        log_file = os.path.join(workdir, "edge_ultimate.log")
+        with open(log_file, 'w', encoding='utf-8', newline='\r\n') as f:
+            f.write(SAMPLE_LOG)
+
+        summary = analyze([log_file])
+
+        assert summary["sessions"] == 2
+        assert summary["requests"] == 4
+        assert summary["completed"] == 4
+        assert summary["unanswered"] == 0
+        assert summary["failed"] == 2
+        assert summary["chrome_misses"] == 1
+
+        latency = summary["latency_ms"]
+        assert latency["count"] == 4
+        # 跨天的请求按时间差计算: 23:59:59.500 -> 00:00:00.100
+        assert abs(latency["max"] - 600) < 1, latency
+        assert summary["launch_latency_ms"]["count"] == 2
+
+        assert summary["days"] == {
+            "2025-06-10": {"requests": 3, "failed": 2, "unanswered": 0, "chrome_misses": 1},
+            "2025-06-11": {"requests": 1, "failed": 0, "unanswered": 0, "chrome_misses": 0},
+        }
+
+        # 滚动后压缩的日志结果相同
+        gz_file = log_file + ".20250611-000000-1234.gz"
+        with gzip.open(gz_file, 'wt', encoding='utf-8') as f:
+            f.write(SAMPLE_LOG)
+        assert analyze([gz_file]) == summary
+
+def test_interleaved_log():
+    """按PID和线程名配对交错的请求，其他线程的日志对应同一进程最早的请求"""
+    with tempfile.TemporaryDirectory() as workdir:
+        log_file = os.path.join(workdir, "edge_ultimate.log")
+        with open(log_file, 'w', encoding='utf-8') as f:
+            f.write(INTERLEAVED_LOG)
+
+        summary = analyze([log_file])
+
+    assert summary["sessions"] == 3
+    assert summary["requests"] == 4
+    assert summary["completed"] == 4 and summary["unanswered"] == 0
+    # 只有进程2222的请求失败
+    assert summary["failed"] == 1 and summary["chrome_misses"] == 1
+
+    latency = summary["latency_ms"]
+    assert abs(latency["max"] - 300) < 1, latency
+    launch = summary["launch_latency_ms"]
+    assert launch["count"] == 2 and abs(launch["max"] - 200) < 1, launch
+
+def test_host_logging_format():
+    """host_logging写出的日志行可以被解析"""
+    with tempfile.TemporaryDirectory() as workdir:
+        log_file = os.path.join(workdir, "host.log")
+        host_logging.setup_host_logging(log_file, level=logging.INFO, stderr=False)
+        logging.info("收到消息: %s", {"url": "https://a.example/"})
+        logging.info("响应发送完成: %d 字节", 120)
+        host_logging.stop_host_logging()
+
+        summary = analyze([log_file])
+
+    assert summary["requests"] == 1 and summary["completed"] == 1
+
+def test_repository_log():
+    """仓库中的示例日志"""
+    summary = analyze([str(PROJECT_ROOT / "logs" / "edge_native.log")])
+
+    assert summary["requests"] == 1
+    assert summary["completed"] == 1
+    assert summary["failed"] == 0
+    assert abs(summary["latency_ms"]["p50"] - 154) <= 154 * 0.02
+
+if __name__ == "__main__":
+    for test in (test_histogram, test_sample_log, test_interleaved_log, test_host_logging_format,
+                 test_repository_log):
+        test()
+        print(f"✅ {test.__name__}")
+    print("🎉 全部测试通过")
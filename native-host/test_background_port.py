@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试扩展background.js的Native Host端口复用和断开后重发
+用node加载background.js，chrome.runtime.connectNative返回模拟的端口
+"""
+
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+BACKGROUND_JS = Path(__file__).parent.parent / "extension" / "background.js"
+
+# 每次connectNative按顺序使用hosts中的一种模拟Host，用完后重复最后一种：
+# oneshot：只响应第一个消息（不带id）然后退出；persistent：按id响应每个消息；
+# dropSecond：按id响应第一个消息，收到第二个消息时不响应直接退出；dead：不响应直接退出
+HARNESS_SCRIPT = r"""
+const fs = require('fs');
+const { hosts, rounds } = JSON.parse(fs.readFileSync(0, 'utf8'));
+
+let listener = null;
+const ports = [];
+const event = () => {
+  const listeners = [];
+  return { addListener: (fn) => listeners.push(fn), fire: (value) => listeners.forEach(fn => fn(value)) };
+};
+
+function connectNative() {
+  const kind = hosts[Math.min(ports.length, hosts.length - 1)];
+  const port = { onMessage: event(), onDisconnect: event(), received: 0, closed: false };
+  const exit = (delay) => setTimeout(() => {
+    if (!port.closed) { port.closed = true; port.onDisconnect.fire(); }
+  }, delay);
+
+  port.postMessage = (message) => {
+    if (port.closed) throw new Error('Attempting to use a disconnected port object');
+    port.received += 1;
+    const reply = Object.assign({ success: true, url: message.url }, kind === 'oneshot' ? {} : { id: message.id });
+    if (kind === 'dead' || (kind === 'dropSecond' && port.received === 2)) {
+      exit(5);
+    } else if (kind !== 'oneshot' || port.received === 1) {
+      setTimeout(() => port.onMessage.fire(reply), 10);
+      if (kind === 'oneshot') exit(20);
+    }
+  };
+  port.disconnect = () => { port.closed = true; };
+  ports.push(port);
+  return port;
+}
+
+const noop = () => {};
+const chrome = {
+  runtime: {
+    onMessage: { addListener: (fn) => { listener = fn; } },
+    onInstalled: { addListener: noop },
+    connectNative,
+    lastError: undefined,
+  },
+  tabs: { sendMessage: () => Promise.resolve() },
+};
+const quiet = { log: noop, warn: noop, error: noop };
+new Function('chrome', 'console', fs.readFileSync(process.argv[1], 'utf8'))(chrome, quiet);
+
+// 每一轮同时发出若干请求，全部响应后再发下一轮
+async function main() {
+  const results = [];
+  for (const urls of rounds) {
+    const round = await Promise.all(urls.map(url => new Promise(resolve => {
+      listener({ action: 'openInChrome', url }, { tab: { id: 1 } }, resolve);
+    })));
+    results.push(round.map(r => r.success ? r.response.url : 'error: ' + r.error));
+  }
+  process.stdout.write(JSON.stringify({ results, connects: ports.length }));
+  process.exit(0);
+}
+main();
+"""
+
+def run_background(hosts, rounds):
+    node = shutil.which("node")
+    if node is None:
+        return None
+
+    result = subprocess.run(
+        [node, "-e", HARNESS_SCRIPT, str(BACKGROUND_JS)],
+        input=json.dumps({"hosts": hosts, "rounds": rounds}),
+        capture_output=True, text=True, encoding='utf-8', timeout=30, check=True,
+    )
+    return json.loads(result.stdout)
+
+def test_oneshot_host():
+    """单次Host不复用端口：同时发出的请求各自使用新端口，全部得到自己的响应"""
+    output = run_background(["oneshot"], [["a", "b", "c"], ["d"]])
+    if output is None:
+        print("未找到node，跳过")
+        return
+
+    assert output["results"] == [["a", "b", "c"], ["d"]]
+    assert output["connects"] == 4
+
+def test_persistent_host_reuses_port():
+    """Host回复带id的响应后，之后的请求复用同一个端口"""
+    output = run_background(["persistent"], [["a"], ["b", "c"], ["d"]])
+    if output is None:
+        print("未找到node，跳过")
+        return
+
+    assert output["results"] == [["a"], ["b", "c"], ["d"]]
+    assert output["connects"] == 1
+
+def test_resend_after_disconnect():
+    """复用的端口断开时，未响应的请求在新端口上重发，而不是直接失败"""
+    output = run_background(["dropSecond", "persistent"], [["a"], ["b"], ["c"]])
+    if output is None:
+        print("未找到node，跳过")
+        return
+
+    assert output["results"] == [["a"], ["b"], ["c"]]
+    assert output["connects"] == 2
+
+def test_resend_once():
+    """重发后仍然断开时请求失败，不会无限重试"""
+    output = run_background(["dead"], [["a"]])
+    if output is None:
+        print("未找到node，跳过")
+        return
+
+    assert output["results"] == [["error: Native Host连接断开"]]
+    assert output["connects"] == 2
+
+if __name__ == "__main__":
+    for test in (test_oneshot_host, test_persistent_host_reuses_port,
+                 test_resend_after_disconnect, test_resend_once):
+        test()
+        print(f"✅ {test.__name__}")
+    print("🎉 全部测试通过")
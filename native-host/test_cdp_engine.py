@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试DevTools协议引擎（使用本地模拟的DevTools端点，不需要Chrome）
+"""
+
+import socket
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+
+# 导入项目根目录下的DevTools引擎和同目录的模拟端点
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(Path(__file__).parent.absolute()))
+
+import cdp_engine
+from fake_cdp_server import FakeCDPServer
+from test_ultimate_host import run_host
+
+def free_port():
+    """取一个当前没有监听的端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def test_open_urls():
+    """批量打开时只有第一个URL新建窗口，连接在多次调用间复用"""
+    server = FakeCDPServer().start()
+    engine = cdp_engine.CDPEngine(port=server.port, active_port_files=[])
+
+    try:
+        urls = ["https://example.com/a", "https://example.com/b"]
+        target_ids = engine.open_urls(urls, ["--new-window"])
+        more = engine.open_urls(["https://example.com/c"], ["--new-tab"])
+    finally:
+        engine.close()
+        server.shutdown()
+        server.server_close()
+
+    created = server.created_targets
+    assert target_ids + more == [target["targetId"] for target in created]
+    assert [target["url"] for target in created] == urls + ["https://example.com/c"]
+    assert [target["newWindow"] for target in created] == [True, False, False]
+
+def test_unsupported_args():
+    """只能在启动时生效的参数交给Popen处理"""
+    engine = cdp_engine.CDPEngine(active_port_files=[])
+
+    assert engine.supports_args(["--new-window"])
+    assert not engine.supports_args(["--new-window", "--incognito"])
+
+def test_no_browser():
+    """没有可连接的浏览器时抛出CDPError，调用方据此回退"""
+    engine = cdp_engine.CDPEngine(port=free_port(), timeout=0.5, active_port_files=[])
+
+    assert engine.discover() is None
+    try:
+        engine.open_urls(["https://example.com/"])
+    except cdp_engine.CDPError:
+        pass
+    else:
+        raise AssertionError("没有浏览器时应抛出CDPError")
+
+def test_partial_open():
+    """第N个标签页打开失败时，错误中带有已经打开的targetId"""
+    server = FakeCDPServer(fail_create_after=2).start()
+    engine = cdp_engine.CDPEngine(port=server.port, active_port_files=[])
+
+    try:
+        engine.open_urls([f"https://example.com/{i}" for i in range(4)])
+    except cdp_engine.PartialOpenError as e:
+        assert e.target_ids == [target["targetId"] for target in server.created_targets]
+        assert len(e.target_ids) == 2
+    else:
+        raise AssertionError("部分打开失败时应抛出PartialOpenError")
+    finally:
+        engine.close()
+        server.shutdown()
+        server.server_close()
+
+def test_partial_batch_fallback():
+    """批量消息中DevTools已经打开的URL不再交给chrome.exe"""
+    if sys.platform == "win32":
+        return
+
+    server = FakeCDPServer(fail_create_after=1).start()
+    urls = ["https://example.com/a", "https://example.com/b", "https://example.com/c"]
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            # HOME指向临时目录，不会读到真实Chrome的DevToolsActivePort
+            responses = run_host([{"v": 2, "id": 1, "urls": urls}], workdir=workdir, HOME=workdir,
+                                 EDGE2CHROME_ENGINE="cdp", EDGE2CHROME_CDP_PORT=str(server.port),
+                                 EDGE2CHROME_COALESCE_MS="0")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    [response] = [response for response in responses if response.get("type") != "launchStatus"]
+    results = response["results"]
+    assert [target["url"] for target in server.created_targets] == urls[:1]
+    assert results[0]["engine"] == "cdp" and "pid" not in results[0]
+    assert all(result["success"] and "pid" in result for result in results[1:])
+    assert len(response["pids"]) == 1
+
+if __name__ == "__main__":
+    for test in (test_open_urls, test_unsupported_args, test_no_browser,
+                 test_partial_open, test_partial_batch_fallback):
+        test()
+        print(f"✅ {test.__name__}")
+    print("🎉 全部测试通过")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试Chrome启动参数解析
+"""
+
+import sys
+from pathlib import Path
+
+# 导入项目根目录下的参数解析模块
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+import chrome_flags
+from chrome_flags import ChromeArgsError, parse_chrome_args
+
+def expect_error(raw, reason):
+    try:
+        parse_chrome_args(raw)
+    except ChromeArgsError as e:
+        assert reason in str(e), str(e)
+    else:
+        raise AssertionError(f"{raw!r} 应被拒绝")
+
+def test_tokenize():
+    """双引号内的空格不分割，引号可以出现在参数中间"""
+    assert parse_chrome_args("--new-window  --incognito") == ["--new-window", "--incognito"]
+    assert parse_chrome_args('--user-data-dir="C:\\Program Files\\Chrome Data" --new-tab') == [
+        "--user-data-dir=C:\\Program Files\\Chrome Data", "--new-tab"
+    ]
+    assert parse_chrome_args('"--profile-directory=Profile 1"') == ["--profile-directory=Profile 1"]
+
+def test_defaults():
+    """空字符串和非字符串使用默认参数"""
+    assert parse_chrome_args("") == ["--new-window"]
+    assert parse_chrome_args("   ") == ["--new-window"]
+    assert parse_chrome_args(None) == ["--new-window"]
+
+def test_validation():
+    """禁止的参数、未允许的参数和非参数内容被拒绝"""
+    expect_error("--new-window --remote-debugging-port=9222", "禁止的参数")
+    expect_error("-REMOTE-DEBUGGING-PORT=9222", "禁止的参数")
+    expect_error("--new-window --some-unknown-flag", "未允许的参数")
+    expect_error("--new-window file:///etc/passwd", "不支持的参数")
+    expect_error('--user-data-dir="C:\\unterminated', "引号不匹配")
+
+def test_cache():
+    """相同的原始字符串只解析一次，返回的列表互不影响"""
+    raw = "--new-window --start-maximized"
+    before = chrome_flags.cache_stats()["hits"]
+
+    first = parse_chrome_args(raw)
+    first.append("--incognito")
+    second = parse_chrome_args(raw)
+
+    assert second == ["--new-window", "--start-maximized"]
+    assert chrome_flags.cache_stats()["hits"] >= before + 1
+
+if __name__ == "__main__":
+    for test in (test_tokenize, test_defaults, test_validation, test_cache):
+        test()
+        print(f"✅ {test.__name__}")
+    print("🎉 全部测试通过")
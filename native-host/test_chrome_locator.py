@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试Chrome定位器的路径缓存
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 导入项目根目录下的Chrome定位模块
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+import chrome_locator
+from chrome_locator import ChromeLocator
+
+def make_file(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb'):
+        pass
+    os.chmod(path, 0o755)
+    return path
+
+def test_cache_shared_between_processes():
+    """磁盘缓存由后来的定位器直接使用，不再扫描"""
+    with tempfile.TemporaryDirectory() as workdir:
+        cache_file = os.path.join(workdir, "cache", "chrome_path.json")
+        chrome = make_file(os.path.join(workdir, "b", "chrome.exe"))
+        candidates = [os.path.join(workdir, "a", "chrome.exe"), chrome]
+
+        first = ChromeLocator(candidates, cache_file, platform_defaults=False)
+        assert first.find() == chrome
+        assert first.find() == chrome
+        assert first.scans == 1
+
+        # 模拟另一个Host进程：候选列表为空也能从缓存得到路径
+        second = ChromeLocator([], cache_file, platform_defaults=False)
+        assert second.find() == chrome
+        assert second.scans == 0
+
+def test_rescan_when_missing():
+    """缓存的路径不存在时重新扫描"""
+    with tempfile.TemporaryDirectory() as workdir:
+        cache_file = os.path.join(workdir, "chrome_path.json")
+        old = make_file(os.path.join(workdir, "old", "chrome.exe"))
+        new = os.path.join(workdir, "new", "chrome.exe")
+
+        locator = ChromeLocator([old, new], cache_file, platform_defaults=False)
+        assert locator.find() == old
+
+        os.remove(old)
+        make_file(new)
+        assert locator.find() == new
+        assert locator.scans == 2
+
+        os.remove(new)
+        assert locator.find() is None
+
+def test_corrupt_cache():
+    """损坏的缓存文件按没有缓存处理"""
+    with tempfile.TemporaryDirectory() as workdir:
+        cache_file = os.path.join(workdir, "chrome_path.json")
+        chrome = make_file(os.path.join(workdir, "chrome.exe"))
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            f.write("{not json")
+
+        assert ChromeLocator([chrome], cache_file, platform_defaults=False).find() == chrome
+
+def test_probe_priority():
+    """并发探测仍按候选顺序选择，跳过不存在的路径和目录"""
+    with tempfile.TemporaryDirectory() as workdir:
+        low = make_file(os.path.join(workdir, "chromium"))
+        high = make_file(os.path.join(workdir, "google-chrome"))
+        candidates = [os.path.join(workdir, "missing"), workdir, high, low]
+
+        assert chrome_locator.probe(candidates) == high
+        assert chrome_locator.probe(candidates[:2]) is None
+
+def test_preferred_path():
+    """EDGE2CHROME_CHROME指定的路径优先，且不使用指向其他路径的缓存"""
+    with tempfile.TemporaryDirectory() as workdir:
+        cache_file = os.path.join(workdir, "chrome_path.json")
+        chrome = make_file(os.path.join(workdir, "chrome"))
+        custom = make_file(os.path.join(workdir, "custom", "chrome"))
+
+        assert ChromeLocator([chrome], cache_file, platform_defaults=False).find() == chrome
+
+        os.environ['EDGE2CHROME_CHROME'] = custom
+        try:
+            locator = ChromeLocator([chrome], cache_file, platform_defaults=False)
+        finally:
+            del os.environ['EDGE2CHROME_CHROME']
+
+        assert locator.find() == custom
+        assert locator.scans == 1
+
+def test_default_candidates():
+    """平台默认位置包含PATH中的目录"""
+    old_path = os.environ.get('PATH', '')
+    os.environ['PATH'] = os.pathsep.join([os.path.join("test", "bin"), old_path])
+    try:
+        candidates = chrome_locator.default_candidates()
+    finally:
+        os.environ['PATH'] = old_path
+
+    name = "chrome.exe" if sys.platform == "win32" else "google-chrome"
+    assert os.path.join("test", "bin", name) in candidates
+    if sys.platform.startswith("linux"):
+        assert "/opt/google/chrome/chrome" in candidates
+        assert "/snap/bin/chromium" in candidates
+
+if __name__ == "__main__":
+    for test in (test_cache_shared_between_processes, test_rescan_when_missing, test_corrupt_cache,
+                 test_probe_priority, test_preferred_path, test_default_candidates):
+        test()
+        print(f"✅ {test.__name__}")
+    print("🎉 全部测试通过")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试Native Host快速启动入口
+用 -X importtime 检查第一帧到达之前加载的模块和Host的导入耗时，超出预算时失败
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import nativemsg
+
+FAST_SCRIPT = PROJECT_ROOT / "edge2chrome_launcher_edge_fast.py"
+HOST_MODULE = "edge2chrome_launcher_edge_ultimate"
+
+# 与 edge2chrome_launcher_edge_fast.bat 相同的解释器参数
+PYTHON_FLAGS = ["-I", "-S"]
+
+# 收到第一帧后导入Host的预算：累计导入耗时（毫秒，取多次运行的最小值）和模块数
+IMPORT_BUDGET_MS = float(os.getenv('EDGE2CHROME_IMPORT_BUDGET_MS', '150'))
+MODULE_BUDGET = int(os.getenv('EDGE2CHROME_MODULE_BUDGET', '140'))
+BUDGET_RUNS = 3
+
+# 第一帧之前不能加载的模块
+DEFERRED_MODULES = {"logging", "subprocess", "signal", "threading", "json", "nativemsg", HOST_MODULE}
+
+def import_profile(args, stdin=b'', workdir=None):
+    """运行 python -X importtime，返回 (层级, 模块名, 自身耗时us, 累计耗时us) 列表和stdout"""
+    with tempfile.TemporaryDirectory() as tempdir:
+        workdir = workdir or tempdir
+        result = subprocess.run(
+            [sys.executable, *PYTHON_FLAGS, "-X", "importtime", *args],
+            input=stdin,
+            capture_output=True,
+            cwd=workdir,
+            env=dict(os.environ, EDGE2CHROME_CACHE_DIR=workdir),
+            timeout=30
+        )
+
+    entries = []
+    for line in result.stderr.decode('utf-8', 'replace').splitlines():
+        # "import time:       170 |        170 |   _io"，模块名前每层缩进两个空格
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            # 表头
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+
+    return entries, result.stdout
+
+def split_at_host(entries):
+    """按Host模块的导入分成 第一帧之前 和 Host导入 两部分
+
+    importtime在每个模块导入完成时输出一行，被导入的模块排在导入者之前
+    """
+    end = next(i for i, entry in enumerate(entries) if entry[0] == 0 and entry[1] == HOST_MODULE)
+    start = end
+    while start > 0 and entries[start - 1][0] > 0:
+        start -= 1
+    return entries[:start], entries[start:end + 1]
+
+def first_frame_profile():
+    return import_profile([str(FAST_SCRIPT)], nativemsg.encode_message({"v": 2, "id": 1, "type": "stats"}))
+
+def report(entries, limit=10):
+    """自身耗时最多的模块"""
+    lines = [f"   {name:<40}{self_us / 1000:>8.2f} ms" for _, name, self_us, _ in
+             sorted(entries, key=lambda entry: entry[2], reverse=True)[:limit]]
+    return "\n".join(lines)
+
+def test_deferred_imports():
+    """第一帧之前只加载解释器本身的模块"""
+    bare = {name for _, name, _, _ in import_profile(["-c", "pass"])[0]}
+    entries, stdout = first_frame_profile()
+    before, _ = split_at_host(entries)
+    loaded = {name for _, name, _, _ in before}
+
+    assert not loaded & DEFERRED_MODULES, loaded & DEFERRED_MODULES
+    assert loaded <= bare | {"msvcrt"}, loaded - bare
+
+    responses = nativemsg.FrameParser().feed(stdout)
+    assert len(responses) == 1
+    assert responses[0]["id"] == 1 and responses[0]["success"]
+
+def test_startup_budget():
+    """收到第一帧后导入Host的耗时和模块数不超过预算"""
+    runs = [split_at_host(first_frame_profile()[0])[1] for _ in range(BUDGET_RUNS)]
+    host = min(runs, key=lambda entries: entries[-1][3])
+    cumulative_ms = host[-1][3] / 1000
+
+    assert cumulative_ms <= IMPORT_BUDGET_MS, (
+        f"Host导入耗时 {cumulative_ms:.1f} ms 超过预算 {IMPORT_BUDGET_MS} ms\n{report(host)}"
+    )
+    assert len(host) <= MODULE_BUDGET, (
+        f"Host导入 {len(host)} 个模块，超过预算 {MODULE_BUDGET}\n{report(host)}"
+    )
+
+def test_no_frame():
+    """没有收到有效的第一帧时，Host照常返回错误响应"""
+    for stdin in (b'', b'\x01\x00', b'\x00\x00\x00\x00'):
+        _, stdout = import_profile([str(FAST_SCRIPT)], stdin)
+        responses = nativemsg.FrameParser().feed(stdout)
+        assert responses == [{"success": False, "error": "未收到有效消息"}], (stdin, responses)
+
+if __name__ == "__main__":
+    for test in (test_deferred_imports, test_startup_budget, test_no_frame):
+        test()
+        print(f"✅ {test.__name__}")
+
+    entries, _ = first_frame_profile()
+    before, host = split_at_host(entries)
+    print()
+    print(f"📊 第一帧之前: {len(before)} 个模块, {sum(e[3] for e in before if e[0] == 0) / 1000:.1f} ms")
+    print(f"📊 收到第一帧后导入Host: {len(host)} 个模块, {host[-1][3] / 1000:.1f} ms "
+          f"(预算 {IMPORT_BUDGET_MS} ms / {MODULE_BUDGET} 个)")
+    print(report(host))
+    print("🎉 全部测试通过")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试常驻守护进程和转发版Native Host
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(Path(__file__).parent.absolute()))
+
+import nativemsg
+from test_ultimate_host import SHIM_SCRIPT, host_env, make_fake_chrome, wait_removed
+
+def run_shim(messages, workdir, **env):
+    """启动转发Host，发送全部消息后关闭stdin，返回收到的所有响应"""
+    request = b''.join(nativemsg.encode_message(m) for m in messages)
+    result = subprocess.run(
+        [sys.executable, str(SHIM_SCRIPT)],
+        input=request,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        cwd=workdir,
+        env=host_env(workdir, **env),
+        timeout=15
+    )
+
+    return nativemsg.FrameParser().feed(result.stdout)
+
+def test_shared_daemon():
+    """多个转发Host共用同一个守护进程，中断时守护进程删除套接字"""
+    if sys.platform == "win32":
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        fake_chrome = make_fake_chrome(workdir, 0)
+        # 空闲时间足够长，两次连接之间守护进程不会退出
+        env = dict(EDGE2CHROME_CHROME=fake_chrome, EDGE2CHROME_COALESCE_MS="0",
+                   EDGE2CHROME_DAEMON_IDLE="60")
+        socket_file = os.path.join(workdir, "daemon.sock")
+
+        # 第一个转发Host启动守护进程
+        first = run_shim([{"url": "https://example.com/"}, {"v": 2, "id": 1, "type": "stats"}], workdir, **env)
+        first = [response for response in first if response.get("type") != "launchStatus"]
+        assert len(first) == 2 and first[0]["success"], first
+        daemon_pid = first[1]["stats"]["pid"]
+        assert os.path.exists(socket_file)
+        assert oct(os.stat(os.path.join(workdir, "daemon.key")).st_mode & 0o777) == "0o600"
+
+        try:
+            # 第二个转发Host连接同一个守护进程，看到第一次的启动记录
+            second = run_shim([{"v": 2, "id": 9, "type": "stats"}], workdir, **env)
+            assert len(second) == 1 and second[0]["id"] == 9
+            assert second[0]["stats"]["pid"] == daemon_pid
+            assert second[0]["stats"]["launches"]["launched"] == 1
+        finally:
+            os.kill(daemon_pid, signal.SIGINT)
+
+        assert wait_removed(socket_file)
+
+def test_no_message():
+    """没有收到有效消息时与终极适配版相同，返回错误响应；空闲后守护进程退出并删除套接字"""
+    if sys.platform == "win32":
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        responses = run_shim([], workdir, EDGE2CHROME_DAEMON_IDLE="1")
+        assert responses == [{"success": False, "error": "未收到有效消息"}]
+
+        assert wait_removed(os.path.join(workdir, "daemon.sock"))
+
+if __name__ == "__main__":
+    for test in (test_shared_daemon, test_no_message):
+        test()
+        print(f"✅ {test.__name__}")
+    print("🎉 全部测试通过")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试Native Host日志：队列写入和日志文件滚动
+"""
+
+import gzip
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 导入项目根目录下的日志模块
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+import host_logging
+from host_logging import RollingLogHandler
+
+def make_record(index):
+    return logging.LogRecord("test", logging.INFO, __file__, 0, "消息 %d %s", (index, "x" * 80), None)
+
+def test_rollover_and_compress():
+    """超过大小上限后滚动，旧文件在后台压缩，只保留指定数量"""
+    with tempfile.TemporaryDirectory() as workdir:
+        log_file = os.path.join(workdir, "host.log")
+        handler = RollingLogHandler(log_file, max_bytes=1024, backups=2, compress=True)
+
+        for index in range(100):
+            handler.emit(make_record(index))
+            handler.wait_maintenance()
+        handler.close()
+
+        segments = handler.segments()
+        assert len(segments) == 2
+        assert all(path.endswith(".gz") for path in segments)
+        with gzip.open(segments[-1], 'rt', encoding='utf-8') as f:
+            assert "消息" in f.read()
+
+        # 当前文件只包含最后一次滚动之后的记录
+        with open(log_file, encoding='utf-8') as f:
+            assert "消息 99" in f.read()
+
+def test_prune_by_age():
+    """超过保留天数的滚动文件在下次滚动时删除"""
+    with tempfile.TemporaryDirectory() as workdir:
+        log_file = os.path.join(workdir, "host.log")
+        old_segment = log_file + ".20200101-000000-1.gz"
+        with open(old_segment, 'wb'):
+            pass
+        old = time.time() - 30 * 86400
+        os.utime(old_segment, (old, old))
+
+        handler = RollingLogHandler(log_file, max_bytes=512, backups=10, max_age_days=7, compress=False)
+        for index in range(20):
+            handler.emit(make_record(index))
+        handler.wait_maintenance()
+        handler.close()
+
+        assert not os.path.exists(old_segment)
+        assert handler.segments()
+
+def test_history_kept_on_start():
+    """启动时追加写入，不清空上次的日志；队列中的日志在停止时写完"""
+    with tempfile.TemporaryDirectory() as workdir:
+        log_file = os.path.join(workdir, "host.log")
+        with open(log_file, 'w', encoding='utf-8') as f:
+            f.write("上次运行的日志\n")
+
+        host_logging.setup_host_logging(log_file, level=logging.INFO, stderr=False)
+        logging.info("本次运行: %s", "启动")
+        host_logging.stop_host_logging()
+
+        with open(log_file, encoding='utf-8') as f:
+            content = f.read()
+        assert content.startswith("上次运行的日志")
+        assert "本次运行: 启动" in content
+
+if __name__ == "__main__":
+    for test in (test_rollover_and_compress, test_prune_by_age, test_history_kept_on_start):
+        test()
+        print(f"✅ {test.__name__}")
+    print("🎉 全部测试通过")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试启动登记表的子进程回收和统计
+"""
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# 导入项目根目录下的启动登记表
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+from launch_registry import LaunchRegistry
+
+def spawn(code):
+    return subprocess.Popen([sys.executable, "-c", code])
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "等待超时"
+        time.sleep(0.01)
+
+def test_reap_counts():
+    """已退出的子进程被回收，按返回码计入正常退出或失败"""
+    registry = LaunchRegistry(interval=0.01)
+    running = spawn("import time; time.sleep(30)")
+
+    try:
+        registry.register(spawn("pass"), ["https://example.com/ok"])
+        registry.register(spawn("raise SystemExit(2)"), ["https://example.com/bad"])
+        live = registry.register(running, ["https://example.com/live"])
+
+        wait_for(lambda: registry.stats()["live"] == 1)
+
+        assert registry.stats() == {"launched": 3, "live": 1, "exited": 1, "failed": 1}
+        assert live.alive
+        failed = [record for record in registry.recent() if record.exit_code]
+        assert failed[0].urls == ["https://example.com/bad"]
+        assert failed[0].process is None
+    finally:
+        running.kill()
+
+    # 最后一个子进程回收后回收线程退出
+    wait_for(lambda: registry.stats()["live"] == 0)
+    assert not live.alive
+
+def test_slots():
+    """启动记录不带实例字典"""
+    registry = LaunchRegistry(interval=60)
+    process = spawn("pass")
+    record = registry.register(process, ["https://example.com/"])
+    process.wait()
+
+    assert not hasattr(record, "__dict__")
+    assert [reaped.pid for reaped in registry.reap()] == [process.pid]
+
+if __name__ == "__main__":
+    for test in (test_reap_counts, test_slots):
+        test()
+        print(f"✅ {test.__name__}")
+    print("🎉 全部测试通过")
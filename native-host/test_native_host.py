@@ -5,10 +5,14 @@
 """
 
 import subprocess
-import json
-import struct
 import sys
 import time
+from pathlib import Path
+
+# 导入项目根目录下的编解码模块
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+import nativemsg
 
 def test_native_host():
     """测试Native Host程序"""
@@ -35,15 +39,8 @@ def test_native_host():
         
         print(f"📤 发送测试消息: {test_message}")
         
-        # 将消息转换为Native Messaging格式
-        message_json = json.dumps(test_message)
-        message_bytes = message_json.encode('utf-8')
-        length_bytes = struct.pack('<I', len(message_bytes))
-        
-        # 发送消息
-        process.stdin.write(length_bytes)
-        process.stdin.write(message_bytes)
-        process.stdin.flush()
+        # 发送Native Messaging格式的消息
+        nativemsg.write_message(process.stdin, test_message)
         
         # 读取响应
         print("📥 等待响应...")
@@ -59,17 +56,13 @@ def test_native_host():
                 print(f"✅ 程序输出: {stdout.decode('utf-8')}")
                 
                 # 尝试解析响应
-                if len(stdout) >= 4:
-                    response_length = struct.unpack('<I', stdout[:4])[0]
-                    if len(stdout) >= 4 + response_length:
-                        response_data = stdout[4:4+response_length]
-                        response = json.loads(response_data.decode('utf-8'))
-                        print(f"📋 解析响应: {response}")
-                        
-                        if response.get('success'):
-                            print("🎉 测试成功!")
-                        else:
-                            print(f"❌ 测试失败: {response.get('error')}")
+                for response in nativemsg.FrameParser().feed(stdout):
+                    print(f"📋 解析响应: {response}")
+                    
+                    if response.get('success'):
+                        print("🎉 测试成功!")
+                    else:
+                        print(f"❌ 测试失败: {response.get('error')}")
             
         except subprocess.TimeoutExpired:
             process.kill()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试Native Messaging编解码模块
+"""
+
+import io
+import struct
+import sys
+from pathlib import Path
+
+# 导入项目根目录下的编解码模块
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+import nativemsg
+
+def test_round_trip():
+    """编码后的帧可以原样读回"""
+    message = {"url": "https://www.zhihu.com/question/12345", "source": "测试"}
+    stream = io.BytesIO()
+
+    written = nativemsg.write_message(stream, message)
+
+    assert written == len(stream.getvalue())
+    stream.seek(0)
+    assert nativemsg.read_message(stream) == message
+    assert nativemsg.read_message(stream) is None
+
+def test_size_limits():
+    """超过上限的消息在编码和解码两侧都被拒绝"""
+    try:
+        nativemsg.encode_message({"padding": "x" * 64}, max_size=32)
+        assert False, "应该抛出MessageTooLarge"
+    except nativemsg.MessageTooLarge:
+        pass
+
+    oversized = io.BytesIO(struct.pack('<I', nativemsg.MAX_MESSAGE_SIZE + 1))
+    try:
+        nativemsg.read_message(oversized)
+        assert False, "应该抛出MessageTooLarge"
+    except nativemsg.MessageTooLarge:
+        pass
+
+def test_truncated_frame():
+    """消息体不完整时报错，而不是返回半个消息"""
+    frame = nativemsg.encode_message({"url": "https://example.com"})
+    try:
+        nativemsg.read_message(io.BytesIO(frame[:-3]))
+        assert False, "应该抛出NativeMessageError"
+    except nativemsg.NativeMessageError:
+        pass
+
+def test_frame_parser_split_input():
+    """增量解析器在任意位置切分的数据上得到相同结果"""
+    messages = [{"id": i, "url": f"https://example.com/{i}"} for i in range(5)]
+    data = b''.join(nativemsg.encode_message(m) for m in messages)
+
+    for step in (1, 3, 7, len(data)):
+        parser = nativemsg.FrameParser()
+        parsed = []
+        for offset in range(0, len(data), step):
+            parsed.extend(parser.feed(data[offset:offset + step]))
+        assert parsed == messages
+        assert parser.pending_bytes == 0
+
+def test_frame_parser_malformed_payload():
+    """消息体无效时跳过这一帧，之前和之后的消息都不丢失"""
+    bad = b'{"url": '
+    data = (nativemsg.encode_message({"id": 1}) + nativemsg.HEADER.pack(len(bad)) + bad
+            + nativemsg.encode_message({"id": 2}))
+
+    parser = nativemsg.FrameParser()
+    try:
+        parser.feed(data)
+        assert False, "应该抛出MalformedMessage"
+    except nativemsg.MalformedMessage as e:
+        assert e.messages == [{"id": 1}]
+
+    assert parser.feed(b'') == [{"id": 2}]
+    assert parser.pending_bytes == 0
+
+if __name__ == "__main__":
+    for test in (test_round_trip, test_size_limits, test_truncated_frame,
+                 test_frame_parser_split_input, test_frame_parser_malformed_payload):
+        test()
+        print(f"✅ {test.__name__}")
+    print("🎉 全部测试通过")
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试URL规则索引和classify消息
+"""
+
+import base64
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 导入项目根目录下的规则索引模块
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+sys.path.insert(0, str(Path(__file__).parent.absolute()))
+
+import rule_index
+from rule_index import RuleIndex, load_rules_file
+from test_ultimate_host import run_host
+
+def bits(response):
+    bitmap = base64.b64decode(response["bitmap"])
+    return [bool(bitmap[i >> 3] & (1 << (i & 7))) for i in range(response["count"])]
+
+def test_trie_rules():
+    """* 只在开头或结尾的简单规则进入前缀树，与扩展一样匹配完整URL"""
+    index = RuleIndex(["*.zhihu.*", "*.example.com/*", "https://www.python.org/*", "*://docs.rs/*"])
+    assert index.trie_rules == 4 and index.residual_rules == 0
+
+    # . 匹配任意字符，* 可以跨过路径和查询参数
+    assert index.match("https://www.zhihu.com/question/1")
+    assert index.match("https://ZHIHU.com/")
+    assert index.match("https://example.org/?q=www.zhihu.com")
+    assert not index.match("zhihu.com")
+    assert not index.match("https://zhihu")
+
+    assert index.match("http://a.b.example.com/x")
+    assert index.match("https://evil.net/?u=a.example.com/")
+    assert not index.match("https://example.com")
+    assert not index.match("https://example.com:8443/")
+
+    assert index.match("https://www.python.org/downloads/")
+    assert index.match("https://wwwxpython.org/")
+    assert not index.match("http://www.python.org/")
+    assert not index.match("https://docs.python.org/")
+    assert index.match("ftp://docs.rs/")
+
+    # JS正则的 . 不匹配换行符
+    assert not index.match("https://www.zhihu.com/\n")
+
+def test_residual_rules():
+    """其他规则合并为正则，通配符的转换方式与扩展相同"""
+    index = RuleIndex(["https://*/download?id=*", "*github.com/*/issues*", "x|y", "bad(", 42])
+    assert index.trie_rules == 0
+    assert index.residual_rules == 3
+    assert index.invalid_rules == ["bad("]
+
+    assert index.match("https://a.example/download?id=7")
+    assert index.match("https://github.com/org/repo/issues/1")
+    assert not index.match("https://github.com/org/repo/pulls")
+    # 规则中的 | 按正则解释
+    assert index.match("x") and index.match("y")
+
+PARITY_SCRIPT = """
+const fs = require('fs');
+const UrlMatcher = new Function(fs.readFileSync(process.argv[1], 'utf8') + '; return UrlMatcher;')();
+const { rules, urls } = JSON.parse(fs.readFileSync(0, 'utf8'));
+const matcher = new UrlMatcher(rules);
+process.stdout.write(JSON.stringify(urls.map(url => matcher.test(url))));
+"""
+
+PARITY_RULES = [
+    "*.zhihu.*", "*.example.com/*", "https://www.python.org/*", "*://docs.rs/*", "*github.com",
+    "https://*/download?id=*", "*github.com/*/issues*", "?*", "*??", "*?a?*", "exact", "",
+    "x|y", "(foo|bar)*", "*[0-9]*.pdf", "https://例子.com/*",
+]
+
+PARITY_URLS = [
+    "https://www.zhihu.com/question/1", "https://zhihu.com/", "https://example.org/?q=www.zhihu.com",
+    "https://ZHIHU.COM.CN/", "https://example.com", "https://example.com:8443/", "https://a.example.com/",
+    "https://www.python.org/", "https://wwwxpython.org/a", "HTTP://WWW.PYTHON.ORG/", "ftp://docs.rs/",
+    "https://github.com", "https://gist.github.com/x/issues/2", "https://a.b/download?id=", "exact", "EXACT",
+    "", "a", "ab", "bab", "x", "foo", "barbaz", "https://a/1.pdf", "https://例子.com/", "https://xn--fsqu00a.com/",
+    "https://www.zhihu.com/\n", "https://www.zhihu.com/\r", "https://www.zhihu.com/\u2028",
+    "https://www.zhihu.com/\U0001f600", "\U0001f600", "https://ſ.zhihu.com/", "https://\u212aa.example.com/",
+]
+
+def test_matcher_parity():
+    """同一组规则和URL经扩展的url_matcher.js和规则索引得到相同的结果"""
+    node = shutil.which("node")
+    if node is None:
+        print("未找到node，跳过")
+        return
+
+    matcher_js = Path(__file__).parent.parent / "extension" / "url_matcher.js"
+    result = subprocess.run(
+        [node, "-e", PARITY_SCRIPT, str(matcher_js)],
+        input=json.dumps({"rules": PARITY_RULES, "urls": PARITY_URLS}),
+        capture_output=True, text=True, encoding='utf-8', timeout=30, check=True,
+    )
+    expected = json.loads(result.stdout)
+
+    index = RuleIndex(PARITY_RULES)
+    assert index.trie_rules > 0 and index.residual_rules > 0
+    mismatches = [url for url, verdict in zip(PARITY_URLS, expected) if index.match(url) != verdict]
+    assert not mismatches, mismatches
+
+    # 每条规则单独比较，前缀树中的规则不会被其他规则掩盖
+    for rule in PARITY_RULES:
+        result = subprocess.run(
+            [node, "-e", PARITY_SCRIPT, str(matcher_js)],
+            input=json.dumps({"rules": [rule], "urls": PARITY_URLS}),
+            capture_output=True, text=True, encoding='utf-8', timeout=30, check=True,
+        )
+        index = RuleIndex([rule])
+        verdicts = [index.match(url) for url in PARITY_URLS]
+        assert verdicts == json.loads(result.stdout), rule
+
+def test_classify_bitmap():
+    """位图第i位对应第i个链接，非字符串链接不匹配"""
+    hrefs = ["https://www.zhihu.com/"] + ["https://other.net/"] * 8 + ["https://zhihu.com/x", None]
+    response = rule_index.classify_message({"type": "classify", "hrefs": hrefs, "rules": ["*.zhihu.*"]})
+
+    assert response["success"] and response["count"] == 11 and response["matched"] == 2
+    assert bits(response) == [True] + [False] * 8 + [True, False]
+    assert len(base64.b64decode(response["bitmap"])) == 2
+
+    assert not rule_index.classify_message({"type": "classify", "hrefs": "x"})["success"]
+
+def test_rules_file():
+    """规则文件修改后重新建立索引"""
+    with tempfile.TemporaryDirectory() as workdir:
+        rules_file = os.path.join(workdir, "rules.txt")
+        with open(rules_file, 'w', encoding='utf-8') as f:
+            f.write("# 企业规则\n*.zhihu.*\n\n")
+
+        first = load_rules_file(rules_file)
+        assert load_rules_file(rules_file) is first
+        assert first.match("https://www.zhihu.com/") and not first.match("https://docs.rs/")
+
+        with open(rules_file, 'a', encoding='utf-8') as f:
+            f.write("*://docs.rs/*\n")
+        # 部分文件系统的mtime精度较低，文件大小也已改变
+        time.sleep(0.01)
+        second = load_rules_file(rules_file)
+        assert second is not first and second.match("https://docs.rs/")
+
+def test_classify_message():
+    """Native Host处理classify消息"""
+    with tempfile.TemporaryDirectory() as workdir:
+        rules_file = os.path.join(workdir, "rules.txt")
+        with open(rules_file, 'w', encoding='utf-8') as f:
+            f.write("*.zhihu.*\n")
+
+        hrefs = ["https://www.zhihu.com/", "https://example.com/"]
+        responses = run_host([
+            {"v": 2, "id": 1, "type": "classify", "hrefs": hrefs},
+            {"v": 2, "id": 2, "type": "classify", "hrefs": hrefs, "rules": ["*.example.com/*"]},
+        ], workdir=workdir, EDGE2CHROME_RULES_FILE=rules_file)
+
+    by_id = {response["id"]: response for response in responses}
+    assert bits(by_id[1]) == [True, False]
+    assert bits(by_id[2]) == [False, True]
+    assert by_id[2]["rules"] == {"trie_rules": 1, "residual_rules": 0, "invalid_rules": 0}
+
+if __name__ == "__main__":
+    for test in (test_trie_rules, test_residual_rules, test_matcher_parity, test_classify_bitmap,
+                 test_rules_file, test_classify_message):
+        test()
+        print(f"✅ {test.__name__}")
+    print("🎉 全部测试通过")
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试Edge终极适配版Native Host的常驻模式和通信协议
+"""
+
+import glob
+import json
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+
+# 导入项目根目录下的编解码模块
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import nativemsg
+from edge2chrome_launcher_edge_ultimate import LaunchCoalescer, LaunchWatcher
+
+HOST_SCRIPT = PROJECT_ROOT / "edge2chrome_launcher_edge_ultimate.py"
+ASYNC_HOST_SCRIPT = PROJECT_ROOT / "edge2chrome_launcher_edge_async.py"
+SHIM_SCRIPT = PROJECT_ROOT / "edge2chrome_launcher_edge_shim.py"
+
+def host_env(workdir, **overrides):
+    """Chrome路径缓存写到临时目录；默认启动模拟的Chrome并关闭CDP引擎，测试不会打开真实的Chrome窗口"""
+    env = dict(os.environ, EDGE2CHROME_CACHE_DIR=workdir, EDGE2CHROME_ENGINE="popen")
+    if "EDGE2CHROME_CHROME" not in overrides:
+        env["EDGE2CHROME_CHROME"] = make_fake_chrome(workdir, 0)
+    env.update(overrides)
+    return env
+
+def make_fake_chrome(workdir, exit_code):
+    """模拟的Chrome：启动后以指定返回码退出"""
+    fake_chrome = os.path.join(workdir, "google-chrome")
+    with open(fake_chrome, 'w') as f:
+        f.write(f"#!/bin/sh\nexit {exit_code}\n")
+    os.chmod(fake_chrome, 0o755)
+    return fake_chrome
+
+def wait_removed(path, timeout=10):
+    deadline = time.monotonic() + timeout
+    while os.path.exists(path):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+def run_host(messages, timeout=10, workdir=None, script=HOST_SCRIPT, **env):
+    """启动Native Host，发送全部消息后关闭stdin，返回收到的所有响应
+
+    bytes类型的消息作为原始数据直接发送
+    """
+    if workdir is None:
+        # 在临时目录运行，避免日志目录写到项目里
+        with tempfile.TemporaryDirectory() as workdir:
+            return run_host(messages, timeout, workdir, script, **env)
+
+    request = b''.join(m if isinstance(m, bytes) else nativemsg.encode_message(m) for m in messages)
+    result = subprocess.run(
+        [sys.executable, str(script)],
+        input=request,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        cwd=workdir,
+        env=host_env(workdir, **env),
+        timeout=timeout
+    )
+
+    return nativemsg.FrameParser().feed(result.stdout)
+
+def test_persistent_mode():
+    """同一个进程依次响应多个消息"""
+    responses = run_host([{"url": "https://example.com/1"}, {"url": "https://example.com/2"}, {}])
+
+    assert len(responses) == 3
+    assert responses[2] == {"success": False, "error": "无效的消息格式"}
+
+def test_malformed_frame():
+    """消息体不是有效JSON时回复错误，常驻会话继续处理之后的消息"""
+    bad = b'{"url": '
+    responses = run_host([
+        {"v": 2, "id": 1, "type": "stats"},
+        nativemsg.HEADER.pack(len(bad)) + bad,
+        {"v": 2, "id": 2, "type": "stats"},
+    ])
+
+    assert len(responses) == 3
+    assert responses[0]["id"] == 1 and responses[2]["id"] == 2
+    assert responses[1]["success"] is False and "读取消息失败" in responses[1]["error"]
+
+def test_list_chrome_args():
+    """chromeArgs不是字符串时按默认参数启动，之后的消息仍然得到响应"""
+    for script in (HOST_SCRIPT, ASYNC_HOST_SCRIPT):
+        responses = run_host([
+            {"v": 2, "id": 1, "url": "https://example.com/", "chromeArgs": ["--new-window"]},
+            {"v": 2, "id": 2, "type": "stats"},
+        ], script=script)
+
+        by_id = {response["id"]: response for response in responses if response.get("type") != "launchStatus"}
+        assert sorted(by_id) == [1, 2], (script, responses)
+        assert by_id[1]["success"] and by_id[2]["success"]
+
+def test_async_concurrency():
+    """asyncio并发版：耗时的启动请求不阻塞之后的请求，响应按ID对应；无效的消息体单独回复错误"""
+    bad = b'{"url": '
+    # 兼容模式下每次启动Chrome后等待0.2秒
+    responses = run_host([
+        {"v": 2, "id": 1, "url": "https://example.com/slow"},
+        nativemsg.HEADER.pack(len(bad)) + bad,
+        {"v": 2, "id": 2, "type": "stats"},
+    ], script=ASYNC_HOST_SCRIPT, EDGE2CHROME_COMPAT="1", EDGE2CHROME_COALESCE_MS="0")
+
+    responses = [response for response in responses if response.get("type") != "launchStatus"]
+    replies = [response for response in responses if "id" in response]
+    errors = [response for response in responses if "id" not in response]
+
+    # 后发出的stats先于启动请求响应
+    assert [response["id"] for response in replies] == [2, 1], responses
+    assert "stats" in replies[0] and replies[1]["success"]
+    assert len(errors) == 1 and "读取消息失败" in errors[0]["error"]
+
+def test_request_ids():
+    """v2消息的响应带回请求ID，v1消息的响应保持原格式"""
+    responses = run_host([
+        {"v": 2, "id": 7, "url": "https://example.com/v2"},
+        {"url": "https://example.com/v1"},
+    ])
+
+    # v2请求可能进入启动合并窗口，响应顺序不固定；模拟的Chrome退出后还会推送launchStatus
+    responses = [response for response in responses if response.get("type") != "launchStatus"]
+    v2 = [response for response in responses if "id" in response]
+    v1 = [response for response in responses if "id" not in response]
+
+    assert len(v2) == 1 and len(v1) == 1
+    assert v2[0]["id"] == 7
+    assert v2[0]["v"] == 2
+    assert "v" not in v1[0]
+
+def test_batch_message():
+    """批量消息为每个URL返回一条结果，无效的URL单独标记"""
+    urls = ["https://example.com/a", "", "https://example.com/b", 42]
+    responses = run_host([{"v": 2, "id": 1, "urls": urls}])
+
+    results = responses[0]["results"]
+    assert responses[0]["id"] == 1
+    assert [result["url"] for result in results] == urls
+    assert results[1]["error"] == "无效的URL"
+    assert results[3]["error"] == "无效的URL"
+
+def test_coalescing_stats():
+    """合并窗口内的v2启动请求计入合并统计，每个请求仍各自得到响应"""
+    responses = run_host([
+        {"v": 2, "id": 1, "url": "https://example.com/1"},
+        {"v": 2, "id": 2, "url": "https://example.com/2"},
+        {"v": 2, "id": 3, "type": "stats"},
+    ])
+
+    by_id = {response["id"]: response for response in responses}
+    assert sorted(by_id) == [1, 2, 3]
+    assert by_id[3]["stats"]["coalescing"]["requests"] == 2
+    assert "live" in by_id[3]["stats"]["launches"]
+
+def test_coalescer_flush_owner():
+    """按连接flush时只启动该连接的请求，其他连接的请求继续等待合并"""
+    coalescer = LaunchCoalescer(60)
+    coalescer._launch_group = lambda chrome_args, entries, watches: [{"url": entry[0]} for entry in entries]
+    first, second = object(), object()
+    done = []
+
+    coalescer.submit("https://example.com/a", "--new-window", done.append, owner=first)
+    coalescer.submit("https://example.com/b", "--new-window", done.append, owner=second)
+
+    coalescer.flush(owner=first)
+    assert done == [{"url": "https://example.com/a"}]
+
+    coalescer.flush()
+    assert done[1:] == [{"url": "https://example.com/b"}]
+
+def test_coalesced_failure_urls():
+    """合并启动失败时，每个请求的结果都带有自己的URL"""
+    coalescer = LaunchCoalescer(60)
+    done = []
+
+    # 引号不匹配的参数在启动Chrome之前就失败
+    coalescer.submit("https://example.com/a", '"--new-window', done.append)
+    coalescer.submit("https://example.com/b", '"--new-window', done.append)
+    coalescer.submit("https://example.com/c", '"--incognito', done.append)
+    coalescer.flush()
+
+    assert sorted(result["url"] for result in done) == [
+        "https://example.com/a", "https://example.com/b", "https://example.com/c"]
+    assert all(not result["success"] and "Chrome参数无效" in result["error"] for result in done)
+
+def test_launch_watcher():
+    """启动校验区分异常退出、正常交接和仍在运行的进程"""
+    watcher = LaunchWatcher(window=1.0, interval=0.01)
+    statuses = queue.Queue()
+
+    failed = subprocess.Popen([sys.executable, "-c", "raise SystemExit(3)"])
+    handed_off = subprocess.Popen([sys.executable, "-c", "pass"])
+    running = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+
+    try:
+        for process, name in ((failed, "failed"), (handed_off, "handed_off"), (running, "running")):
+            watcher.watch(process, [name], statuses.put)
+
+        by_url = {}
+        for _ in range(3):
+            status = statuses.get(timeout=10)
+            by_url[status["urls"][0]] = status
+    finally:
+        running.kill()
+        running.wait()
+
+    assert by_url["failed"]["success"] is False
+    assert by_url["failed"]["exit_code"] == 3
+    assert by_url["handed_off"]["status"] == "exited"
+    assert by_url["running"]["status"] == "running"
+    assert all(status["type"] == "launchStatus" for status in by_url.values())
+
+def test_launch_status_push():
+    """启动后立即响应accepted，Chrome异常退出时再推送launchStatus"""
+    if sys.platform == "win32":
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # 模拟启动后立即失败的Chrome
+        fake_chrome = make_fake_chrome(workdir, 3)
+
+        host = subprocess.Popen(
+            [sys.executable, str(HOST_SCRIPT)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=workdir,
+            env=host_env(workdir, EDGE2CHROME_CHROME=fake_chrome, EDGE2CHROME_COALESCE_MS="0")
+        )
+        try:
+            nativemsg.write_message(host.stdin, {"v": 2, "id": 5, "url": "https://example.com/"})
+            response = nativemsg.read_message(host.stdout)
+            status = nativemsg.read_message(host.stdout)
+        finally:
+            host.stdin.close()
+            host.wait(timeout=10)
+            host.stdout.close()
+
+    assert response["id"] == 5 and response["status"] == "accepted"
+    assert response["chrome_path"] == fake_chrome
+    assert status["id"] == 5 and status["type"] == "launchStatus"
+    assert status["success"] is False and status["exit_code"] == 3
+
+def test_coalesced_status_order():
+    """合并启动的请求也先收到响应、再收到启动校验结果（Chrome立即退出时最容易乱序）"""
+    if sys.platform == "win32":
+        return
+
+    for script in (HOST_SCRIPT, ASYNC_HOST_SCRIPT):
+        for _ in range(5):
+            responses = run_host([
+                {"v": 2, "id": 1, "url": "https://example.com/1"},
+                {"v": 2, "id": 2, "url": "https://example.com/2"},
+            ], script=script, EDGE2CHROME_COALESCE_MS="25")
+
+            for request_id in (1, 2):
+                kinds = [response.get("type") for response in responses if response["id"] == request_id]
+                assert kinds == [None, "launchStatus"], (script, responses)
+                assert responses[[r["id"] for r in responses].index(request_id)]["status"] == "accepted"
+
+def test_launch_status_after_eof():
+    """stdin关闭后仍等待启动校验结果推送完毕再退出（终极适配版、asyncio并发版和转发Host+守护进程）"""
+    if sys.platform == "win32":
+        return
+
+    for script in (HOST_SCRIPT, ASYNC_HOST_SCRIPT, SHIM_SCRIPT):
+        with tempfile.TemporaryDirectory() as workdir:
+            # 在stdin关闭之后才异常退出的Chrome
+            slow_chrome = os.path.join(workdir, "slow-chrome")
+            with open(slow_chrome, 'w') as f:
+                f.write("#!/bin/sh\nsleep 0.3\nexit 3\n")
+            os.chmod(slow_chrome, 0o755)
+
+            # 转发Host启动的守护进程空闲1秒后退出并删除套接字
+            responses = run_host([{"v": 2, "id": 4, "url": "https://example.com/"}], workdir=workdir,
+                                 script=script, EDGE2CHROME_CHROME=slow_chrome, EDGE2CHROME_COALESCE_MS="0",
+                                 EDGE2CHROME_DAEMON_IDLE="1")
+            assert wait_removed(os.path.join(workdir, "daemon.sock"))
+
+        assert [response.get("type") for response in responses] == [None, "launchStatus"], (script, responses)
+        assert responses[1]["id"] == 4 and responses[1]["exit_code"] == 3
+
+def test_request_events():
+    """每个请求写出一条JSONL事件，包含各阶段耗时"""
+    if sys.platform == "win32":
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        fake_chrome = make_fake_chrome(workdir, 0)
+        run_host([
+            {"v": 2, "id": 1, "url": "https://example.com/"},
+            {"v": 2, "id": 2, "type": "stats"},
+        ], workdir=workdir, EDGE2CHROME_CHROME=fake_chrome, EDGE2CHROME_COALESCE_MS="0")
+
+        # 日志目录是Windows路径，在其他平台上作为相对目录创建
+        [events_file] = glob.glob(os.path.join(workdir, "**", "edge_ultimate.events.jsonl"), recursive=True)
+        with open(events_file, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+
+    by_id = {record["id"]: record for record in records}
+    assert sorted(by_id) == [1, 2]
+
+    launch = by_id[1]
+    assert launch["kind"] == "url" and launch["ok"] and launch["status"] == "accepted"
+    for name in ("read", "decode", "discover", "popen", "write", "total"):
+        assert launch["ms"][name] >= 0
+    assert by_id[2]["kind"] == "stats" and "popen" not in by_id[2]["ms"]
+
+if __name__ == "__main__":
+    for test in (test_persistent_mode, test_malformed_frame, test_list_chrome_args, test_async_concurrency,
+                 test_request_ids, test_batch_message, test_coalescing_stats, test_coalescer_flush_owner,
+                 test_coalesced_failure_urls, test_launch_watcher, test_launch_status_push,
+                 test_coalesced_status_order, test_launch_status_after_eof, test_request_events):
+        test()
+        print(f"✅ {test.__name__}")
+    print("🎉 全部测试通过")
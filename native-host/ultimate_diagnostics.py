@@ -11,9 +11,13 @@ import winreg
 import subprocess
 import sys
 import time
-import struct
 from pathlib import Path
 
+# 导入项目根目录下的编解码模块
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+import nativemsg
+
 class UltimateDiagnostics:
     def __init__(self):
         self.script_dir = Path(__file__).parent.absolute()
@@ -141,10 +145,7 @@ class UltimateDiagnostics:
                 "chromeArgs": "--new-window"
             }
             
-            message_json = json.dumps(test_message)
-            message_bytes = message_json.encode('utf-8')
-            length_bytes = struct.pack('<I', len(message_bytes))
-            input_data = length_bytes + message_bytes
+            input_data = nativemsg.encode_message(test_message)
             
             # 启动进程
             process = subprocess.Popen(
@@ -167,18 +168,19 @@ class UltimateDiagnostics:
                     print(f"📤 错误输出:")
                     print(stderr_text)
                 
-                if stdout and len(stdout) >= 4:
+                if stdout and len(stdout) >= nativemsg.HEADER_SIZE:
                     # 解析响应
-                    response_length = struct.unpack('<I', stdout[:4])[0]
-                    if len(stdout) >= 4 + response_length:
-                        response_data = stdout[4:4+response_length]
-                        try:
-                            response = json.loads(response_data.decode('utf-8'))
-                            print(f"✅ 收到响应: {response}")
-                            return True
-                        except:
-                            print(f"❌ 响应解析失败")
-                            print(f"原始响应: {stdout}")
+                    try:
+                        responses = nativemsg.FrameParser().feed(stdout)
+                    except nativemsg.NativeMessageError:
+                        responses = []
+                    
+                    if responses:
+                        print(f"✅ 收到响应: {responses[0]}")
+                        return True
+                    
+                    print(f"❌ 响应解析失败")
+                    print(f"原始响应: {stdout}")
                 else:
                     print("❌ 没有收到有效响应")
                     if stdout:
@@ -204,11 +206,11 @@ class UltimateDiagnostics:
             # 创建最简单的测试脚本
             minimal_script = '''#!/usr/bin/env python3
 import sys
-import json
-import struct
 import subprocess
 import os
 
+import nativemsg
+
 # 设置二进制模式
 if sys.platform == "win32":
     import msvcrt
@@ -223,11 +225,8 @@ def main():
             log.flush()
         
         # 读取输入
-        length_data = sys.stdin.buffer.read(4)
-        if len(length_data) == 4:
-            length = struct.unpack('<I', length_data)[0]
-            message_data = sys.stdin.buffer.read(length)
-            message = json.loads(message_data.decode('utf-8'))
+        message = nativemsg.read_message(sys.stdin.buffer)
+        if message is not None:
             
             # 记录消息
             with open("minimal_test.log", "a") as log:
@@ -244,13 +243,7 @@ def main():
                 response = {"success": False, "error": "Chrome not found"}
             
             # 发送响应
-            response_json = json.dumps(response)
-            response_bytes = response_json.encode('utf-8')
-            length_bytes = struct.pack('<I', len(response_bytes))
-            
-            sys.stdout.buffer.write(length_bytes)
-            sys.stdout.buffer.write(response_bytes)
-            sys.stdout.buffer.flush()
+            nativemsg.write_message(sys.stdout.buffer, response)
             
             with open("minimal_test.log", "a") as log:
                 log.write(f"Sent response: {response}\\n")
@@ -110,7 +110,7 @@ def create_correct_manifest():
         "content_scripts": [
             {
                 "matches": ["<all_urls>"],
-                "js": ["content.js"],
+                "js": ["url_matcher.js", "content.js"],
                 "css": ["style.css"]
             }
         ],
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Edge2Chrome Native Messaging 编解码模块
+所有Native Host和测试工具共用的消息帧实现：4字节小端序长度 + UTF-8 JSON
+"""
+
+import json
+import struct
+
+# 单个消息的大小上限（Native Host -> 浏览器的限制为1MB）
+MAX_MESSAGE_SIZE = 1024 * 1024
+
+HEADER = struct.Struct('<I')
+HEADER_SIZE = HEADER.size
+
+class NativeMessageError(Exception):
+    """消息帧或消息内容无效"""
+
+class MessageTooLarge(NativeMessageError):
+    """消息长度超过上限"""
+
+class MalformedMessage(NativeMessageError):
+    """消息体不是有效的UTF-8 JSON；帧边界完整，可以继续读取下一个消息"""
+
+def encode_message(message, max_size=MAX_MESSAGE_SIZE):
+    """将消息编码为完整的帧（长度前缀 + JSON）"""
+    payload = json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    if len(payload) > max_size:
+        raise MessageTooLarge(f"消息长度过大: {len(payload)}")
+
+    return HEADER.pack(len(payload)) + payload
+
+def decode_message(payload):
+    """解码消息体（bytes/bytearray），不生成中间字符串"""
+    try:
+        return json.loads(payload)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise MalformedMessage(f"消息解析失败: {e}") from e
+
+def decode_length(header, max_size=MAX_MESSAGE_SIZE):
+    """解析4字节长度前缀并检查范围"""
+    message_length = HEADER.unpack(header)[0]
+
+    if message_length == 0:
+        raise NativeMessageError("消息长度为0")
+
+    if message_length > max_size:
+        raise MessageTooLarge(f"消息长度过大: {message_length}")
+
+    return message_length
+
+def read_exact_into(stream, length):
+    """读取恰好length字节到预分配的bytearray中，流提前结束时返回None"""
+    buffer = bytearray(length)
+    received = 0
+
+    with memoryview(buffer) as view:
+        while received < length:
+            count = stream.readinto(view[received:])
+            if not count:
+                return None
+            received += count
+
+    return buffer
+
+def read_message(stream, max_size=MAX_MESSAGE_SIZE):
+    """从二进制流读取一个消息
+
+    流在消息边界结束时返回None；帧不完整或内容无效时抛出NativeMessageError
+    """
+    header = read_exact_into(stream, HEADER_SIZE)
+
+    if header is None:
+        return None
+
+    payload = read_exact_into(stream, decode_length(header, max_size))
+
+    if payload is None:
+        raise NativeMessageError("消息读取中断")
+
+    return decode_message(payload)
+
+def write_message(stream, message, max_size=MAX_MESSAGE_SIZE):
+    """向二进制流写入一个消息：一次写入完整帧，一次刷新，返回写入的字节数"""
+    frame = encode_message(message, max_size)
+    stream.write(frame)
+    stream.flush()
+    return len(frame)
+
+class FrameParser:
+    """增量帧解析器 - 适用于非阻塞读取、管道和socket等分段到达的数据
+
+    用法:
+        parser = FrameParser()
+        for message in parser.feed(data):
+            ...
+
+    feed抛出的异常带有messages属性：同一次调用中在出错之前已经解析的消息。
+    MalformedMessage之后解析器已跳过该消息，feed(b'')继续解析缓冲区中剩余的数据；
+    长度前缀无效时帧边界无法确定，之后的feed会再次抛出异常
+    """
+
+    def __init__(self, max_size=MAX_MESSAGE_SIZE):
+        self.max_size = max_size
+        self._buffer = bytearray()
+        self._offset = 0
+        self._expected = None
+
+    def feed(self, data):
+        """追加数据，返回已经完整到达的消息列表"""
+        self._buffer += data
+        messages = []
+
+        try:
+            self._parse(messages)
+        except NativeMessageError as e:
+            e.messages = messages
+            raise
+        finally:
+            # 丢弃已解析的数据，避免缓冲区无限增长
+            if self._offset:
+                del self._buffer[:self._offset]
+                self._offset = 0
+
+        return messages
+
+    def _parse(self, messages):
+        while True:
+            available = len(self._buffer) - self._offset
+
+            if self._expected is None:
+                if available < HEADER_SIZE:
+                    break
+                header = self._buffer[self._offset:self._offset + HEADER_SIZE]
+                self._expected = decode_length(header, self.max_size)
+                self._offset += HEADER_SIZE
+                continue
+
+            if available < self._expected:
+                break
+
+            end = self._offset + self._expected
+            payload = self._buffer[self._offset:end]
+            # 先移过这一帧：消息体无效时下一次feed从下一帧开始
+            self._offset = end
+            self._expected = None
+            messages.append(decode_message(payload))
+
+    @property
+    def pending_bytes(self):
+        """尚未组成完整消息的字节数"""
+        return len(self._buffer) - self._offset
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Edge2Chrome 请求计时
+每个请求按阶段（读取帧、解析JSON、查找Chrome、启动进程、写出响应）记录单调时钟耗时，
+响应发出后写出一条JSONL事件记录，便于汇总成千上万次启动的各阶段延迟
+"""
+
+import logging
+import threading
+import time
+
+# 事件日志由host_logging配置，未配置事件文件时不生成记录
+from host_logging import events
+
+_local = threading.local()
+
+class RequestSpan:
+    """一个请求的计时记录"""
+
+    __slots__ = ("wall", "started", "last", "phases", "fields", "finished")
+
+    def __init__(self):
+        self.begin()
+        self.phases = {}
+        self.fields = {}
+        self.finished = False
+
+    def begin(self):
+        """从现在开始计时（请求的第一个字节到达时调用）"""
+        self.wall = time.time()
+        self.started = self.last = time.monotonic()
+
+    def mark(self, phase):
+        """记录从上一个标记到现在的耗时，用于依次进行的阶段"""
+        now = time.monotonic()
+        self.add(phase, now - self.last)
+        self.last = now
+
+    def add(self, phase, duration):
+        self.phases[phase] = self.phases.get(phase, 0) + duration
+
+    def describe(self, message):
+        """记录请求的类型和ID"""
+        if not isinstance(message, dict):
+            self.fields["kind"] = "invalid"
+            return
+
+        if isinstance(message.get("urls"), list):
+            self.fields.update(kind="urls", n=len(message["urls"]))
+        elif "type" in message:
+            self.fields["kind"] = str(message["type"])
+        elif "url" in message:
+            self.fields["kind"] = "url"
+        else:
+            self.fields["kind"] = "invalid"
+
+        if "id" in message:
+            self.fields["id"] = message["id"]
+
+    def wrap_reply(self, send):
+        """包装发送函数：第一次调用（响应）计入write阶段并写出事件记录，之后的推送不再计时"""
+        def reply(response):
+            if self.finished:
+                return send(response)
+
+            start = time.monotonic()
+            result = send(response)
+            self.add("write", time.monotonic() - start)
+            self.finish(response)
+            return result
+
+        return reply
+
+    def finish(self, response=None):
+        """写出事件记录，只写一次"""
+        if self.finished:
+            return
+        self.finished = True
+
+        if not events.isEnabledFor(logging.INFO):
+            return
+
+        record = {"ts": round(self.wall, 3), "mono": round(self.started, 6)}
+        record.update(self.fields)
+
+        if isinstance(response, dict):
+            record["ok"] = bool(response.get("success"))
+            for key in ("status", "engine", "coalesced"):
+                if key in response:
+                    record[key] = response[key]
+
+        # 各阶段耗时（毫秒）
+        timings = {phase: round(duration * 1000, 3) for phase, duration in self.phases.items()}
+        timings["total"] = round((time.monotonic() - self.started) * 1000, 3)
+        record["ms"] = timings
+
+        # JSON在日志线程中序列化
+        events.info(record)
+
+def current_spans():
+    """当前线程正在处理的请求"""
+    return getattr(_local, "spans", ())
+
+class activate:
+    """在with块内把阶段耗时记到指定的请求上（合并启动时一次启动属于多个请求）"""
+
+    __slots__ = ("spans", "previous")
+
+    def __init__(self, *spans):
+        self.spans = tuple(span for span in spans if span is not None)
+
+    def __enter__(self):
+        self.previous = current_spans()
+        _local.spans = self.spans
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.spans = self.previous
+
+class phase:
+    """记录with块的耗时；当前线程没有请求时只有一次属性查找的开销"""
+
+    __slots__ = ("name", "spans", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.spans = current_spans()
+        if self.spans:
+            self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.spans:
+            duration = time.monotonic() - self.start
+            for span in self.spans:
+                span.add(self.name, duration)
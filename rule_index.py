@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Edge2Chrome URL规则索引
+企业规则列表可能有数千条，逐条匹配正则太慢：只含普通字符和 * ? . 的规则中，
+形如 *.zhihu.*、https://www.zhihu.com/*、*github.com 的规则（* 只出现在开头或结尾）
+按字符放入前缀树，每个链接只需沿树走一遍；其余规则合并为一个正则表达式。
+classify消息据此一次判断整页链接，结果以位图返回
+
+匹配结果与扩展中url_matcher.js相同：规则按 * 匹配任意字符串、? 和 . 匹配单个字符、
+忽略大小写的方式匹配完整URL，前缀树只是同一个正则的另一种匹配方式。
+简单规则按JS正则（非unicode模式）的规则比较：. 不匹配换行符，只忽略ASCII字母的大小写，
+辅助平面字符按两个UTF-16码元计；含 (、|、\\、[ 等正则语法的规则由Python的re编译，
+这类规则中Python与JS语法不同的部分（例如命名分组）结果可能不同
+"""
+
+import base64
+import functools
+import os
+import re
+import string
+import threading
+
+# 每行一条规则的规则文件，classify消息不带rules时使用，文件修改后自动重新加载
+RULES_FILE = os.getenv('EDGE2CHROME_RULES_FILE')
+
+# 按规则列表缓存的索引数
+INDEX_CACHE_SIZE = 8
+
+# 规则中出现这些字符时按正则语法解释，不是简单规则
+REGEX_SYNTAX = frozenset('\\^$+{}[]()|\n\r')
+
+# 记号：STAR匹配任意字符串，ANY匹配单个字符，其余记号为小写的字符本身
+STAR = '*'
+ANY = None
+
+# JS正则的 . 不匹配的行终止符
+LINE_TERMINATORS = re.compile('[\n\r\u2028\u2029]')
+_JS_DOT = '[^\n\r\u2028\u2029]'
+
+# JS正则按UTF-16码元匹配，辅助平面字符替换为两个不会等于任何ASCII规则字符的码元
+_ASTRAL = re.compile('[\U00010000-\U0010FFFF]')
+_SURROGATE_PAIR = '\ufffe\ufffe'
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+class TrieNode:
+    """前缀树节点；children以字符或ANY为键，ends为到此结束的规则"""
+
+    __slots__ = ("children", "ends")
+
+    def __init__(self):
+        self.children = {}
+        # (k, m, exact)：起点至少为k；exact时必须到URL结尾，否则后面至少还有m个字符
+        self.ends = []
+
+def wildcard_to_regex(rule):
+    """通配符规则转为正则表达式，转换方式与扩展中的url_matcher.js相同，正则由Python的re解释"""
+    return rule.replace('*', '.*').replace('?', '.')
+
+def tokenize(rule):
+    """简单规则（ASCII，除 * ? . 外不含正则语法）拆为记号，其他规则返回None"""
+    if not rule.isascii() or not REGEX_SYNTAX.isdisjoint(rule):
+        return None
+    return [STAR if char == '*' else ANY if char in '?.' else char.lower() for char in rule]
+
+def tokens_to_regex(tokens):
+    """简单规则按JS正则的含义转为Python正则，匹配normalize_url处理后的URL"""
+    parts = []
+    for token in tokens:
+        if token is STAR:
+            parts.append(_JS_DOT + '*')
+        elif token is ANY:
+            parts.append(_JS_DOT)
+        else:
+            parts.append(re.escape(token))
+    return ''.join(parts)
+
+def normalize_url(url):
+    """转为与简单规则比较的形式：只转换ASCII字母的大小写（与JS正则的i标志相同）"""
+    if url.isascii():
+        return url.lower()
+    return _ASTRAL.sub(_SURROGATE_PAIR, url).translate(_ASCII_LOWER)
+
+class RuleIndex:
+    """一组规则的索引"""
+
+    def __init__(self, rules):
+        # 从URL开头匹配的前缀树，以及规则以 * 开头、可以从任意位置开始匹配的前缀树
+        self.anchored = TrieNode()
+        self.floating = TrieNode()
+        self.trie_rules = 0
+        self.invalid_rules = []
+
+        simple_sources = []
+        sources = []
+        self.standalone = []
+        for rule in rules:
+            if not isinstance(rule, str):
+                continue
+
+            tokens = tokenize(rule)
+            if tokens is not None:
+                if self._add_trie_rule(tokens):
+                    self.trie_rules += 1
+                else:
+                    simple_sources.append(tokens_to_regex(tokens))
+                continue
+
+            source = wildcard_to_regex(rule)
+            try:
+                regex = re.compile(source, re.IGNORECASE)
+            except re.error:
+                self.invalid_rules.append(rule)
+                continue
+
+            # 含分组、选择或转义的规则合并后含义可能改变，单独匹配
+            if re.search(r'[(|\\]', source):
+                self.standalone.append(regex)
+            else:
+                sources.append(source)
+
+        self.residual_rules = len(simple_sources) + len(sources) + len(self.standalone)
+        self.simple = re.compile('(?:' + '|'.join(simple_sources) + ')') if simple_sources else None
+        self.combined = re.compile('(?:' + '|'.join(sources) + ')', re.IGNORECASE) if sources else None
+
+    def _add_trie_rule(self, tokens):
+        """* 只出现在开头或结尾的规则放入前缀树；中间有 * 时返回False"""
+        leading = 0
+        while leading < len(tokens) and tokens[leading] is STAR:
+            leading += 1
+        trailing = 0
+        while trailing < len(tokens) - leading and tokens[-1 - trailing] is STAR:
+            trailing += 1
+
+        core = tokens[leading:len(tokens) - trailing]
+        if STAR in core:
+            return False
+
+        # 开头的 ? 只要求起点前还有字符，结尾的 ? 只要求后面还有字符，不必放入前缀树
+        skip = 0
+        if leading:
+            while skip < len(core) and core[skip] is ANY:
+                skip += 1
+        rest = 0
+        if trailing:
+            while rest < len(core) - skip and core[-1 - rest] is ANY:
+                rest += 1
+
+        node = self.floating if leading else self.anchored
+        for token in core[skip:len(core) - rest]:
+            child = node.children.get(token)
+            if child is None:
+                child = node.children[token] = TrieNode()
+            node = child
+        node.ends.append((skip, rest, not trailing))
+        return True
+
+    @staticmethod
+    def _walk(node, url, start, position):
+        """从url[start]开始匹配规则，node为已经匹配到url[position]之前的节点"""
+        length = len(url)
+        nodes = [node]
+        while True:
+            for node in nodes:
+                for skip, rest, exact in node.ends:
+                    remaining = length - position
+                    if start >= skip and (remaining == 0 if exact else remaining >= rest):
+                        return True
+            if position == length:
+                return False
+
+            char = url[position]
+            position += 1
+            following = []
+            for node in nodes:
+                child = node.children.get(char)
+                if child is not None:
+                    following.append(child)
+                child = node.children.get(ANY)
+                if child is not None:
+                    following.append(child)
+            if not following:
+                return False
+            nodes = following
+
+    def _match_trie(self, url):
+        """url为normalize_url的结果，且不含行终止符"""
+        if (self.anchored.children or self.anchored.ends) and self._walk(self.anchored, url, 0, 0):
+            return True
+
+        floating = self.floating
+        # 只有 * 和 ? 的规则：URL足够长即可
+        for skip, rest, exact in floating.ends:
+            if len(url) >= skip + rest:
+                return True
+
+        children = floating.children
+        if not children:
+            return False
+        # 开头的 ? 已经去掉，前缀树的第一层只有普通字符
+        for start, char in enumerate(url):
+            if char in children and self._walk(children[char], url, start, start + 1):
+                return True
+        return False
+
+    def match(self, url):
+        normalized = normalize_url(url)
+        # 简单规则的每个字符都由 . 或普通字符匹配，含行终止符的URL不可能匹配
+        if not LINE_TERMINATORS.search(normalized):
+            if self._match_trie(normalized):
+                return True
+            if self.simple is not None and self.simple.fullmatch(normalized):
+                return True
+        if self.combined is not None and self.combined.fullmatch(url):
+            return True
+        return any(regex.fullmatch(url) for regex in self.standalone)
+
+    def classify(self, hrefs):
+        """返回位图：第i个链接匹配时第i位（第i//8字节的第i%8位）为1"""
+        bitmap = bytearray((len(hrefs) + 7) // 8)
+        for i, href in enumerate(hrefs):
+            if isinstance(href, str) and self.match(href):
+                bitmap[i >> 3] |= 1 << (i & 7)
+        return bitmap
+
+    def stats(self):
+        return {
+            "trie_rules": self.trie_rules,
+            "residual_rules": self.residual_rules,
+            "invalid_rules": len(self.invalid_rules),
+        }
+
+@functools.lru_cache(maxsize=INDEX_CACHE_SIZE)
+def index_for(rules):
+    """rules为元组；相同的规则列表只建立一次索引"""
+    return RuleIndex(rules)
+
+_file_lock = threading.Lock()
+_file_index = None
+
+def load_rules_file(path):
+    """读取规则文件，空行和 # 开头的行忽略；文件未修改时返回已建立的索引"""
+    global _file_index
+
+    stat = os.stat(path)
+    signature = (path, stat.st_mtime_ns, stat.st_size)
+
+    with _file_lock:
+        if _file_index is not None and _file_index[0] == signature:
+            return _file_index[1]
+
+        with open(path, encoding='utf-8') as f:
+            rules = [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+        index = RuleIndex(rules)
+        _file_index = (signature, index)
+        return index
+
+def classify_message(message):
+    """处理classify消息：{"type": "classify", "hrefs": [...], "rules": [...]}，rules可省略"""
+    hrefs = message.get("hrefs")
+    if not isinstance(hrefs, list):
+        return {"success": False, "error": "hrefs必须是数组"}
+
+    rules = message.get("rules")
+    if isinstance(rules, list):
+        index = index_for(tuple(rule for rule in rules if isinstance(rule, str)))
+    elif RULES_FILE:
+        try:
+            index = load_rules_file(RULES_FILE)
+        except OSError as e:
+            return {"success": False, "error": f"读取规则文件失败: {e}"}
+    else:
+        return {"success": False, "error": "没有可用的规则"}
+
+    bitmap = index.classify(hrefs)
+    return {
+        "success": True,
+        "count": len(hrefs),
+        "matched": sum(bin(byte).count("1") for byte in bitmap),
+        "bitmap": base64.b64encode(bitmap).decode('ascii'),
+        "rules": index.stats(),
+    }